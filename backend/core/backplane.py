@@ -0,0 +1,131 @@
+"""Cross-worker fan-out for order WebSocket events.
+
+Each API worker only knows its own sockets. The backplane relays order events
+(chat messages, presence, typing) to the other workers, so everyone connected
+to an order sees them whichever worker they landed on.
+
+- ``local`` (default): single worker, nothing leaves the process.
+- ``postgres``: LISTEN/NOTIFY over two dedicated connections outside the pool.
+  NOTIFY touches no tables and writes no WAL, so ephemeral events stay cheap.
+  Enable with ``WS_BACKPLANE=postgres``.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import psycopg
+
+from backend.db import DATABASE_URL
+
+WS_BACKPLANE = os.getenv("WS_BACKPLANE", "local").lower()
+BACKPLANE_CHANNEL = "hirely_ws"
+BACKPLANE_MAX_PAYLOAD = 7900  # bytes; Postgres rejects NOTIFY payloads of 8000+
+BACKPLANE_QUEUE_SIZE = 1000  # outgoing envelopes buffered before new ones are dropped
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class LocalBackplane:
+    """No-op backplane for single-worker deployments."""
+
+    worker_id = "local"
+
+    async def start(self, handler: Handler):
+        pass
+
+    def publish(self, envelope: dict) -> bool:
+        return True
+
+    async def stop(self):
+        pass
+
+
+class PostgresBackplane:
+    """Relay envelopes between workers with Postgres LISTEN/NOTIFY.
+
+    ``publish`` only enqueues; a background task sends the NOTIFYs so request
+    handlers never wait on the database for fan-out.
+    """
+
+    RECONNECT_DELAY = 2.0  # seconds
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._handler: Optional[Handler] = None
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=BACKPLANE_QUEUE_SIZE)
+        self._tasks: list[asyncio.Task] = []
+        self.dropped = 0
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._publish_loop())]
+
+    def publish(self, envelope: dict) -> bool:
+        """Queue an envelope for the other workers. Returns False if it was too large or dropped."""
+        payload = json.dumps({**envelope, "origin": self.worker_id}, default=str)
+        if len(payload.encode()) > BACKPLANE_MAX_PAYLOAD:
+            return False
+        try:
+            self._outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def _publish_loop(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True) as conn:
+                    while True:
+                        payload = await self._outbox.get()
+                        await conn.execute("SELECT pg_notify(%s, %s)", (BACKPLANE_CHANNEL, payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Backplane publisher error, reconnecting: {e}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {BACKPLANE_CHANNEL}")
+                    async for notify in conn.notifies():
+                        try:
+                            envelope = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        # Our own NOTIFYs come back to us too
+                        if envelope.get("origin") == self.worker_id:
+                            continue
+                        try:
+                            await self._handler(envelope)
+                        except Exception as e:
+                            print(f"Backplane handler error: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Backplane listener error, reconnecting: {e}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+def _build_backplane():
+    if WS_BACKPLANE == "postgres":
+        return PostgresBackplane()
+    return LocalBackplane()
+
+
+backplane = _build_backplane()
@@ -0,0 +1,141 @@
+"""In-process buffer for analytics events.
+
+``POST /analytics/events`` only puts the event on a bounded queue; a
+background task drains it and writes micro-batches with COPY every
+``ANALYTICS_BUFFER_BATCH_SIZE`` events or ``ANALYTICS_BUFFER_FLUSH_MS``
+milliseconds, whichever comes first. Tracking therefore costs the request a
+queue put instead of a pool checkout, INSERT and commit.
+
+When the queue fills up, ``ANALYTICS_BUFFER_OVERFLOW`` decides what happens:
+- ``drop`` (default): discard the new event.
+- ``sample``: past 80% full keep only ``ANALYTICS_BUFFER_SAMPLE_RATE`` of new
+  events, then drop once completely full.
+- ``block``: make the request wait for room (backpressure instead of loss).
+
+Events still queued at shutdown are flushed before the pool closes.
+"""
+
+import asyncio
+import json
+import os
+import random
+from typing import Optional
+
+from backend.repositories.analytics_repo import AnalyticsRepository
+from backend.schemas.analytics import ServiceEventCreate
+
+ANALYTICS_BUFFER_SIZE = int(os.getenv("ANALYTICS_BUFFER_SIZE", "10000"))
+ANALYTICS_BUFFER_BATCH_SIZE = int(os.getenv("ANALYTICS_BUFFER_BATCH_SIZE", "500"))
+ANALYTICS_BUFFER_FLUSH_MS = int(os.getenv("ANALYTICS_BUFFER_FLUSH_MS", "250"))
+ANALYTICS_BUFFER_OVERFLOW = os.getenv("ANALYTICS_BUFFER_OVERFLOW", "drop").lower()
+ANALYTICS_BUFFER_SAMPLE_RATE = float(os.getenv("ANALYTICS_BUFFER_SAMPLE_RATE", "0.1"))
+SAMPLE_THRESHOLD = 0.8  # fraction of capacity at which sampling starts
+
+
+class EventBuffer:
+    def __init__(
+        self,
+        max_size: int = ANALYTICS_BUFFER_SIZE,
+        batch_size: int = ANALYTICS_BUFFER_BATCH_SIZE,
+        flush_ms: int = ANALYTICS_BUFFER_FLUSH_MS,
+        overflow: str = ANALYTICS_BUFFER_OVERFLOW,
+        sample_rate: float = ANALYTICS_BUFFER_SAMPLE_RATE,
+    ):
+        if overflow not in ("drop", "sample", "block"):
+            raise ValueError(f"Unknown analytics buffer overflow policy: {overflow}")
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.overflow = overflow
+        self.sample_rate = sample_rate
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"accepted": 0, "dropped": 0, "sampled_out": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    async def submit(self, event: ServiceEventCreate, user_id: Optional[int] = None) -> bool:
+        """Queue one event. Returns False if the overflow policy discarded it."""
+        row = (event.service_id, user_id, event.event_type.value, json.dumps(event.metadata or {}))
+
+        if self.overflow == "block":
+            await self._queue.put(row)
+            self.stats["accepted"] += 1
+            return True
+
+        if self.overflow == "sample" and self._queue.qsize() >= self.max_size * SAMPLE_THRESHOLD:
+            if random.random() >= self.sample_rate:
+                self.stats["sampled_out"] += 1
+                return False
+
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["accepted"] += 1
+        return True
+
+    def _take_ready(self, batch: list):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return
+
+    async def _write(self, batch: list):
+        try:
+            await AnalyticsRepository.copy_event_rows(batch)
+            self.stats["written"] += len(batch)
+        except Exception as e:
+            # Analytics are best-effort; never let a bad batch stop the writer
+            self.stats["failed"] += len(batch)
+            print(f"Failed to flush {len(batch)} analytics events: {e}")
+        self.stats["flushes"] += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch: list = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.flush_interval
+                self._take_ready(batch)
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                    self._take_ready(batch)
+                await self._write(batch)
+                batch = []
+        except asyncio.CancelledError:
+            # Shutting down: an interrupted COPY was rolled back, so write the batch in hand
+            if batch:
+                await self._write(batch)
+            raise
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer and flush everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            batch: list = []
+            self._take_ready(batch)
+            await self._write(batch)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "queued": self._queue.qsize(), "capacity": self.max_size, "overflow": self.overflow}
+
+
+event_buffer = EventBuffer()
@@ -0,0 +1,39 @@
+"""HyperLogLog distinct counting over sketches stored in Postgres.
+
+Sketches are built and merged in SQL (see ``hll_register``, ``hll_sketch``
+and ``hll_union`` in schema.sql) and stored sparsely as ``INTEGER[]``: one
+element per non-empty register, packed as ``(register << 6) | rank``. Within a
+register a larger packed value means a larger rank, so merging two sketches is
+``MAX`` per ``value >> 6``. An empty array is an empty sketch.
+
+With ``HLL_PRECISION = 11`` (2048 registers, at most 8 KB per sketch) the
+relative standard error of an estimate is 1.04 / sqrt(2048), about 2.3%. About
+95% of estimates land within 4.6% of the true count. Below roughly 5000
+distinct values linear counting is used, which is more accurate still, and
+exact for very small sets apart from rare hash collisions.
+"""
+
+import math
+from typing import Optional
+
+HLL_PRECISION = 11
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_STANDARD_ERROR = 1.04 / math.sqrt(HLL_REGISTERS)
+
+_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+# Select-list fragment over a merged register column ``v``: (non-empty registers, sum of 2^-rank)
+HLL_STATS_SQL = "COUNT(v) AS hll_registers, COALESCE(SUM(power(2.0, -(v & 63))), 0) AS hll_inverse_sum"
+
+
+def hll_estimate(nonzero_registers: Optional[int], inverse_sum: Optional[float]) -> int:
+    """Cardinality estimate from the ``HLL_STATS_SQL`` aggregates of a merged sketch."""
+    nonzero = int(nonzero_registers or 0)
+    if nonzero == 0:
+        return 0
+    zeros = HLL_REGISTERS - nonzero
+    estimate = _ALPHA * HLL_REGISTERS * HLL_REGISTERS / (float(inverse_sum) + zeros)
+    if estimate <= 2.5 * HLL_REGISTERS and zeros:
+        # Small-range correction (linear counting)
+        estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+    return int(round(estimate))
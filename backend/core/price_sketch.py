@@ -0,0 +1,50 @@
+"""Relative-error quantile sketches of service prices.
+
+"CategoryPricingStats" keeps one sketch per category, maintained by the
+``trg_category_pricing_stats`` trigger on "Service" (see schema.sql). A sketch
+is a JSONB object mapping a log-spaced bucket index to a count. A price ``x``
+goes to bucket ``ceil(log_gamma(x))`` with
+``gamma = (1 + PRICE_SKETCH_ACCURACY) / (1 - PRICE_SKETCH_ACCURACY)``.
+
+Counts can be added and removed, so a sketch follows creates, edits and
+deletes exactly. Sketches from different categories merge by summing counts.
+Any quantile read from a sketch is within ``PRICE_SKETCH_ACCURACY`` (1%) of a
+real price at that rank.
+"""
+
+import math
+from typing import Dict, Iterable, Mapping, Optional
+
+PRICE_SKETCH_ACCURACY = 0.01
+
+_GAMMA = (1 + PRICE_SKETCH_ACCURACY) / (1 - PRICE_SKETCH_ACCURACY)
+
+Sketch = Dict[int, int]
+
+
+def bucket_value(bucket: int) -> float:
+    """Representative price of a bucket: within the accuracy bound of every price in it."""
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+
+def merge_sketches(sketches: Iterable[Optional[Mapping]]) -> Sketch:
+    """Sum bucket counts; accepts the JSONB dicts (string keys) as read from Postgres."""
+    merged: Sketch = {}
+    for sketch in sketches:
+        for bucket, count in (sketch or {}).items():
+            merged[int(bucket)] = merged.get(int(bucket), 0) + int(count)
+    return merged
+
+
+def sketch_quantile(sketch: Mapping[int, int], q: float) -> Optional[float]:
+    """Price at rank ``q * (n - 1)``; same rule as ``price_sketch_quantile`` in SQL."""
+    total = sum(sketch.values())
+    if total <= 0:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for bucket in sorted(sketch):
+        seen += sketch[bucket]
+        if seen > rank:
+            return bucket_value(bucket)
+    return bucket_value(max(sketch))
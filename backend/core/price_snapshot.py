@@ -0,0 +1,113 @@
+"""In-process NumPy snapshot of service prices for interactive pricing charts.
+
+The snapshot holds every positive ``hourly_price`` as a float64 array, sorted
+by category code and then price, plus the matching int32 category codes.
+Histograms at any bucket size, percentiles and per-category distributions
+are then computed from memory, with no query per slider move.
+
+Freshness:
+- The services router calls ``invalidate()`` after committing a price
+  create, edit or delete, so the next read on that worker reloads.
+- Other workers notice within ``PRICE_SNAPSHOT_MAX_AGE`` seconds. Once a
+  snapshot is that old, one small query reads SUM("CategoryPricingStats".version)
+  (each row's version is bumped by the pricing trigger) and MAX(updated_at).
+  The vector is reloaded only if that pair moved. A timestamp alone is not
+  enough: NOW() is the transaction start, so an edit committed after a
+  later-stamped one would leave MAX(updated_at) unchanged, but it always
+  raises the version sum.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.db import get_connection
+
+PRICE_SNAPSHOT_MAX_AGE = float(os.getenv("PRICE_SNAPSHOT_MAX_AGE", "30"))  # seconds
+
+
+class PriceSnapshot:
+    def __init__(self, max_age: float = PRICE_SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self.prices = np.zeros(0)
+        self.codes = np.zeros(0, dtype=np.int32)
+        self.categories: List[str] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._version: Optional[Tuple] = None
+        self._checked_at = float("-inf")
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._stale = True
+
+    async def refresh(self) -> "PriceSnapshot":
+        """Return the snapshot, reloading it first if it is stale or its version moved."""
+        if not self._stale and time.monotonic() - self._checked_at < self.max_age:
+            return self
+        async with self._lock:
+            if not self._stale and time.monotonic() - self._checked_at < self.max_age:
+                return self
+            async with get_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute('SELECT SUM(version), MAX(updated_at) FROM "CategoryPricingStats"')
+                    version = tuple(await cur.fetchone())
+                    if self._stale or version != self._version:
+                        await cur.execute(
+                            'SELECT category, hourly_price::float8 FROM "Service" WHERE hourly_price > 0'
+                        )
+                        self._load(await cur.fetchall())
+                        self._version = version
+            self._stale = False
+            self._checked_at = time.monotonic()
+        return self
+
+    def _load(self, rows: Sequence[Tuple[str, float]]):
+        categories = sorted({row[0] for row in rows})
+        index = {category: i for i, category in enumerate(categories)}
+        codes = np.fromiter((index[row[0]] for row in rows), dtype=np.int32, count=len(rows))
+        prices = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        order = np.lexsort((prices, codes))
+        self.categories = categories
+        self.codes = codes[order]
+        self.prices = prices[order]
+        # prices[_offsets[i]:_offsets[i + 1]] is category i, already sorted
+        self._offsets = np.searchsorted(self.codes, np.arange(len(categories) + 1)).astype(np.int64)
+
+    def category_prices(self, category: Optional[str] = None) -> np.ndarray:
+        """Sorted prices of one category, or all prices (grouped by category) when ``category`` is None."""
+        if category is None:
+            return self.prices
+        try:
+            i = self.categories.index(category)
+        except ValueError:
+            return self.prices[:0]
+        return self.prices[self._offsets[i]:self._offsets[i + 1]]
+
+    def histogram(self, bucket_size: float, category: Optional[str] = None) -> List[Tuple[float, int]]:
+        """(range start, count) for every non-empty ``bucket_size``-wide range, lowest first."""
+        prices = self.category_prices(category)
+        if prices.size == 0:
+            return []
+        first = np.floor(prices.min() / bucket_size)
+        last = np.floor(prices.max() / bucket_size)
+        edges = np.arange(first, last + 2) * bucket_size
+        counts, _ = np.histogram(prices, bins=edges)
+        nonzero = np.flatnonzero(counts)
+        return list(zip(edges[nonzero].tolist(), counts[nonzero].tolist()))
+
+    def percentiles(self, qs: Sequence[float]) -> Dict[Optional[str], Tuple[int, List[float]]]:
+        """Per category (and ``None`` for all services): (count, percentiles at ``qs`` in 0-100)."""
+        result: Dict[Optional[str], Tuple[int, List[float]]] = {}
+        if self.prices.size:
+            result[None] = (int(self.prices.size), np.percentile(self.prices, qs).tolist())
+        for i, category in enumerate(self.categories):
+            prices = self.prices[self._offsets[i]:self._offsets[i + 1]]
+            result[category] = (int(prices.size), np.percentile(prices, qs).tolist())
+        return result
+
+
+price_snapshot = PriceSnapshot()
@@ -0,0 +1,138 @@
+"""Token-bucket rate limiting shared by the API routers.
+
+Every limiter keeps one bucket per key (user id, client IP, ...). A bucket
+holds up to ``max_requests`` tokens and refills continuously at
+``max_requests / window_seconds`` tokens per second, so each check is O(1)
+instead of rebuilding a list of timestamps.
+
+Bucket storage is pluggable:
+- ``memory`` (default): per-process buckets, LRU-bounded so idle keys are evicted.
+- ``postgres``: buckets in the UNLOGGED "RateLimitBucket" table, so every
+  worker shares the same budget. Enable with ``RATE_LIMIT_BACKEND=postgres``.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+from backend.db import get_connection
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+# Shared buckets idle for longer than this are full again and can be deleted
+RATE_LIMIT_IDLE_TTL = 3600  # seconds
+
+
+class MemoryBucketStore:
+    """Per-process token buckets with LRU eviction of the least recently used key."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # key -> (tokens, last refill time on the monotonic clock)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, capacity: float, refill_rate: float, cost: float = 1.0) -> bool:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+            self._buckets.move_to_end(key)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+
+        # An evicted bucket simply starts full again, which is what an idle key would have
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed
+
+
+class PostgresBucketStore:
+    """Token buckets shared across workers through the UNLOGGED "RateLimitBucket" table.
+
+    Refill and consume happen in a single upsert, so concurrent workers cannot
+    overspend a bucket. If the database is unreachable we fall back to local
+    buckets rather than rejecting (or blindly accepting) every request.
+    """
+
+    PRUNE_EVERY = 1000  # consume calls between idle-bucket cleanups
+
+    def __init__(self, fallback: MemoryBucketStore | None = None):
+        self._fallback = fallback or MemoryBucketStore()
+        self._calls = 0
+
+    async def consume(self, key: str, capacity: float, refill_rate: float, cost: float = 1.0) -> bool:
+        try:
+            async with get_connection() as conn:
+                async with conn.cursor() as cur:
+                    # The ON CONFLICT branch only updates when enough tokens remain,
+                    # so "no row returned" means the request is over the limit.
+                    await cur.execute(
+                        '''
+                        INSERT INTO "RateLimitBucket" AS b (bucket_key, tokens, updated_at)
+                        VALUES (%(key)s, %(capacity)s::float8 - %(cost)s::float8, clock_timestamp())
+                        ON CONFLICT (bucket_key) DO UPDATE
+                        SET tokens = LEAST(%(capacity)s::float8,
+                                           b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * %(rate)s::float8)
+                                     - %(cost)s::float8,
+                            updated_at = clock_timestamp()
+                        WHERE LEAST(%(capacity)s::float8,
+                                    b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * %(rate)s::float8)
+                              >= %(cost)s::float8
+                        RETURNING tokens
+                        ''',
+                        {"key": key, "capacity": capacity, "rate": refill_rate, "cost": cost},
+                    )
+                    row = await cur.fetchone()
+
+                    self._calls += 1
+                    if self._calls % self.PRUNE_EVERY == 0:
+                        await cur.execute(
+                            'DELETE FROM "RateLimitBucket" WHERE updated_at < NOW() - make_interval(secs => %s)',
+                            (RATE_LIMIT_IDLE_TTL,),
+                        )
+                    await conn.commit()
+                    return row is not None
+        except Exception as e:
+            print(f"Shared rate limit backend unavailable, using local buckets: {e}")
+            return await self._fallback.consume(key, capacity, refill_rate, cost)
+
+
+def _build_store():
+    if RATE_LIMIT_BACKEND == "postgres":
+        return PostgresBucketStore()
+    return MemoryBucketStore()
+
+
+default_store = _build_store()
+
+
+class RateLimiter:
+    """Allow ``max_requests`` per ``window_seconds`` per key, with bursts up to ``max_requests``."""
+
+    def __init__(self, name: str, max_requests: int, window_seconds: int, store=None):
+        self.name = name
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.refill_rate = max_requests / window_seconds
+        self.store = store or default_store
+
+    async def check(self, key: Hashable, cost: int = 1) -> bool:
+        """Consume ``cost`` tokens for ``key``. Returns True if allowed, False if exceeded."""
+        return await self.store.consume(
+            f"{self.name}:{key}", float(self.max_requests), self.refill_rate, float(cost)
+        )
+
+
+# Limiters used by the routers
+message_limiter = RateLimiter("messages", max_requests=30, window_seconds=60)
+upload_limiter = RateLimiter("uploads", max_requests=10, window_seconds=300)
+analytics_limiter = RateLimiter("analytics", max_requests=120, window_seconds=60)
+# Single tracked events are buffered in memory, so their limit stays local too: a shared
+# bucket would put a DB upsert back on every event. The budget is per worker.
+analytics_event_limiter = RateLimiter("analytics_events", max_requests=120, window_seconds=60, store=MemoryBucketStore())
@@ -0,0 +1,98 @@
+"""Deferred, batched read receipts for order conversations.
+
+Instead of flipping ``is_read`` on every message row whenever a conversation
+is fetched, we keep one "read up to message_id" watermark per (user, order)
+in "MessageReadWatermark". Reads only record the highest message id seen in
+memory; a background task flushes all pending watermarks in one upsert every
+few seconds. A message counts as read when its id is at or below the
+receiver's watermark (or when the legacy ``is_read`` flag is already set).
+"""
+
+import asyncio
+import os
+from typing import Dict, Optional, Tuple
+
+from backend.db import get_connection
+
+READ_RECEIPT_FLUSH_INTERVAL = float(os.getenv("READ_RECEIPT_FLUSH_INTERVAL", "2.0"))  # seconds
+READ_RECEIPT_MAX_PENDING = 5000  # flush early once this many watermarks are waiting
+
+
+class ReadReceiptBuffer:
+    def __init__(self, flush_interval: float = READ_RECEIPT_FLUSH_INTERVAL, max_pending: int = READ_RECEIPT_MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        # (user_id, order_id) -> highest message_id read but not yet flushed
+        self._pending: Dict[Tuple[int, int], int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def mark_read(self, user_id: int, order_id: int, message_id: int) -> None:
+        """Record that ``user_id`` has read ``order_id`` up to ``message_id``. Never touches the DB."""
+        key = (user_id, order_id)
+        if message_id > self._pending.get(key, 0):
+            self._pending[key] = message_id
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+
+    def pending_watermark(self, user_id: int, order_id: int) -> int:
+        return self._pending.get((user_id, order_id), 0)
+
+    async def flush(self) -> int:
+        """Write all pending watermarks in a single statement. Returns the number flushed."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        user_ids = [k[0] for k in batch]
+        order_ids = [k[1] for k in batch]
+        message_ids = list(batch.values())
+        try:
+            async with get_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(
+                        '''
+                        INSERT INTO "MessageReadWatermark" (user_id, order_id, last_read_message_id, updated_at)
+                        SELECT u, o, m, NOW()
+                        FROM unnest(%s::int[], %s::int[], %s::int[]) AS t(u, o, m)
+                        ON CONFLICT (user_id, order_id) DO UPDATE
+                        SET last_read_message_id = GREATEST("MessageReadWatermark".last_read_message_id, EXCLUDED.last_read_message_id),
+                            updated_at = NOW()
+                        WHERE EXCLUDED.last_read_message_id > "MessageReadWatermark".last_read_message_id
+                        ''',
+                        (user_ids, order_ids, message_ids),
+                    )
+                    await conn.commit()
+        except Exception as e:
+            # Put the batch back (keeping any newer marks) so the next flush retries it
+            for key, message_id in batch.items():
+                self.mark_read(key[0], key[1], message_id)
+            print(f"Failed to flush read receipts: {e}")
+            return 0
+        return len(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the background loop and flush whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+read_receipts = ReadReceiptBuffer()
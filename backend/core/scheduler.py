@@ -0,0 +1,58 @@
+"""Minimal in-app scheduler for periodic background jobs.
+
+Jobs are plain ``async def job() -> dict`` callables registered with an
+interval. Each runs in its own task; a failing run is logged and retried on
+the next tick. Jobs that must not overlap across workers take a Postgres
+advisory lock themselves (see ``backend.jobs.watermarks.try_job_lock``).
+
+Set ``BACKGROUND_JOBS_ENABLED=false`` to run jobs only from the CLI/cron.
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+BACKGROUND_JOBS_ENABLED = os.getenv("BACKGROUND_JOBS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+JobFn = Callable[[], Awaitable[Optional[dict]]]
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs: Dict[str, tuple] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.last_results: Dict[str, dict] = {}
+
+    def every(self, name: str, seconds: float, job: JobFn, initial_delay: float = 5.0):
+        """Register ``job`` to run every ``seconds`` seconds once the app has started."""
+        self._jobs[name] = (seconds, job, initial_delay)
+
+    async def _loop(self, name: str, seconds: float, job: JobFn, initial_delay: float):
+        await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                result = await job()
+                self.last_results[name] = result or {}
+            except Exception as e:
+                print(f"Background job {name} failed: {e}")
+                self.last_results[name] = {"error": str(e)}
+            await asyncio.sleep(seconds)
+
+    def start(self):
+        if not BACKGROUND_JOBS_ENABLED or self._tasks:
+            return
+        for name, (seconds, job, initial_delay) in self._jobs.items():
+            self._tasks.append(asyncio.create_task(self._loop(name, seconds, job, initial_delay)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+scheduler = Scheduler()
@@ -16,6 +16,7 @@ def verify_password(password: str, hashed: str) -> bool:
 from typing import Optional
 from fastapi import Header, HTTPException
 from backend.schemas.user import UserResponse
+from backend.db import get_connection
 
 
 async def get_current_user_optional(authorization: Optional[str] = Header(None)) -> Optional[UserResponse]:
@@ -41,3 +42,14 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> UserR
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return user
+
+
+async def get_current_admin(authorization: Optional[str] = Header(None)) -> UserResponse:
+    """Like ``get_current_user`` but also requires a row in "Admin"."""
+    user = await get_current_user(authorization)
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute('SELECT 1 FROM "Admin" WHERE user_id = %s', (user.user_id,))
+            if await cur.fetchone() is None:
+                raise HTTPException(status_code=403, detail="Admin access required")
+    return user.model_copy(update={"role": "admin"})
@@ -0,0 +1,105 @@
+"""Helpers for shaping analytics time series for charts.
+
+A series is held in columnar form, ``{"date": [...], field: [...], ...}``,
+with every list the same length. Endpoints can gap-fill a series against the
+expected date buckets, and downsample it with Largest-Triangle-Three-Buckets
+(LTTB). LTTB picks indices on one driving field; every other column is taken
+at the same indices, so the arrays stay aligned.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+Columns = Dict[str, List[Any]]
+
+
+def date_buckets(start: date, end: date, granularity: str = "day") -> List[date]:
+    """First day of every ``day``/``week``/``month`` bucket overlapping [start, end]."""
+    if granularity == "week":
+        current = start - timedelta(days=start.weekday())
+    elif granularity == "month":
+        current = start.replace(day=1)
+    else:
+        current = start
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        if granularity == "week":
+            current += timedelta(weeks=1)
+        elif granularity == "month":
+            current = current.replace(year=current.year + current.month // 12, month=current.month % 12 + 1)
+        else:
+            current += timedelta(days=1)
+    return buckets
+
+
+def to_columns(rows: Iterable[Dict[str, Any]], fields: List[str]) -> Columns:
+    """Turn date-sorted row dicts into columns."""
+    columns: Columns = {"date": []}
+    for field in fields:
+        columns[field] = []
+    for row in rows:
+        columns["date"].append(row["date"])
+        for field in fields:
+            columns[field].append(row[field])
+    return columns
+
+
+def fill_gaps(columns: Columns, buckets: List[date], defaults: Dict[str, Any]) -> Columns:
+    """Align ``columns`` to ``buckets``, using ``defaults[field]`` where a bucket has no row."""
+    index = {d: i for i, d in enumerate(columns["date"])}
+    filled: Columns = {"date": list(buckets)}
+    for field, values in columns.items():
+        if field == "date":
+            continue
+        default = defaults.get(field)
+        filled[field] = [values[index[d]] if d in index else default for d in buckets]
+    return filled
+
+
+def lttb_indices(ys: List[float], points: int) -> List[int]:
+    """Indices of the points LTTB keeps out of ``ys`` (x is the position), first and last included."""
+    n = len(ys)
+    if points >= n:
+        return list(range(n))
+    points = max(points, 3)
+
+    kept = [0]
+    bucket_size = (n - 2) / (points - 2)
+    a = 0
+    for i in range(points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        # Average of the next bucket (the last point for the final bucket)
+        if i == points - 3:
+            avg_x, avg_y = n - 1, ys[n - 1]
+        else:
+            next_end = min(int((i + 2) * bucket_size) + 1, n)
+            avg_x = (end + next_end - 1) / 2
+            avg_y = sum(ys[end:next_end]) / (next_end - end)
+
+        best, best_area = start, -1.0
+        ax, ay = a, ys[a]
+        for j in range(start, min(end, n - 1)):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def downsample(columns: Columns, points: Optional[int], by: str) -> Columns:
+    """Keep at most ``points`` entries, chosen by LTTB on the ``by`` column."""
+    n = len(columns["date"])
+    if not points or n <= points:
+        return columns
+    ys = [float(v) if v is not None else 0.0 for v in columns[by]]
+    keep = lttb_indices(ys, points)
+    return {field: [values[i] for i in keep] for field, values in columns.items()}
+
+
+def to_rows(columns: Columns) -> List[Dict[str, Any]]:
+    fields = list(columns)
+    return [dict(zip(fields, values)) for values in zip(*(columns[f] for f in fields))]
@@ -0,0 +1,22 @@
+"""Incremental analytics jobs. Each module exposes an async ``run_*`` entry point
+used by the in-app scheduler and a ``python -m backend.jobs.<module>`` CLI."""
+
+import asyncio
+import sys
+
+
+def run_cli(coro):
+    """Run a job coroutine from the command line and close the pool afterwards."""
+    from backend.db import close_pool
+
+    # psycopg requires the selector event loop on Windows
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    async def _main():
+        try:
+            return await coro
+        finally:
+            await close_pool()
+
+    return asyncio.run(_main())
@@ -0,0 +1,107 @@
+"""Platform summary snapshots in "AnalyticsReport".
+
+The admin summary used to run four full-table aggregates (orders, disputes,
+reviews, per-category) on every dashboard load. This job computes them once
+and stores the result, including the per-category breakdown, as a new
+"AnalyticsReport" row. ``GET /analytics/summary`` serves the latest row and
+only refreshes inline when it is older than the caller's ``max_age``.
+
+    python -m backend.jobs.analytics_summary
+"""
+
+import json
+from typing import Optional
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import try_job_lock
+
+JOB_NAME = "analytics_summary_snapshot"
+SUMMARY_REFRESH_SECONDS = 600
+
+
+async def write_summary_snapshot(cur) -> tuple:
+    """Aggregate the platform metrics and insert them as a new report; returns the inserted row."""
+    await cur.execute(
+        '''
+        SELECT COALESCE(AVG(o.total_price), 0),
+               COALESCE(COUNT(DISTINCT d.dispute_id)::DECIMAL / NULLIF(COUNT(DISTINCT o.order_id), 0), 0)
+        FROM "Order" o
+        LEFT JOIN "Dispute" d ON d.order_id = o.order_id
+        '''
+    )
+    avg_price, dispute_rate = await cur.fetchone()
+
+    await cur.execute('SELECT COALESCE(AVG(rating), 0) FROM "Review"')
+    satisfaction = (await cur.fetchone())[0]
+
+    await cur.execute(
+        '''
+        WITH orders AS (
+            SELECT s.category,
+                   AVG(o.total_price) AS avg_order_price,
+                   COUNT(DISTINCT d.dispute_id)::DECIMAL / NULLIF(COUNT(DISTINCT o.order_id), 0) AS dispute_rate
+            FROM "Order" o
+            JOIN "Service" s ON s.service_id = o.service_id
+            LEFT JOIN "Dispute" d ON d.order_id = o.order_id
+            GROUP BY s.category
+        ),
+        ratings AS (
+            SELECT s.category, AVG(r.rating) AS avg_rating
+            FROM "Review" r
+            JOIN "Order" o ON o.order_id = r.order_id
+            JOIN "Service" s ON s.service_id = o.service_id
+            GROUP BY s.category
+        )
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                   'category', c.category,
+                   'avg_order_price', COALESCE(o.avg_order_price, 0),
+                   'dispute_rate', COALESCE(o.dispute_rate, 0),
+                   'avg_rating', COALESCE(r.avg_rating, 0)
+               ) ORDER BY c.category), '[]'::jsonb)
+        FROM (SELECT DISTINCT category FROM "Service") c
+        LEFT JOIN orders o ON o.category = c.category
+        LEFT JOIN ratings r ON r.category = c.category
+        '''
+    )
+    per_category = (await cur.fetchone())[0]
+
+    await cur.execute(
+        '''
+        INSERT INTO "AnalyticsReport" (report_date, avg_pricing, avg_dispute_rate, avg_satisfaction, per_category)
+        VALUES (NOW(), %s, %s, %s, %s)
+        RETURNING report_id, report_date, avg_pricing, avg_dispute_rate, avg_satisfaction, per_category
+        ''',
+        (avg_price, dispute_rate, satisfaction, json.dumps(per_category)),
+    )
+    return await cur.fetchone()
+
+
+async def latest_summary_snapshot(cur, max_age: Optional[float] = None) -> Optional[tuple]:
+    """Latest report, or None if there is none younger than ``max_age`` seconds."""
+    await cur.execute(
+        '''
+        SELECT report_id, report_date, avg_pricing, avg_dispute_rate, avg_satisfaction, per_category
+        FROM "AnalyticsReport"
+        WHERE %(max_age)s::float8 IS NULL OR report_date >= NOW() - make_interval(secs => %(max_age)s::float8)
+        ORDER BY report_date DESC
+        LIMIT 1
+        ''',
+        {"max_age": max_age},
+    )
+    return await cur.fetchone()
+
+
+async def run_analytics_summary_snapshot() -> dict:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+            row = await write_summary_snapshot(cur)
+            await conn.commit()
+            return {"job": JOB_NAME, "report_id": row[0], "categories": len(row[5])}
+
+
+if __name__ == "__main__":
+    print(run_cli(run_analytics_summary_snapshot()))
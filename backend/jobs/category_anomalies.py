@@ -0,0 +1,142 @@
+"""Anomaly detection on "CategoryDailyMetrics".
+
+The last ``ANOMALY_LOOKBACK_DAYS`` days are loaded into a dense
+(category x day) NumPy matrix per metric, with missing days as zero. One
+vectorized pass then computes, for every cell:
+
+- rolling mean and standard deviation over the previous ``ANOMALY_WINDOW``
+  days (cumulative sums, so no Python loop over days);
+- a seasonal baseline: the mean of the same weekday over the previous
+  ``ANOMALY_SEASONAL_WEEKS`` weeks;
+- a z-score of the value against the seasonal baseline, scaled by the
+  rolling standard deviation.
+
+Cells with ``|z| >= ANOMALY_Z_THRESHOLD`` in the last ``ANOMALY_REPORT_DAYS``
+are stored in "CategoryAnomaly", replacing the previous run's window. The job
+runs daily; ``GET /analytics/categories/anomalies`` only reads the stored rows.
+
+    python -m backend.jobs.category_anomalies
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import set_watermark, try_job_lock
+
+JOB_NAME = "category_anomaly_detection"
+ANOMALY_LOOKBACK_DAYS = 180
+ANOMALY_REPORT_DAYS = 30
+ANOMALY_WINDOW = 28
+ANOMALY_SEASONAL_WEEKS = 4
+ANOMALY_Z_THRESHOLD = 3.0
+# Floor for the scale, as a fraction of the rolling mean, so near-constant series don't flag noise
+ANOMALY_MIN_RELATIVE_SCALE = 0.05
+
+ANOMALY_METRICS = ("total_revenue", "total_orders")
+
+
+def detect_anomalies(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Rolling/seasonal statistics for a (series x day) matrix; NaN where history is too short."""
+    series, days = values.shape
+    history = max(ANOMALY_WINDOW, 7 * ANOMALY_SEASONAL_WEEKS)
+    mean = np.full(values.shape, np.nan)
+    std = np.full(values.shape, np.nan)
+    seasonal = np.full(values.shape, np.nan)
+    if days <= history:
+        return {"rolling_mean": mean, "rolling_std": std, "baseline": seasonal, "zscore": np.full(values.shape, np.nan)}
+
+    # Window sums over the ANOMALY_WINDOW days strictly before each day
+    csum = np.concatenate([np.zeros((series, 1)), np.cumsum(values, axis=1)], axis=1)
+    csq = np.concatenate([np.zeros((series, 1)), np.cumsum(values * values, axis=1)], axis=1)
+    w = ANOMALY_WINDOW
+    window_sum = csum[:, w:days] - csum[:, :days - w]
+    window_sq = csq[:, w:days] - csq[:, :days - w]
+    mean[:, w:] = window_sum / w
+    std[:, w:] = np.sqrt(np.maximum(window_sq / w - mean[:, w:] ** 2, 0.0))
+
+    # Same weekday over the previous weeks
+    k = ANOMALY_SEASONAL_WEEKS
+    start = 7 * k
+    seasonal[:, start:] = sum(values[:, start - 7 * i:days - 7 * i] for i in range(1, k + 1)) / k
+
+    scale = np.maximum(std, ANOMALY_MIN_RELATIVE_SCALE * np.abs(mean))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zscore = np.where(scale > 0, (values - seasonal) / scale, np.nan)
+    zscore[:, :history] = np.nan
+    return {"rolling_mean": mean, "rolling_std": std, "baseline": seasonal, "zscore": zscore}
+
+
+def _to_matrix(rows: List[Tuple], start: date, days: int) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    categories = sorted({row[1] for row in rows})
+    if not rows:
+        return categories, {metric: np.zeros((0, days)) for metric in ANOMALY_METRICS}
+    index = {category: i for i, category in enumerate(categories)}
+    cat_idx = np.fromiter((index[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+    day_idx = np.fromiter(((row[0] - start).days for row in rows), dtype=np.int64, count=len(rows))
+    matrices = {}
+    for offset, metric in enumerate(ANOMALY_METRICS, start=2):
+        matrix = np.zeros((len(categories), days))
+        matrix[cat_idx, day_idx] = np.fromiter((float(row[offset]) for row in rows), dtype=np.float64, count=len(rows))
+        matrices[metric] = matrix
+    return categories, matrices
+
+
+async def run_category_anomaly_detection() -> dict:
+    # Today is still filling up and would read as a drop, so the last complete day is yesterday
+    last = date.today() - timedelta(days=1)
+    start = last - timedelta(days=ANOMALY_LOOKBACK_DAYS)
+    days = ANOMALY_LOOKBACK_DAYS + 1
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            await cur.execute(
+                '''
+                SELECT metric_date, category, total_revenue, total_orders
+                FROM "CategoryDailyMetrics"
+                WHERE metric_date >= %s AND metric_date <= %s
+                ''',
+                (start, last),
+            )
+            categories, matrices = _to_matrix(await cur.fetchall(), start, days)
+
+            report_from = days - ANOMALY_REPORT_DAYS
+            flagged = []
+            for metric, values in matrices.items():
+                stats = detect_anomalies(values)
+                z = stats["zscore"]
+                hits = np.argwhere(np.abs(np.nan_to_num(z[:, report_from:])) >= ANOMALY_Z_THRESHOLD)
+                for c, d in hits:
+                    d += report_from
+                    flagged.append((
+                        start + timedelta(days=int(d)), categories[c], metric,
+                        float(values[c, d]), float(stats["baseline"][c, d]),
+                        float(stats["rolling_mean"][c, d]), float(stats["rolling_std"][c, d]), float(z[c, d]),
+                    ))
+
+            await cur.execute(
+                'DELETE FROM "CategoryAnomaly" WHERE metric_date >= %s',
+                (start + timedelta(days=report_from),),
+            )
+            if flagged:
+                await cur.executemany(
+                    '''
+                    INSERT INTO "CategoryAnomaly"
+                        (metric_date, category, metric, value, baseline, rolling_mean, rolling_std, zscore)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ''',
+                    flagged,
+                )
+            await set_watermark(cur, JOB_NAME, 0, len(flagged))
+            await conn.commit()
+            return {"job": JOB_NAME, "categories": len(categories), "anomalies": len(flagged)}
+
+
+if __name__ == "__main__":
+    print(run_cli(run_category_anomaly_detection()))
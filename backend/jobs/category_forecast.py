@@ -0,0 +1,225 @@
+"""Per-category revenue forecasts with additive Holt-Winters (weekly season).
+
+Fitting runs the smoothing recursions for every category and every
+(alpha, beta, gamma) candidate of ``FORECAST_GRID`` at once: state arrays are
+shaped (grid, category), so the only Python loop is over days. Each category
+keeps the candidate with the lowest one-step-ahead squared error; its RMSE
+is stored alongside the model.
+
+"CategoryForecastModel" stores per category the chosen parameters and the
+final level, trend and weekday seasonals. Later runs only fold the days that
+landed since ``last_date`` into that state, with the stored parameters. A
+full refit happens when a model is older than ``FORECAST_REFIT_DAYS``. Days
+are folded only once the category ETL stops recomputing them
+(``ETL_RECOMPUTE_DAYS``). Forecasts are served from the stored state without
+any fitting.
+
+    python -m backend.jobs.category_forecast [--refit]
+"""
+
+import argparse
+import itertools
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.category_metrics_etl import ETL_RECOMPUTE_DAYS
+from backend.jobs.watermarks import set_watermark, try_job_lock
+
+JOB_NAME = "category_revenue_forecast"
+FORECAST_HISTORY_DAYS = 365
+FORECAST_MIN_DAYS = 21
+FORECAST_REFIT_DAYS = 7
+SEASON = 7
+
+_LEVELS = (0.05, 0.2, 0.4, 0.7)
+FORECAST_GRID = np.array(list(itertools.product(_LEVELS, (0.01, 0.05, 0.2), (0.05, 0.2, 0.4))))
+
+
+def _initial_state(values: np.ndarray, first_day: date):
+    """Level, trend and weekday-indexed seasonals from the first two weeks of each series."""
+    week1 = values[:, :SEASON].mean(axis=1)
+    week2 = values[:, SEASON:2 * SEASON].mean(axis=1)
+    level = week1
+    trend = (week2 - week1) / SEASON
+    season = np.zeros((values.shape[0], SEASON))
+    weekdays = (first_day.weekday() + np.arange(SEASON)) % SEASON
+    season[:, weekdays] = values[:, :SEASON] - week1[:, None]
+    return level, trend, season
+
+
+def _smooth(values: np.ndarray, first_day: date, alpha, beta, gamma, level, trend, season, track_error=False):
+    """Run the additive Holt-Winters updates over ``values`` (..., days); returns final state (and SSE)."""
+    level, trend, season = level.copy(), trend.copy(), season.copy()
+    sse = np.zeros(level.shape)
+    weekday = first_day.weekday()
+    for t in range(values.shape[-1]):
+        y = values[..., t]
+        s = season[..., weekday]
+        if track_error:
+            sse += (y - (level + trend + s)) ** 2
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[..., weekday] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+        weekday = (weekday + 1) % SEASON
+    return level, trend, season, sse
+
+
+def fit_holt_winters(values: np.ndarray, first_day: date) -> Dict[str, np.ndarray]:
+    """Fit every row of a (category x day) matrix; needs at least two full weeks."""
+    level0, trend0, season0 = _initial_state(values, first_day)
+    grid = FORECAST_GRID.shape[0]
+    alpha, beta, gamma = (FORECAST_GRID[:, i][:, None] for i in range(3))
+    # Broadcast to (grid, category[, weekday]) and fit everything in one pass
+    level, trend, season, sse = _smooth(
+        np.broadcast_to(values, (grid,) + values.shape),
+        first_day,
+        alpha, beta, gamma,
+        np.broadcast_to(level0, (grid, values.shape[0])),
+        np.broadcast_to(trend0, (grid, values.shape[0])),
+        np.broadcast_to(season0, (grid,) + season0.shape),
+        track_error=True,
+    )
+    best = np.argmin(sse, axis=0)
+    cols = np.arange(values.shape[0])
+    return {
+        "alpha": FORECAST_GRID[best, 0],
+        "beta": FORECAST_GRID[best, 1],
+        "gamma": FORECAST_GRID[best, 2],
+        "level": level[best, cols],
+        "trend": trend[best, cols],
+        "season": season[best, cols],
+        "rmse": np.sqrt(sse[best, cols] / values.shape[1]),
+    }
+
+
+def forecast(level: float, trend: float, season: List[float], last_date: date, dates: List[date]) -> List[float]:
+    """Point forecasts for future ``dates`` from a model whose state ends at ``last_date``."""
+    return [
+        max(0.0, level + (d - last_date).days * trend + season[d.weekday()])
+        for d in dates
+    ]
+
+
+def _group_by(keys: Dict[int, date]) -> Dict[date, List[int]]:
+    groups: Dict[date, List[int]] = {}
+    for row, key in keys.items():
+        groups.setdefault(key, []).append(row)
+    return groups
+
+
+async def run_category_forecast(refit: bool = False) -> dict:
+    settled = date.today() - timedelta(days=ETL_RECOMPUTE_DAYS)
+    start = settled - timedelta(days=FORECAST_HISTORY_DAYS - 1)
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            await cur.execute(
+                '''
+                SELECT metric_date, category, total_revenue FROM "CategoryDailyMetrics"
+                WHERE metric_date >= %s AND metric_date <= %s
+                ''',
+                (start, settled),
+            )
+            rows = await cur.fetchall()
+            categories = sorted({row[1] for row in rows})
+            index = {category: i for i, category in enumerate(categories)}
+            days = FORECAST_HISTORY_DAYS
+            revenue = np.zeros((len(categories), days))
+            first_seen: Dict[int, int] = {}
+            for metric_date, category, value in rows:
+                i, d = index[category], (metric_date - start).days
+                revenue[i, d] = float(value)
+                first_seen[i] = min(first_seen.get(i, d), d)
+
+            await cur.execute(
+                '''
+                SELECT category, alpha, beta, gamma, level, trend, season, last_date
+                FROM "CategoryForecastModel"
+                WHERE fitted_at > NOW() - make_interval(days => %s::int)
+                ''',
+                (FORECAST_REFIT_DAYS,),
+            )
+            models = {} if refit else {row[0]: row for row in await cur.fetchall() if row[0] in index}
+
+            # Full fits, batched by the first day each category has data
+            fit_from = {
+                i: start + timedelta(days=first_seen[i])
+                for c, i in index.items()
+                if c not in models and days - first_seen[i] >= FORECAST_MIN_DAYS
+            }
+            results = []
+            for first_day, rows_idx in _group_by(fit_from).items():
+                offset = (first_day - start).days
+                fitted = fit_holt_winters(revenue[rows_idx, offset:], first_day)
+                for j, i in enumerate(rows_idx):
+                    results.append((categories[i], fitted, j))
+
+            # Incremental: fold days after each model's last_date with its stored parameters
+            fold_from = {
+                index[c]: model[7] + timedelta(days=1)
+                for c, model in models.items()
+                if model[7] < settled
+            }
+            folded = 0
+            for first_day, rows_idx in _group_by(fold_from).items():
+                offset = max((first_day - start).days, 0)
+                stored = [models[categories[i]] for i in rows_idx]
+                alpha, beta, gamma = (np.array([float(m[k]) for m in stored]) for k in (1, 2, 3))
+                level, trend, season, _ = _smooth(
+                    revenue[rows_idx, offset:],
+                    first_day,
+                    alpha, beta, gamma,
+                    np.array([float(m[4]) for m in stored]),
+                    np.array([float(m[5]) for m in stored]),
+                    np.array([[float(v) for v in m[6]] for m in stored]),
+                )
+                updated = {
+                    "alpha": alpha, "beta": beta, "gamma": gamma,
+                    "level": level, "trend": trend, "season": season, "rmse": None,
+                }
+                for j, i in enumerate(rows_idx):
+                    results.append((categories[i], updated, j))
+                folded += len(rows_idx)
+
+            for category, model, j in results:
+                await cur.execute(
+                    '''
+                    INSERT INTO "CategoryForecastModel"
+                        (category, alpha, beta, gamma, level, trend, season, last_date, rmse, fitted_at, updated_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+                    ON CONFLICT (category) DO UPDATE
+                    SET alpha = EXCLUDED.alpha, beta = EXCLUDED.beta, gamma = EXCLUDED.gamma,
+                        level = EXCLUDED.level, trend = EXCLUDED.trend, season = EXCLUDED.season,
+                        last_date = EXCLUDED.last_date, updated_at = NOW(),
+                        rmse = COALESCE(EXCLUDED.rmse, "CategoryForecastModel".rmse),
+                        fitted_at = CASE WHEN EXCLUDED.rmse IS NULL THEN "CategoryForecastModel".fitted_at
+                                         ELSE EXCLUDED.fitted_at END
+                    ''',
+                    (
+                        category,
+                        float(model["alpha"][j]), float(model["beta"][j]), float(model["gamma"][j]),
+                        float(model["level"][j]), float(model["trend"][j]),
+                        [float(v) for v in model["season"][j]],
+                        settled,
+                        float(model["rmse"][j]) if model["rmse"] is not None else None,
+                    ),
+                )
+
+            await set_watermark(cur, JOB_NAME, 0, len(results))
+            await conn.commit()
+            return {"job": JOB_NAME, "fitted": len(results) - folded, "updated": folded, "through": settled.isoformat()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit or update per-category revenue forecasts")
+    parser.add_argument("--refit", action="store_true", help="refit every category instead of updating")
+    args = parser.parse_args()
+    print(run_cli(run_category_forecast(refit=args.refit)))
@@ -0,0 +1,131 @@
+"""Incremental ETL of "Order" x "Service" into "CategoryDailyMetrics".
+
+Per (day, category) we keep orders, revenue, average order value and unique
+buyers. Unique buyers are not additive, so each row also stores the distinct
+buyer ids seen that day (``buyer_ids``). That state is mergeable: new orders
+are folded in by array union, so a day is updated without rescanning it.
+A HyperLogLog sketch of the same buyers (``buyer_sketch``) is kept alongside
+for range queries, where merging exact id lists would not stay bounded.
+
+Each run:
+1. Recomputes the trailing ``ETL_RECOMPUTE_DAYS`` days from that window's
+   orders only, which picks up status changes such as cancellations.
+2. Merges orders above the ``order_id`` watermark that belong to older days
+   (late-arriving rows) into their existing rows.
+
+The first run (no watermark yet) recomputes every day instead: rows that
+predate the job have no ``buyer_ids`` and may already count some orders, so
+merging into them would double count.
+
+Cancelled orders are excluded. Cancellations older than the recompute window
+are only reflected after ``--rebuild-from``.
+
+    python -m backend.jobs.category_metrics_etl [--rebuild-from YYYY-MM-DD]
+"""
+
+import argparse
+from datetime import date, timedelta
+from typing import Optional
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import get_watermark, set_watermark, try_job_lock
+
+JOB_NAME = "category_daily_metrics_etl"
+ETL_RECOMPUTE_DAYS = 3
+ETL_SAFETY_LAG = "1 minute"
+
+
+async def run_category_metrics_etl(rebuild_from: Optional[date] = None) -> dict:
+    since = rebuild_from or (date.today() - timedelta(days=ETL_RECOMPUTE_DAYS - 1))
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            low = await get_watermark(cur, JOB_NAME)
+            if low == 0:
+                since = date.min
+            await cur.execute(
+                f'''
+                SELECT COALESCE(MAX(order_id), %s) FROM "Order"
+                WHERE created_at < NOW() - INTERVAL '{ETL_SAFETY_LAG}'
+                ''',
+                (low,),
+            )
+            high = max((await cur.fetchone())[0], low)
+
+            # 1. Recompute the recent window from its own orders
+            await cur.execute('DELETE FROM "CategoryDailyMetrics" WHERE metric_date >= %s', (since,))
+            await cur.execute(
+                '''
+                INSERT INTO "CategoryDailyMetrics"
+                    (metric_date, category, total_orders, total_revenue, avg_order_value, unique_buyers, buyer_ids,
+                     buyer_sketch)
+                SELECT o.created_at::date, s.category,
+                       COUNT(*),
+                       COALESCE(SUM(o.total_price), 0),
+                       COALESCE(AVG(o.total_price), 0),
+                       COUNT(DISTINCT o.client_id),
+                       array_agg(DISTINCT o.client_id ORDER BY o.client_id),
+                       hll_sketch(array_agg(DISTINCT o.client_id::text))
+                FROM "Order" o
+                JOIN "Service" s ON s.service_id = o.service_id
+                WHERE o.created_at >= %s AND o.order_id <= %s AND o.status <> 'cancelled'
+                GROUP BY o.created_at::date, s.category
+                ''',
+                (since, high),
+            )
+            recomputed = cur.rowcount
+
+            # 2. Merge new orders for older days into the stored state
+            await cur.execute(
+                '''
+                WITH agg AS (
+                    SELECT o.created_at::date AS day, s.category,
+                           COUNT(*) AS orders,
+                           COALESCE(SUM(o.total_price), 0) AS revenue,
+                           array_agg(DISTINCT o.client_id ORDER BY o.client_id) AS buyers
+                    FROM "Order" o
+                    JOIN "Service" s ON s.service_id = o.service_id
+                    WHERE o.order_id > %s AND o.order_id <= %s
+                      AND o.created_at < %s AND o.status <> 'cancelled'
+                    GROUP BY o.created_at::date, s.category
+                )
+                INSERT INTO "CategoryDailyMetrics" AS m
+                    (metric_date, category, total_orders, total_revenue, avg_order_value, unique_buyers, buyer_ids,
+                     buyer_sketch)
+                SELECT day, category, orders, revenue, revenue / orders, cardinality(buyers), buyers,
+                       hll_sketch(buyers::text[])
+                FROM agg
+                ON CONFLICT (metric_date, category) DO UPDATE
+                SET total_orders = m.total_orders + EXCLUDED.total_orders,
+                    total_revenue = m.total_revenue + EXCLUDED.total_revenue,
+                    avg_order_value = (m.total_revenue + EXCLUDED.total_revenue)
+                                      / NULLIF(m.total_orders + EXCLUDED.total_orders, 0),
+                    buyer_ids = ARRAY(SELECT DISTINCT b FROM unnest(m.buyer_ids || EXCLUDED.buyer_ids) b ORDER BY b),
+                    unique_buyers = (SELECT COUNT(DISTINCT b) FROM unnest(m.buyer_ids || EXCLUDED.buyer_ids) b),
+                    buyer_sketch = hll_union(m.buyer_sketch, EXCLUDED.buyer_sketch)
+                ''',
+                (low, high, since),
+            )
+            merged = cur.rowcount
+
+            await set_watermark(cur, JOB_NAME, high, recomputed + merged)
+            await conn.commit()
+            return {
+                "job": JOB_NAME,
+                "from_order_id": low,
+                "to_order_id": high,
+                "recomputed_since": since.isoformat(),
+                "rows_recomputed": recomputed,
+                "rows_merged": merged,
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate orders into CategoryDailyMetrics")
+    parser.add_argument("--rebuild-from", type=date.fromisoformat, help="recompute every day from this date on")
+    args = parser.parse_args()
+    print(run_cli(run_category_metrics_etl(rebuild_from=args.rebuild_from)))
@@ -0,0 +1,155 @@
+"""Batch demand multipliers for dynamic pricing.
+
+Each run:
+- counts active orders per service in one grouped query, next to the
+  multiplier of each service's current "PricingHistory" row;
+- maps the counts to multipliers with ``demand_multipliers``, vectorized
+  across all services;
+- writes new "PricingHistory" rows (closing the previous range) only for
+  services whose multiplier moved by ``DEMAND_MULTIPLIER_THRESHOLD`` or more.
+  The row keeps the list price in ``price`` and the multiplier in
+  ``demand_multiplier``; the demand price is their product.
+
+The new row copies its list price from the row it closes and is written only
+if that close succeeded. If a concurrent price edit closes the open row first,
+the service is skipped until the next run, so no second open range with a
+stale price can appear.
+
+"Service".hourly_price is never changed. A manual price edit starts a new
+range at the new list price and carries the current multiplier forward (see
+``record_price_change``).
+
+Curves (``DEMAND_PRICING_CURVE``), with n active orders and
+N = ``DEMAND_ORDERS_FOR_MAX``, each rising from 1.0 to
+``DEMAND_MULTIPLIER_MAX`` at n >= N:
+- ``linear``: proportional to n / N;
+- ``log``: proportional to log(1 + n) / log(1 + N), so the first few orders
+  weigh most;
+- ``step``: linear, rounded down to ``DEMAND_CURVE_STEPS`` equal steps.
+
+    python -m backend.jobs.demand_pricing [--dry-run]
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import set_watermark, try_job_lock
+
+JOB_NAME = "demand_pricing"
+DEMAND_PRICING_INTERVAL = int(os.getenv("DEMAND_PRICING_INTERVAL", "900"))  # seconds
+DEMAND_PRICING_CURVE = os.getenv("DEMAND_PRICING_CURVE", "linear").lower()
+DEMAND_MULTIPLIER_MAX = float(os.getenv("DEMAND_MULTIPLIER_MAX", "1.5"))
+DEMAND_ORDERS_FOR_MAX = int(os.getenv("DEMAND_ORDERS_FOR_MAX", "10"))
+DEMAND_MULTIPLIER_THRESHOLD = float(os.getenv("DEMAND_MULTIPLIER_THRESHOLD", "0.05"))
+DEMAND_CURVE_STEPS = 4
+
+ACTIVE_ORDER_STATUSES = ["pending", "accepted", "in_progress", "revision_requested"]
+DEMAND_CURVES = ("linear", "log", "step")
+
+
+def demand_multipliers(
+    active_orders: np.ndarray,
+    curve: str = DEMAND_PRICING_CURVE,
+    max_multiplier: float = DEMAND_MULTIPLIER_MAX,
+    orders_for_max: int = DEMAND_ORDERS_FOR_MAX,
+) -> np.ndarray:
+    """Multiplier per service from its active order count, rounded to the column's 2 decimals."""
+    n = np.minimum(active_orders.astype(np.float64), orders_for_max)
+    if curve == "linear":
+        level = n / orders_for_max
+    elif curve == "log":
+        level = np.log1p(n) / np.log1p(orders_for_max)
+    elif curve == "step":
+        level = np.floor(n / orders_for_max * DEMAND_CURVE_STEPS) / DEMAND_CURVE_STEPS
+    else:
+        raise ValueError(f"Unknown demand pricing curve: {curve} (expected one of {', '.join(DEMAND_CURVES)})")
+    return np.round(1.0 + (max_multiplier - 1.0) * level, 2)
+
+
+async def run_demand_pricing(dry_run: bool = False) -> dict:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            await cur.execute(
+                '''
+                SELECT s.service_id, COALESCE(a.active_orders, 0),
+                       COALESCE(h.demand_multiplier, 1.0)::float8
+                FROM "Service" s
+                LEFT JOIN (
+                    SELECT service_id, COUNT(*) AS active_orders
+                    FROM "Order"
+                    WHERE status = ANY(%s)
+                    GROUP BY service_id
+                ) a ON a.service_id = s.service_id
+                LEFT JOIN LATERAL (
+                    SELECT demand_multiplier
+                    FROM "PricingHistory" ph
+                    WHERE ph.service_id = s.service_id
+                    ORDER BY ph.effective_from DESC
+                    LIMIT 1
+                ) h ON TRUE
+                WHERE s.hourly_price > 0
+                ''',
+                (ACTIVE_ORDER_STATUSES,),
+            )
+            rows = await cur.fetchall()
+            count = len(rows)
+            service_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=count)
+            active = np.fromiter((r[1] for r in rows), dtype=np.int64, count=count)
+            current = np.fromiter((r[2] for r in rows), dtype=np.float64, count=count)
+
+            multipliers = demand_multipliers(active)
+            # Small tolerance so a 0.05 move in 2-decimal values is not lost to float error
+            changed = np.flatnonzero(np.abs(multipliers - current) >= DEMAND_MULTIPLIER_THRESHOLD - 1e-9)
+
+            if changed.size and not dry_run:
+                await cur.execute(
+                    '''
+                    WITH changed AS (
+                        SELECT * FROM unnest(%s::int[], %s::numeric[], %s::int[])
+                            AS c(service_id, demand_multiplier, active_orders_count)
+                    ), closed AS (
+                        UPDATE "PricingHistory" h
+                        SET effective_until = NOW()
+                        FROM changed c
+                        WHERE h.service_id = c.service_id AND h.effective_until IS NULL
+                        RETURNING h.service_id, h.price
+                    )
+                    INSERT INTO "PricingHistory"
+                        (service_id, price, demand_multiplier, active_orders_count, effective_from, reason)
+                    SELECT c.service_id, cl.price, c.demand_multiplier, c.active_orders_count, NOW(), 'demand'
+                    FROM changed c
+                    JOIN closed cl ON cl.service_id = c.service_id
+                    ''',
+                    (
+                        service_ids[changed].tolist(),
+                        multipliers[changed].tolist(),
+                        active[changed].tolist(),
+                    ),
+                )
+            if dry_run:
+                await conn.rollback()
+            else:
+                await set_watermark(cur, JOB_NAME, 0, int(changed.size))
+                await conn.commit()
+            return {
+                "job": JOB_NAME,
+                "curve": DEMAND_PRICING_CURVE,
+                "services": count,
+                "changed": int(changed.size),
+                "dry_run": dry_run,
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute demand multipliers and record changed prices")
+    parser.add_argument("--dry-run", action="store_true", help="report how many services would change without writing")
+    args = parser.parse_args()
+    print(run_cli(run_demand_pricing(dry_run=args.dry_run)))
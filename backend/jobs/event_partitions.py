@@ -0,0 +1,167 @@
+"""Partition maintenance and retention for "ServiceEvent".
+
+"ServiceEvent" is range-partitioned by month on ``created_at``. This job:
+- creates partitions ``EVENT_PARTITIONS_AHEAD`` months ahead, so inserts never
+  hit a missing range (there is no default partition on purpose: it would make
+  every new partition scan it);
+- drops raw partitions older than ``SERVICE_EVENT_RETENTION_MONTHS`` once the
+  ServiceDailyMetric rollup watermark has passed all of their events.
+
+Existing databases with the old unpartitioned table are converted once with:
+
+    python -m backend.jobs.event_partitions --migrate
+    python -m backend.jobs.event_partitions            # maintenance run
+"""
+
+import argparse
+import os
+from datetime import date
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.service_metrics_rollup import JOB_NAME as ROLLUP_JOB_NAME
+from backend.jobs.watermarks import get_watermark, try_job_lock
+
+JOB_NAME = "service_event_partitions"
+EVENT_PARTITIONS_AHEAD = 3
+SERVICE_EVENT_RETENTION_MONTHS = int(os.getenv("SERVICE_EVENT_RETENTION_MONTHS", "13"))
+PARTITION_PREFIX = "ServiceEvent_y"
+
+
+def _partition_month(name: str) -> date:
+    # ServiceEvent_y2026m10 -> 2026-10-01
+    year, month = name[len(PARTITION_PREFIX):].split("m")
+    return date(int(year), int(month), 1)
+
+
+def _months_ago(today: date, months: int) -> date:
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def run_event_partition_maintenance() -> dict:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            await cur.execute("SELECT ensure_service_event_partitions(0, %s)", (EVENT_PARTITIONS_AHEAD,))
+            created = (await cur.fetchone())[0]
+
+            await cur.execute(
+                '''
+                SELECT c.relname
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                JOIN pg_class p ON p.oid = i.inhparent
+                WHERE p.relname = 'ServiceEvent' AND c.relname LIKE %s
+                ''',
+                (PARTITION_PREFIX + "%",),
+            )
+            partitions = sorted(row[0] for row in await cur.fetchall())
+
+            cutoff = _months_ago(date.today(), SERVICE_EVENT_RETENTION_MONTHS)
+            rolled_up_to = await get_watermark(cur, ROLLUP_JOB_NAME)
+            dropped, kept = [], []
+            for name in partitions:
+                if _partition_month(name) >= cutoff:
+                    continue
+                # Never drop raw events the daily rollup has not consumed yet
+                await cur.execute(f'SELECT MAX(event_id) FROM "{name}"')
+                max_id = (await cur.fetchone())[0]
+                if max_id is not None and max_id > rolled_up_to:
+                    kept.append(name)
+                    continue
+                await cur.execute(f'DROP TABLE "{name}"')
+                dropped.append(name)
+
+            await conn.commit()
+            return {
+                "job": JOB_NAME,
+                "partitions_created": created,
+                "partitions_dropped": dropped,
+                "waiting_for_rollup": kept,
+                "retention_cutoff": cutoff.isoformat(),
+            }
+
+
+async def migrate_to_partitioned() -> dict:
+    """One-off conversion of an unpartitioned "ServiceEvent" table, in a single transaction."""
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                SELECT c.relkind FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE c.relname = 'ServiceEvent' AND n.nspname = current_schema()
+                '''
+            )
+            row = await cur.fetchone()
+            if row is None or row[0] == "p":
+                return {"job": "service_event_migration", "skipped": "already partitioned or missing"}
+
+            await cur.execute('LOCK TABLE "ServiceEvent" IN ACCESS EXCLUSIVE MODE')
+            await cur.execute(
+                '''
+                SELECT COALESCE(
+                    (EXTRACT(YEAR FROM age(date_trunc('month', NOW()), date_trunc('month', MIN(created_at)))) * 12
+                     + EXTRACT(MONTH FROM age(date_trunc('month', NOW()), date_trunc('month', MIN(created_at)))))::INTEGER,
+                    0)
+                FROM "ServiceEvent"
+                '''
+            )
+            months_back = (await cur.fetchone())[0]
+
+            # Index and constraint names are schema-wide, so free them up before recreating
+            await cur.execute('DROP INDEX IF EXISTS idx_service_event_service_time')
+            await cur.execute('DROP INDEX IF EXISTS idx_service_event_type')
+            await cur.execute('ALTER TABLE "ServiceEvent" RENAME TO "ServiceEvent_legacy"')
+            await cur.execute('ALTER INDEX IF EXISTS "ServiceEvent_pkey" RENAME TO "ServiceEvent_legacy_pkey"')
+            await cur.execute(
+                '''
+                CREATE TABLE "ServiceEvent" (
+                    event_id BIGINT NOT NULL DEFAULT nextval('"ServiceEvent_event_id_seq"'),
+                    service_id INTEGER NOT NULL,
+                    user_id INTEGER,
+                    event_type TEXT NOT NULL CHECK (event_type IN ('VIEW', 'CLICK', 'ORDER_CONVERSION', 'CONTACT', 'SEARCH_IMPRESSION')),
+                    metadata JSONB DEFAULT '{}',
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (event_id, created_at)
+                ) PARTITION BY RANGE (created_at)
+                '''
+            )
+            await cur.execute("SELECT ensure_service_event_partitions(%s, %s)", (months_back, EVENT_PARTITIONS_AHEAD))
+            await cur.execute(
+                '''
+                INSERT INTO "ServiceEvent" (event_id, service_id, user_id, event_type, metadata, created_at)
+                SELECT event_id, service_id, user_id, event_type, metadata, created_at FROM "ServiceEvent_legacy"
+                '''
+            )
+            copied = cur.rowcount
+            # SERIAL created an int4 sequence; widen it with the column or nextval() still fails at 2^31
+            await cur.execute('ALTER SEQUENCE "ServiceEvent_event_id_seq" AS bigint')
+            await cur.execute('ALTER SEQUENCE "ServiceEvent_event_id_seq" OWNED BY "ServiceEvent".event_id')
+            await cur.execute('DROP TABLE "ServiceEvent_legacy"')
+            await cur.execute('CREATE INDEX idx_service_event_service_time ON "ServiceEvent"(service_id, created_at)')
+            await cur.execute('CREATE INDEX idx_service_event_type ON "ServiceEvent"(event_type)')
+            await cur.execute(
+                'ALTER TABLE "ServiceEvent" ADD CONSTRAINT serviceevent_service_fk '
+                'FOREIGN KEY (service_id) REFERENCES "Service"(service_id) ON DELETE CASCADE'
+            )
+            await cur.execute(
+                'ALTER TABLE "ServiceEvent" ADD CONSTRAINT serviceevent_user_fk '
+                'FOREIGN KEY (user_id) REFERENCES "User"(user_id) ON DELETE SET NULL'
+            )
+            await conn.commit()
+            return {"job": "service_event_migration", "rows_copied": copied, "months_back": months_back}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain ServiceEvent monthly partitions")
+    parser.add_argument("--migrate", action="store_true", help="convert an unpartitioned ServiceEvent table first")
+    args = parser.parse_args()
+    if args.migrate:
+        print(run_cli(migrate_to_partitioned()))
+    else:
+        print(run_cli(run_event_partition_maintenance()))
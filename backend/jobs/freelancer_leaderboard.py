@@ -0,0 +1,163 @@
+"""Incremental freelancer leaderboard.
+
+Two levels of state:
+
+1. "FreelancerDailyStats": additive counters per (freelancer, category, day of
+   the order) - orders, completions, cancellations, completed earnings,
+   review rating sum/count and first-response time sum/count (time from order
+   creation to the freelancer's first message in it). A run recomputes only
+   the days touched by new orders, new reviews, new messages, or new rows in
+   "OrderStatusChange" (appended by a trigger on every status update, so a
+   completion or cancellation reaches its day however old the order is).
+2. "FreelancerLeaderboard": the ranked rows for the fixed periods in
+   ``LEADERBOARD_PERIODS``, per category and for all categories (''). It is
+   rebuilt from the daily stats, which is small, in the same transaction.
+
+``GET /analytics/top-freelancers`` reads (2) through one index per sort mode
+and falls back to summing (1) for arbitrary date ranges.
+
+    python -m backend.jobs.freelancer_leaderboard [--full]
+"""
+
+import argparse
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import get_watermark, set_watermark, try_job_lock
+
+JOB_NAME = "freelancer_leaderboard"
+LEADERBOARD_PERIODS = {"7d": 7, "30d": 30, "90d": 90, "all": None}
+
+# Source watermarks, one per table the stats are derived from
+_ORDERS = JOB_NAME + ":orders"
+_REVIEWS = JOB_NAME + ":reviews"
+_MESSAGES = JOB_NAME + ":messages"
+_STATUS = JOB_NAME + ":status"
+
+# Per-row derived metrics, shared by the leaderboard rebuild and ad-hoc range queries
+STATS_METRICS = '''
+    SUM(st.total_orders) AS total_orders,
+    SUM(st.completed_orders) AS completed_orders,
+    SUM(st.earnings) AS total_earnings,
+    COALESCE(ROUND(100.0 * SUM(st.completed_orders)
+        / NULLIF(SUM(st.completed_orders) + SUM(st.cancelled_orders), 0), 2), 0) AS completion_rate,
+    ROUND((SUM(st.response_seconds_sum) / NULLIF(SUM(st.response_count), 0) / 3600)::numeric, 2) AS avg_response_hours,
+    ROUND(SUM(st.rating_sum) / NULLIF(SUM(st.rating_count), 0), 2) AS avg_satisfaction
+'''
+
+
+async def run_freelancer_leaderboard(full: bool = False) -> dict:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            marks = {}
+            for name, table, column in (
+                (_ORDERS, '"Order"', "order_id"),
+                (_REVIEWS, '"Review"', "review_id"),
+                (_MESSAGES, '"Messages"', "message_id"),
+                (_STATUS, '"OrderStatusChange"', "change_id"),
+            ):
+                low = 0 if full else await get_watermark(cur, name)
+                await cur.execute(f"SELECT COALESCE(MAX({column}), %s) FROM {table}", (low,))
+                marks[name] = (low, max((await cur.fetchone())[0], low))
+
+            params = {
+                "full": full,
+                "o_low": marks[_ORDERS][0], "o_high": marks[_ORDERS][1],
+                "r_low": marks[_REVIEWS][0], "r_high": marks[_REVIEWS][1],
+                "m_low": marks[_MESSAGES][0], "m_high": marks[_MESSAGES][1],
+                "s_low": marks[_STATUS][0], "s_high": marks[_STATUS][1],
+            }
+            await cur.execute(
+                '''
+                CREATE TEMP TABLE leaderboard_affected ON COMMIT DROP AS
+                SELECT DISTINCT o.freelancer_id, s.category, o.created_at::date AS day
+                FROM "Order" o
+                JOIN "Service" s ON s.service_id = o.service_id
+                WHERE %(full)s
+                   OR (o.order_id > %(o_low)s AND o.order_id <= %(o_high)s)
+                   OR o.order_id IN (SELECT order_id FROM "Review"
+                                     WHERE review_id > %(r_low)s AND review_id <= %(r_high)s)
+                   OR o.order_id IN (SELECT order_id FROM "Messages"
+                                     WHERE message_id > %(m_low)s AND message_id <= %(m_high)s)
+                   OR o.order_id IN (SELECT order_id FROM "OrderStatusChange"
+                                     WHERE change_id > %(s_low)s AND change_id <= %(s_high)s)
+                ''',
+                params,
+            )
+            await cur.execute(
+                '''
+                DELETE FROM "FreelancerDailyStats" st
+                USING leaderboard_affected a
+                WHERE st.freelancer_id = a.freelancer_id AND st.category = a.category AND st.day = a.day
+                '''
+            )
+            await cur.execute(
+                '''
+                INSERT INTO "FreelancerDailyStats"
+                    (freelancer_id, category, day, total_orders, completed_orders, cancelled_orders, earnings,
+                     rating_sum, rating_count, response_seconds_sum, response_count)
+                SELECT a.freelancer_id, a.category, a.day,
+                       COUNT(*),
+                       COUNT(*) FILTER (WHERE o.status = 'completed'),
+                       COUNT(*) FILTER (WHERE o.status = 'cancelled'),
+                       COALESCE(SUM(o.total_price) FILTER (WHERE o.status = 'completed'), 0),
+                       COALESCE(SUM(r.rating), 0),
+                       COUNT(r.rating),
+                       COALESCE(SUM(EXTRACT(EPOCH FROM (fr.first_reply - o.created_at))), 0),
+                       COUNT(fr.first_reply)
+                FROM leaderboard_affected a
+                JOIN "Order" o
+                  ON o.freelancer_id = a.freelancer_id
+                 AND o.created_at >= a.day AND o.created_at < a.day + 1
+                JOIN "Service" s ON s.service_id = o.service_id AND s.category = a.category
+                LEFT JOIN LATERAL (
+                    SELECT AVG(rating) AS rating FROM "Review" WHERE order_id = o.order_id
+                ) r ON TRUE
+                LEFT JOIN LATERAL (
+                    SELECT MIN(created_at) AS first_reply FROM "Messages"
+                    WHERE order_id = o.order_id AND sender_id = o.freelancer_id
+                ) fr ON TRUE
+                GROUP BY a.freelancer_id, a.category, a.day
+                '''
+            )
+            days = cur.rowcount
+
+            # Rebuild the ranked periods; readers keep seeing the previous rows until commit
+            await cur.execute('DELETE FROM "FreelancerLeaderboard"')
+            ranked = 0
+            for period, span in LEADERBOARD_PERIODS.items():
+                await cur.execute(
+                    f'''
+                    INSERT INTO "FreelancerLeaderboard"
+                        (period, category, freelancer_id, total_orders, completed_orders, total_earnings,
+                         completion_rate, avg_rating, avg_response_hours, avg_satisfaction, refreshed_at)
+                    SELECT %s, agg.category, agg.freelancer_id, agg.total_orders, agg.completed_orders,
+                           agg.total_earnings, agg.completion_rate, COALESCE(f.avg_rating, 0),
+                           agg.avg_response_hours, agg.avg_satisfaction, NOW()
+                    FROM (
+                        SELECT COALESCE(st.category, '') AS category, st.freelancer_id, {STATS_METRICS}
+                        FROM "FreelancerDailyStats" st
+                        WHERE %s::int IS NULL OR st.day >= CURRENT_DATE - %s::int
+                        GROUP BY GROUPING SETS ((st.freelancer_id, st.category), (st.freelancer_id))
+                    ) agg
+                    JOIN "Freelancer" f ON f.user_id = agg.freelancer_id
+                    ''',
+                    (period, span, span),
+                )
+                ranked += cur.rowcount
+
+            for name, (_, high) in marks.items():
+                await set_watermark(cur, name, high, days)
+            await conn.commit()
+            return {"job": JOB_NAME, "days_recomputed": days, "leaderboard_rows": ranked}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh freelancer daily stats and leaderboard")
+    parser.add_argument("--full", action="store_true", help="recompute every day from the first order")
+    args = parser.parse_args()
+    print(run_cli(run_freelancer_leaderboard(full=args.full)))
@@ -0,0 +1,187 @@
+"""Price-demand statistics per category.
+
+One grouped query returns every priced service's price and order count. All
+statistics are then computed for every category at once with NumPy group
+sums (``np.bincount`` over category codes), plus a pseudo-category ``''``
+covering all services:
+
+- Pearson correlation of price and order count, with a Fisher-z 95% CI;
+- Spearman rank correlation (tie-averaged ranks within each category), with
+  a Fisher-z CI using the 1.06 / (n - 3) variance;
+- log-log price elasticity: least-squares slope of log(1 + orders) on
+  log(price), with a t-based 95% CI and R^2. ``log1p`` keeps services
+  without orders in the fit.
+
+Results are cached in "PriceDemandStats". The job refreshes them hourly, and
+``GET /pricing-analytics/price-demand-correlation`` only reads the cache;
+admins can force a recompute with ``POST .../price-demand-correlation/refresh``.
+
+    python -m backend.jobs.price_demand
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import set_watermark, try_job_lock
+
+JOB_NAME = "price_demand_stats"
+PRICE_DEMAND_REFRESH_SECONDS = 3600
+PRICE_DEMAND_MIN_SERVICES = 5
+_Z95 = 1.959963984540054
+
+STAT_COLUMNS = (
+    "services", "total_orders",
+    "pearson", "pearson_low", "pearson_high",
+    "spearman", "spearman_low", "spearman_high",
+    "elasticity", "elasticity_low", "elasticity_high", "r_squared",
+)
+
+
+def _group_sum(codes: np.ndarray, values: np.ndarray, groups: int) -> np.ndarray:
+    return np.bincount(codes, weights=values, minlength=groups)
+
+
+def _correlation(codes, x, y, n, groups):
+    """Per-group Pearson r plus the centred sums it was built from."""
+    sx, sy = _group_sum(codes, x, groups), _group_sum(codes, y, groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sxx = _group_sum(codes, x * x, groups) - sx * sx / n
+        syy = _group_sum(codes, y * y, groups) - sy * sy / n
+        sxy = _group_sum(codes, x * y, groups) - sx * sy / n
+        r = sxy / np.sqrt(sxx * syy)
+    return np.clip(r, -1.0, 1.0), sxx, syy, sxy
+
+
+def _group_ranks(codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """1-based ranks of ``values`` within each code, ties sharing their average rank."""
+    order = np.lexsort((values, codes))
+    c, v = codes[order], values[order]
+    size = len(values)
+    # Start of each run of equal (code, value), and of each code
+    run_start = np.flatnonzero(np.r_[True, (c[1:] != c[:-1]) | (v[1:] != v[:-1])])
+    run_end = np.r_[run_start[1:], size]
+    group_start = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+    start_of = group_start[np.searchsorted(group_start, run_start, side="right") - 1]
+    avg_rank = (run_start + run_end - 1) / 2 - start_of + 1
+    ranks = np.empty(size)
+    ranks[order] = np.repeat(avg_rank, run_end - run_start)
+    return ranks
+
+
+def _t_quantile_975(df: np.ndarray) -> np.ndarray:
+    """Two-sided 95% Student t quantile (Cornish-Fisher expansion, within 1% for df >= 3)."""
+    z = _Z95
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (
+            z
+            + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+        )
+
+
+def _fisher_ci(r: np.ndarray, n: np.ndarray, variance_factor: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.arctanh(np.clip(r, -0.999999, 0.999999))
+        half = _Z95 * np.sqrt(variance_factor / (n - 3))
+    return np.tanh(z - half), np.tanh(z + half)
+
+
+def price_demand_stats(codes: np.ndarray, prices: np.ndarray, orders: np.ndarray, groups: int) -> Dict[str, np.ndarray]:
+    """Statistics for each of ``groups`` categories; NaN where a category has too few services."""
+    n = np.bincount(codes, minlength=groups).astype(np.float64)
+    pearson, _, _, _ = _correlation(codes, prices, orders, n, groups)
+    spearman, _, _, _ = _correlation(codes, _group_ranks(codes, prices), _group_ranks(codes, orders), n, groups)
+
+    lx, ly = np.log(prices), np.log1p(orders)
+    _, sxx, syy, sxy = _correlation(codes, lx, ly, n, groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = sxy / sxx
+        residual = np.maximum(syy - slope * sxy, 0.0)
+        slope_se = np.sqrt(residual / (n - 2) / sxx)
+        r_squared = np.where(syy > 0, 1 - residual / syy, np.nan)
+    half = _t_quantile_975(n - 2) * slope_se
+
+    stats = {
+        "services": n,
+        "total_orders": _group_sum(codes, orders, groups),
+        "pearson": pearson,
+        "spearman": spearman,
+        "elasticity": slope,
+        "elasticity_low": slope - half,
+        "elasticity_high": slope + half,
+        "r_squared": r_squared,
+    }
+    stats["pearson_low"], stats["pearson_high"] = _fisher_ci(pearson, n)
+    stats["spearman_low"], stats["spearman_high"] = _fisher_ci(spearman, n, 1.06)
+
+    too_few = n < PRICE_DEMAND_MIN_SERVICES
+    for column in STAT_COLUMNS[2:]:
+        values = stats[column]
+        stats[column] = np.where(too_few | ~np.isfinite(values), np.nan, values)
+    return stats
+
+
+def _to_arrays(rows: List[Tuple]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Codes for each category plus one extra group ('', all services) covering every row."""
+    categories = sorted({row[0] for row in rows})
+    index = {category: i for i, category in enumerate(categories)}
+    count = len(rows)
+    codes = np.fromiter((index[row[0]] for row in rows), dtype=np.int64, count=count)
+    prices = np.fromiter((float(row[1]) for row in rows), dtype=np.float64, count=count)
+    orders = np.fromiter((row[2] for row in rows), dtype=np.float64, count=count)
+    all_code = np.full(count, len(categories), dtype=np.int64)
+    return (
+        categories + [""],
+        np.concatenate([codes, all_code]),
+        np.concatenate([prices, prices]),
+        np.concatenate([orders, orders]),
+    )
+
+
+async def run_price_demand_stats() -> dict:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            await cur.execute(
+                '''
+                SELECT s.category, s.hourly_price, COUNT(o.order_id)
+                FROM "Service" s
+                LEFT JOIN "Order" o ON o.service_id = s.service_id
+                WHERE s.hourly_price > 0
+                GROUP BY s.service_id, s.category, s.hourly_price
+                '''
+            )
+            rows = await cur.fetchall()
+            categories, codes, prices, orders = _to_arrays(rows)
+            stats = price_demand_stats(codes, prices, orders, len(categories))
+
+            await cur.execute('DELETE FROM "PriceDemandStats"')
+            records = []
+            for i, category in enumerate(categories):
+                if stats["services"][i] == 0:
+                    continue
+                values = [None if np.isnan(stats[c][i]) else float(stats[c][i]) for c in STAT_COLUMNS]
+                values[0], values[1] = int(values[0]), int(values[1])
+                records.append((category, *values))
+            if records:
+                await cur.executemany(
+                    f'''
+                    INSERT INTO "PriceDemandStats" (category, {", ".join(STAT_COLUMNS)})
+                    VALUES ({", ".join(["%s"] * (len(STAT_COLUMNS) + 1))})
+                    ''',
+                    records,
+                )
+            await set_watermark(cur, JOB_NAME, 0, len(records))
+            await conn.commit()
+            return {"job": JOB_NAME, "services": len(rows), "categories": len(records)}
+
+
+if __name__ == "__main__":
+    print(run_cli(run_price_demand_stats()))
@@ -0,0 +1,105 @@
+"""Incremental rollup of "ServiceEvent" into "ServiceDailyMetric".
+
+Each run picks up events with ``event_id`` above the persisted watermark,
+finds the (service_id, date) pairs they touch and recomputes those days from
+the raw events, then upserts them. Recomputing whole days keeps the job
+idempotent and handles late events: an event that lands after its day was
+rolled up gets a new id, so its day is simply recomputed on the next run.
+Each day also stores a HyperLogLog sketch of its signed-in viewers
+(``viewer_sketch``) so unique viewers over a range are a sketch merge.
+
+Events newer than ``ROLLUP_SAFETY_LAG`` are left for the next run so that
+transactions still in flight (which may hold lower ids) are not skipped.
+
+Runs on the in-app scheduler, or manually:
+
+    python -m backend.jobs.service_metrics_rollup [--full]
+"""
+
+import argparse
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import get_watermark, set_watermark, try_job_lock
+
+JOB_NAME = "service_daily_metric_rollup"
+ROLLUP_SAFETY_LAG = "1 minute"
+ROLLUP_MAX_EVENTS = 200000  # events per run; larger backlogs catch up over several runs
+
+
+async def run_service_metrics_rollup(full: bool = False) -> dict:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            low = 0 if full else await get_watermark(cur, JOB_NAME)
+            await cur.execute(
+                f'''
+                SELECT MAX(event_id) FROM (
+                    SELECT event_id FROM "ServiceEvent"
+                    WHERE event_id > %s AND created_at < NOW() - INTERVAL '{ROLLUP_SAFETY_LAG}'
+                    ORDER BY event_id
+                    LIMIT %s
+                ) batch
+                ''',
+                (low, ROLLUP_MAX_EVENTS),
+            )
+            high = (await cur.fetchone())[0]
+            if high is None:
+                await conn.rollback()
+                return {"job": JOB_NAME, "from_event_id": low, "to_event_id": low, "days_upserted": 0}
+
+            await cur.execute(
+                '''
+                WITH affected AS (
+                    SELECT DISTINCT service_id, created_at::date AS day
+                    FROM "ServiceEvent"
+                    WHERE event_id > %(low)s AND event_id <= %(high)s
+                ),
+                counts AS (
+                    SELECT a.service_id, a.day,
+                           COUNT(*) FILTER (WHERE e.event_type = 'VIEW') AS views,
+                           COUNT(*) FILTER (WHERE e.event_type = 'CLICK') AS clicks,
+                           COUNT(*) FILTER (WHERE e.event_type = 'ORDER_CONVERSION') AS orders,
+                           COUNT(*) FILTER (WHERE e.event_type = 'SEARCH_IMPRESSION') AS impressions,
+                           hll_sketch(array_agg(DISTINCT e.user_id::text)
+                                      FILTER (WHERE e.event_type = 'VIEW' AND e.user_id IS NOT NULL)) AS viewers
+                    FROM affected a
+                    JOIN "ServiceEvent" e
+                      ON e.service_id = a.service_id
+                     AND e.created_at >= a.day AND e.created_at < a.day + 1
+                    GROUP BY a.service_id, a.day
+                )
+                INSERT INTO "ServiceDailyMetric"
+                    (service_id, date, views_count, clicks_count, orders_count, impressions_count, ctr, conversion_rate,
+                     viewer_sketch)
+                SELECT service_id, day, views, clicks, orders, impressions,
+                       CASE WHEN impressions > 0 THEN LEAST(clicks::DECIMAL / impressions, 1) ELSE 0 END,
+                       CASE WHEN views > 0 THEN LEAST(orders::DECIMAL / views, 1) ELSE 0 END,
+                       viewers
+                FROM counts
+                ON CONFLICT (service_id, date) DO UPDATE
+                SET views_count = EXCLUDED.views_count,
+                    clicks_count = EXCLUDED.clicks_count,
+                    orders_count = EXCLUDED.orders_count,
+                    impressions_count = EXCLUDED.impressions_count,
+                    ctr = EXCLUDED.ctr,
+                    conversion_rate = EXCLUDED.conversion_rate,
+                    viewer_sketch = EXCLUDED.viewer_sketch
+                ''',
+                {"low": low, "high": high},
+            )
+            days = cur.rowcount
+
+            await set_watermark(cur, JOB_NAME, high, days)
+            await conn.commit()
+            return {"job": JOB_NAME, "from_event_id": low, "to_event_id": high, "days_upserted": days}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll ServiceEvent up into ServiceDailyMetric")
+    parser.add_argument("--full", action="store_true", help="recompute every day from the first event")
+    args = parser.parse_args()
+    print(run_cli(run_service_metrics_rollup(full=args.full)))
@@ -0,0 +1,93 @@
+"""Daily package tier counts from "ServiceTierEvent".
+
+Every tier change on "Service" is appended to "ServiceTierEvent" by a trigger
+(created, tier changed, deleted). Each run takes the events above the
+persisted watermark and adds them to ``net_change`` in "ServiceTierDaily" as
+per-(day, tier) deltas: +1 for the new tier, -1 for the old one. It then
+recomputes the running ``service_count`` from the earliest affected day
+onwards, so late events land on the right day. The table has one row per
+day with a change per tier, so ``GET /pricing-analytics/premium-adoption``
+reads a few hundred rows instead of scanning "Service".
+
+Events newer than ``TIER_ROLLUP_SAFETY_LAG`` wait for the next run, so that
+transactions still in flight (which may hold lower ids) are not skipped.
+
+    python -m backend.jobs.tier_rollup [--full]
+"""
+
+import argparse
+
+from backend.db import get_connection
+from backend.jobs import run_cli
+from backend.jobs.watermarks import get_watermark, set_watermark, try_job_lock
+
+JOB_NAME = "service_tier_rollup"
+TIER_ROLLUP_SAFETY_LAG = "1 minute"
+
+
+async def run_tier_rollup(full: bool = False) -> dict:
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            if not await try_job_lock(cur, JOB_NAME):
+                await conn.rollback()
+                return {"job": JOB_NAME, "skipped": "already running"}
+
+            low = 0 if full else await get_watermark(cur, JOB_NAME)
+            await cur.execute(
+                f'''
+                SELECT MAX(event_id), MIN(changed_at)::date FROM "ServiceTierEvent"
+                WHERE event_id > %s AND changed_at < NOW() - INTERVAL '{TIER_ROLLUP_SAFETY_LAG}'
+                ''',
+                (low,),
+            )
+            high, from_day = await cur.fetchone()
+            if high is None:
+                await conn.rollback()
+                return {"job": JOB_NAME, "from_event_id": low, "to_event_id": low, "days_updated": 0}
+
+            if full:
+                await cur.execute('DELETE FROM "ServiceTierDaily"')
+            await cur.execute(
+                '''
+                WITH deltas AS (
+                    SELECT changed_at::date AS day, new_tier AS tier, 1 AS delta
+                    FROM "ServiceTierEvent"
+                    WHERE event_id > %(low)s AND event_id <= %(high)s AND new_tier IS NOT NULL
+                    UNION ALL
+                    SELECT changed_at::date, old_tier, -1
+                    FROM "ServiceTierEvent"
+                    WHERE event_id > %(low)s AND event_id <= %(high)s AND old_tier IS NOT NULL
+                )
+                INSERT INTO "ServiceTierDaily" (day, tier, net_change)
+                SELECT day, tier, SUM(delta) FROM deltas GROUP BY day, tier
+                ON CONFLICT (day, tier) DO UPDATE
+                SET net_change = "ServiceTierDaily".net_change + EXCLUDED.net_change
+                ''',
+                {"low": low, "high": high},
+            )
+            await cur.execute(
+                '''
+                UPDATE "ServiceTierDaily" d
+                SET service_count = r.running
+                FROM (
+                    SELECT day, tier, SUM(net_change) OVER (PARTITION BY tier ORDER BY day) AS running
+                    FROM "ServiceTierDaily"
+                ) r
+                WHERE d.day = r.day AND d.tier = r.tier
+                  AND d.day >= %s
+                  AND d.service_count IS DISTINCT FROM r.running
+                ''',
+                (from_day,),
+            )
+            days = cur.rowcount
+
+            await set_watermark(cur, JOB_NAME, high, days)
+            await conn.commit()
+            return {"job": JOB_NAME, "from_event_id": low, "to_event_id": high, "days_updated": days}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll ServiceTierEvent up into ServiceTierDaily")
+    parser.add_argument("--full", action="store_true", help="rebuild every day from the first event")
+    args = parser.parse_args()
+    print(run_cli(run_tier_rollup(full=args.full)))
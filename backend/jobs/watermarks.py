@@ -0,0 +1,37 @@
+"""Persisted progress markers for incremental analytics jobs.
+
+Each job stores how far it has processed its source (usually the last event
+or order id) in "AnalyticsJobWatermark", and updates it in the same
+transaction as the rows it produced, so a crash never skips or double-counts.
+"""
+
+from typing import Optional
+
+
+async def try_job_lock(cur, job_name: str) -> bool:
+    """Take a transaction-scoped advisory lock so only one worker runs ``job_name`` at a time."""
+    await cur.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (job_name,))
+    return (await cur.fetchone())[0]
+
+
+async def get_watermark(cur, job_name: str) -> int:
+    await cur.execute(
+        'SELECT last_processed_id FROM "AnalyticsJobWatermark" WHERE job_name = %s',
+        (job_name,),
+    )
+    row = await cur.fetchone()
+    return row[0] if row else 0
+
+
+async def set_watermark(cur, job_name: str, last_processed_id: int, rows_affected: Optional[int] = None):
+    await cur.execute(
+        '''
+        INSERT INTO "AnalyticsJobWatermark" (job_name, last_processed_id, last_run_at, last_rows_affected)
+        VALUES (%s, %s, NOW(), %s)
+        ON CONFLICT (job_name) DO UPDATE
+        SET last_processed_id = EXCLUDED.last_processed_id,
+            last_run_at = EXCLUDED.last_run_at,
+            last_rows_affected = EXCLUDED.last_rows_affected
+        ''',
+        (job_name, last_processed_id, rows_affected),
+    )
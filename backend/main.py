@@ -19,6 +19,7 @@ from backend.routers import (
     messages,
     disputes,
     analytics,
+    analytics_export,
     admin_disputes,
     withdrawals,
     earnings,
@@ -39,13 +40,47 @@ app = FastAPI(title="Hirely API", version="0.1.0")
 
 # Initialize database connection pool on startup/shutdown
 from backend.db import init_pool, close_pool
+from backend.core.read_receipts import read_receipts
+from backend.core.backplane import backplane
+from backend.core.event_buffer import event_buffer
+from backend.core.scheduler import scheduler
+from backend.jobs.service_metrics_rollup import run_service_metrics_rollup
+from backend.jobs.category_metrics_etl import run_category_metrics_etl
+from backend.jobs.event_partitions import run_event_partition_maintenance
+from backend.jobs.freelancer_leaderboard import run_freelancer_leaderboard
+from backend.jobs.category_anomalies import run_category_anomaly_detection
+from backend.jobs.category_forecast import run_category_forecast
+from backend.jobs.demand_pricing import DEMAND_PRICING_INTERVAL, run_demand_pricing
+from backend.jobs.tier_rollup import run_tier_rollup
+from backend.jobs.price_demand import PRICE_DEMAND_REFRESH_SECONDS, run_price_demand_stats
+from backend.jobs.analytics_summary import SUMMARY_REFRESH_SECONDS, run_analytics_summary_snapshot
+
+scheduler.every("service_daily_metric_rollup", 300, run_service_metrics_rollup)
+scheduler.every("category_daily_metrics_etl", 900, run_category_metrics_etl)
+scheduler.every("analytics_summary_snapshot", SUMMARY_REFRESH_SECONDS, run_analytics_summary_snapshot)
+scheduler.every("freelancer_leaderboard", 900, run_freelancer_leaderboard)
+scheduler.every("category_anomaly_detection", 86400, run_category_anomaly_detection, initial_delay=60)
+scheduler.every("category_revenue_forecast", 3600, run_category_forecast, initial_delay=90)
+scheduler.every("price_demand_stats", PRICE_DEMAND_REFRESH_SECONDS, run_price_demand_stats, initial_delay=120)
+scheduler.every("demand_pricing", DEMAND_PRICING_INTERVAL, run_demand_pricing, initial_delay=150)
+scheduler.every("service_tier_rollup", 900, run_tier_rollup, initial_delay=180)
+scheduler.every("service_event_partitions", 86400, run_event_partition_maintenance, initial_delay=30)
 
 @app.on_event("startup")
 async def _on_startup():
     await init_pool()
+    read_receipts.start()
+    event_buffer.start()
+    scheduler.start()
+    await backplane.start(messages.manager.handle_remote)
 
 @app.on_event("shutdown")
 async def _on_shutdown():
+    # Flush buffered writes before the pool goes away
+    await scheduler.stop()
+    await backplane.stop()
+    await read_receipts.stop()
+    await event_buffer.stop()
     await close_pool()
 
 # CORS for local dev (allow common localhost origins)
@@ -77,6 +112,7 @@ app.include_router(orders.router, prefix="/api")
 app.include_router(messages.router, prefix="/api")
 app.include_router(disputes.router, prefix="/api")
 app.include_router(analytics.router, prefix="/api")
+app.include_router(analytics_export.router, prefix="/api")
 app.include_router(admin_disputes.router, prefix="/api")
 app.include_router(withdrawals.router)
 app.include_router(earnings.router, prefix="/api")
@@ -1,9 +1,14 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import date, datetime, timedelta
 from backend.db import get_connection
-from backend.schemas.analytics import ServiceEventCreate, DailyMetricResponse, FreelancerAnalyticsSummary, EventType
+from backend.core.hll import HLL_STATS_SQL, hll_estimate
+from backend.schemas.analytics import (
+    ServiceEventCreate, DailyMetricResponse, FreelancerAnalyticsSummary, EventType, FunnelResponse
+)
 import json
 
+FUNNEL_STEPS = [EventType.VIEW, EventType.CLICK, EventType.CONTACT, EventType.ORDER_CONVERSION]
+
 class AnalyticsRepository:
     @staticmethod
     async def create_event(event: ServiceEventCreate, user_id: Optional[int] = None) -> int:
@@ -21,6 +26,28 @@ class AnalyticsRepository:
                 await conn.commit()
                 return event_id
 
+    @staticmethod
+    async def create_events(events: List[ServiceEventCreate], user_id: Optional[int] = None) -> int:
+        """Insert many events with a single COPY in one transaction. Returns the number written."""
+        return await AnalyticsRepository.copy_event_rows(
+            [(event.service_id, user_id, event.event_type.value, json.dumps(event.metadata or {})) for event in events]
+        )
+
+    @staticmethod
+    async def copy_event_rows(rows: List[Tuple[int, Optional[int], str, str]]) -> int:
+        """COPY pre-built (service_id, user_id, event_type, metadata_json) rows into "ServiceEvent"."""
+        if not rows:
+            return 0
+        async with get_connection() as conn:
+            async with conn.cursor() as cur:
+                async with cur.copy(
+                    'COPY "ServiceEvent" (service_id, user_id, event_type, metadata) FROM STDIN'
+                ) as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+                await conn.commit()
+        return len(rows)
+
     @staticmethod
     async def get_daily_metrics(service_id: int, start_date: date, end_date: date) -> List[DailyMetricResponse]:
         async with get_connection() as conn:
@@ -76,6 +103,21 @@ class AnalyticsRepository:
                     (service_id, start_date, end_date)
                 )
                 row = await cur.fetchone()
+
+                # Unique viewers over the range: merge the per-day HyperLogLog sketches
+                await cur.execute(
+                    f"""
+                    SELECT {HLL_STATS_SQL}
+                    FROM (
+                        SELECT MAX(v) AS v
+                        FROM "ServiceDailyMetric" m, unnest(m.viewer_sketch) v
+                        WHERE m.service_id = %s AND m.date BETWEEN %s AND %s
+                        GROUP BY v >> 6
+                    ) registers
+                    """,
+                    (service_id, start_date, end_date)
+                )
+                unique_viewers = hll_estimate(*(await cur.fetchone()))
                 return FreelancerAnalyticsSummary(
                     total_views=row[0],
                     total_clicks=row[1],
@@ -85,5 +127,110 @@ class AnalyticsRepository:
                     avg_rating=float(row[5]) if row[5] is not None else None,
                     total_earnings=float(row[6]),
                     total_impressions=row[7] if len(row) > 7 else 0,
-                    avg_ctr=float(row[8]) if len(row) > 8 and row[8] is not None else 0.0
+                    avg_ctr=float(row[8]) if len(row) > 8 and row[8] is not None else 0.0,
+                    unique_viewers=unique_viewers
+                )
+
+    @staticmethod
+    async def get_funnel(scope: str, key: str, start_date: date, end_date: date) -> FunnelResponse:
+        """
+        VIEW -> CLICK -> CONTACT -> ORDER_CONVERSION funnel for one service or category.
+
+        Each signed-in user's journey per service is followed in order: a step only
+        counts if it happens at or after the previous one. Results are cached in
+        "FunnelCache" for the day they were computed; ranges that closed before
+        that day are served from the cache indefinitely.
+        """
+        async with get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    SELECT result, computed_at FROM "FunnelCache"
+                    WHERE scope = %s AND scope_key = %s AND start_date = %s AND end_date = %s
+                      AND (computed_on = CURRENT_DATE OR computed_on > end_date + 1)
+                    """,
+                    (scope, key, start_date, end_date)
+                )
+                cached = await cur.fetchone()
+                if cached:
+                    return FunnelResponse(scope=scope, key=key, start_date=start_date, end_date=end_date,
+                                          steps=cached[0], computed_at=cached[1], cached=True)
+
+                if scope == "service":
+                    scope_join, scope_filter = "", "e.service_id = %(key)s::int"
+                else:
+                    scope_join = 'JOIN "Service" s ON s.service_id = e.service_id'
+                    scope_filter = "s.category = %(key)s"
+                # Each window pass finds the first occurrence of the next step after the previous one
+                step_windows = []
+                previous = "view_at"
+                for step, column in (("CLICK", "click_at"), ("CONTACT", "contact_at"), ("ORDER_CONVERSION", "order_at")):
+                    source = f"s_{previous}"
+                    step_windows.append(
+                        f"""
+                    s_{column} AS (
+                        SELECT *, MIN(created_at) FILTER (WHERE event_type = '{step}' AND created_at >= {previous})
+                                  OVER (PARTITION BY service_id, user_id) AS {column}
+                        FROM {source}
+                    )"""
+                    )
+                    previous = column
+                step_windows_sql = ",".join(step_windows)
+                await cur.execute(
+                    f"""
+                    WITH ev AS (
+                        SELECT e.service_id, e.user_id, e.event_type, e.created_at
+                        FROM "ServiceEvent" e
+                        {scope_join}
+                        WHERE e.created_at >= %(start)s AND e.created_at < %(end)s
+                          AND e.user_id IS NOT NULL
+                          AND e.event_type IN ('VIEW', 'CLICK', 'CONTACT', 'ORDER_CONVERSION')
+                          AND {scope_filter}
+                    ),
+                    s_view_at AS (
+                        SELECT *, MIN(created_at) FILTER (WHERE event_type = 'VIEW')
+                                  OVER (PARTITION BY service_id, user_id) AS view_at
+                        FROM ev
+                    ),{step_windows_sql},
+                    journeys AS (
+                        SELECT DISTINCT service_id, user_id, view_at, click_at, contact_at, order_at
+                        FROM s_order_at
+                        WHERE view_at IS NOT NULL
+                    )
+                    SELECT COUNT(view_at), COUNT(click_at), COUNT(contact_at), COUNT(order_at),
+                           percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM click_at - view_at)),
+                           percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM contact_at - click_at)),
+                           percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM order_at - contact_at))
+                    FROM journeys
+                    """,
+                    {"key": key, "start": start_date, "end": end_date + timedelta(days=1)}
                 )
+                row = await cur.fetchone()
+                counts, medians = row[:4], [None] + list(row[4:])
+
+                steps = []
+                for i, step in enumerate(FUNNEL_STEPS):
+                    steps.append({
+                        "step": step.value,
+                        "users": counts[i],
+                        "conversion_from_previous": (counts[i] / counts[i - 1] if counts[i - 1] else None) if i else None,
+                        "conversion_from_start": counts[i] / counts[0] if counts[0] else None,
+                        "median_seconds_from_previous": float(medians[i]) if medians[i] is not None else None,
+                    })
+
+                await cur.execute(
+                    """
+                    INSERT INTO "FunnelCache" (scope, scope_key, start_date, end_date, computed_on, computed_at, result)
+                    VALUES (%s, %s, %s, %s, CURRENT_DATE, NOW(), %s)
+                    ON CONFLICT (scope, scope_key, start_date, end_date) DO UPDATE
+                    SET computed_on = EXCLUDED.computed_on,
+                        computed_at = EXCLUDED.computed_at,
+                        result = EXCLUDED.result
+                    RETURNING computed_at
+                    """,
+                    (scope, key, start_date, end_date, json.dumps(steps))
+                )
+                computed_at = (await cur.fetchone())[0]
+                await conn.commit()
+                return FunnelResponse(scope=scope, key=key, start_date=start_date, end_date=end_date,
+                                      steps=steps, computed_at=computed_at, cached=False)
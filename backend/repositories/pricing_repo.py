@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+UNDERCUTTING_NOTIFICATION_TYPE = "undercutting_alert"
+
+
+async def refresh_undercutting_alert(cur, service_id: int) -> Optional[float]:
+    """
+    Upsert or delete ``service_id``'s undercutting alert inside the caller's transaction, after a price write.
+
+    Only this service's row is touched; other services in the category are compared against the
+    live average when read. If the new price crosses a subscriber's threshold (it was not past it
+    before), that admin gets a "Notification". Returns the service's new percentage below the
+    category average, or None if it is not below it.
+    """
+    await cur.execute('SELECT price_diff_pct FROM "UndercuttingAlert" WHERE service_id = %s', (service_id,))
+    row = await cur.fetchone()
+    previous = row[0] if row else None
+
+    await cur.execute('SELECT refresh_undercutting_alert(%s)', (service_id,))
+    row = await cur.fetchone()
+    if not row or row[0] is None:
+        return None
+
+    await cur.execute(
+        '''
+        SELECT a.price_diff_pct, a.service_price, a.category_avg, a.category, s.title
+        FROM "UndercuttingAlert" a
+        JOIN "Service" s ON s.service_id = a.service_id
+        WHERE a.service_id = %s
+        ''',
+        (service_id,),
+    )
+    row = await cur.fetchone()
+    if not row:
+        return None
+    pct, price, avg, category, title = row
+    await cur.execute(
+        '''
+        INSERT INTO "Notification" (user_id, type, message, created_at, is_read)
+        SELECT admin_id, %s, %s, NOW(), FALSE
+        FROM "UndercuttingAlertSubscription"
+        WHERE threshold_pct <= %s
+          AND (%s::float8 IS NULL OR threshold_pct > %s::float8)
+          AND (category IS NULL OR category = %s)
+        ''',
+        (
+            UNDERCUTTING_NOTIFICATION_TYPE,
+            f'Service #{service_id} "{title}" is priced at ${float(price):.2f}, '
+            f'{pct:.1f}% below the {category} average of ${float(avg):.2f}',
+            pct, previous, previous, category,
+        ),
+    )
+    return pct
+
+
+async def record_price_change(cur, service_id: int, price, reason: str) -> bool:
+    """
+    Write-through "PricingHistory": close the open range and start a new one at NOW().
+    ``price`` is the list price; the open range's demand multiplier carries over to the new one.
+    Does nothing if ``price`` is already the list price in effect. Returns whether a row was written.
+    """
+    await cur.execute(
+        '''
+        WITH open_range AS (
+            SELECT price, demand_multiplier, active_orders_count FROM "PricingHistory"
+            WHERE service_id = %(service_id)s AND effective_until IS NULL
+            ORDER BY effective_from DESC
+            LIMIT 1
+        ), closed AS (
+            UPDATE "PricingHistory"
+            SET effective_until = NOW()
+            WHERE service_id = %(service_id)s AND effective_until IS NULL
+              AND NOT EXISTS (SELECT 1 FROM open_range WHERE price = %(price)s)
+        )
+        INSERT INTO "PricingHistory" (service_id, price, demand_multiplier, active_orders_count, effective_from, reason)
+        SELECT %(service_id)s, %(price)s,
+               COALESCE((SELECT demand_multiplier FROM open_range), 1.0),
+               COALESCE((SELECT active_orders_count FROM open_range), 0),
+               NOW(), %(reason)s
+        WHERE NOT EXISTS (SELECT 1 FROM open_range WHERE price = %(price)s)
+        ''',
+        {"service_id": service_id, "price": price, "reason": reason},
+    )
+    return cur.rowcount > 0
+
+
+async def price_as_of(cur, service_id: int, at: datetime) -> Optional[Tuple]:
+    """The "PricingHistory" row in effect at ``at``: (history_id, price, demand_multiplier,
+    active_orders_count, effective_from, effective_until, reason), or None before the first one."""
+    await cur.execute(
+        '''
+        SELECT history_id, price, demand_multiplier, active_orders_count, effective_from, effective_until, reason
+        FROM "PricingHistory"
+        WHERE service_id = %s AND effective_from <= %s
+        ORDER BY effective_from DESC
+        LIMIT 1
+        ''',
+        (service_id, at),
+    )
+    return await cur.fetchone()
@@ -1,56 +1,238 @@
 from datetime import datetime, date, timedelta
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional, Dict, Any, Union
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 
 from backend.db import get_connection
 from backend.schemas.analytics import (
     AnalyticsSummary, CategoryMetric, AnalyticsSnapshot,
     ServiceEventCreate, DailyMetricResponse, FreelancerAnalyticsSummary,
-    CategoryTrendMetric, CategoryGrowthMetric, CategoryMetadataUpdate, CategoryMetadataResponse
+    CategoryTrendMetric, CategoryGrowthMetric, CategoryMetadataUpdate, CategoryMetadataResponse,
+    CategoryTrendSeries, CategoryTrendColumns, DailyMetricColumns, FunnelResponse, CategoryAnomaly,
+    CategoryForecast, ForecastPoint
 )
 from backend.repositories.analytics_repo import AnalyticsRepository
 from backend.core.security import get_current_user, get_current_user_optional
+from backend.core.rate_limit import RateLimiter, analytics_event_limiter, analytics_limiter
+from backend.core.event_buffer import event_buffer
+from backend.core.hll import HLL_STATS_SQL, hll_estimate
+from backend.core.timeseries import date_buckets, downsample, fill_gaps as fill_gaps_to, to_columns, to_rows
+from backend.jobs.analytics_summary import (
+    JOB_NAME as SUMMARY_JOB_NAME, SUMMARY_REFRESH_SECONDS, latest_summary_snapshot, write_summary_snapshot
+)
+from backend.jobs.category_anomalies import ANOMALY_METRICS, ANOMALY_REPORT_DAYS
+from backend.jobs.category_forecast import forecast as forecast_revenue
+from backend.jobs.freelancer_leaderboard import LEADERBOARD_PERIODS, STATS_METRICS
+from backend.jobs.watermarks import try_job_lock
 from backend.schemas.user import UserResponse
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+MAX_EVENTS_PER_BATCH = 1000
+MAX_SERIES_POINTS = 5000
+MAX_FORECAST_DAYS = 90
+
+TREND_FIELDS = ["total_orders", "total_revenue", "avg_order_value", "unique_buyers"]
+DAILY_METRIC_FIELDS = [
+    "views_count", "clicks_count", "orders_count", "impressions_count", "conversion_rate", "ctr",
+    "avg_response_time", "avg_rating", "total_earnings",
+]
+# Days without a rollup row had no activity: zero counters, unknown averages
+DAILY_METRIC_DEFAULTS = {
+    "views_count": 0, "clicks_count": 0, "orders_count": 0, "impressions_count": 0,
+    "conversion_rate": 0.0, "ctr": 0.0, "avg_response_time": None, "avg_rating": None, "total_earnings": 0.0,
+}
+
+
+async def _enforce_ingest_limit(request: Request, current_user: Optional[UserResponse], limiter: RateLimiter = analytics_limiter):
+    # Anonymous traffic is limited per client address
+    key = current_user.user_id if current_user else (request.client.host if request.client else "anonymous")
+    if not await limiter.check(key):
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: max {limiter.max_requests} tracking requests per {limiter.window_seconds} seconds",
+        )
+
 
-@router.get("/categories/trends", response_model=List[CategoryTrendMetric])
+@router.get("/categories/trends", response_model=Union[List[CategoryTrendMetric], CategoryTrendColumns])
 async def get_category_trends(
     start_date: date = Query(..., description="Start date for the range"),
     end_date: date = Query(..., description="End date for the range"),
-    categories: Optional[List[str]] = Query(None, description="List of categories to filter by")
+    categories: Optional[List[str]] = Query(None, description="List of categories to filter by"),
+    granularity: str = Query("day", enum=["day", "week", "month"], description="Bucket size; buckets are labelled by their first day"),
+    format: str = Query("rows", enum=["rows", "columnar"], description="One object per row, or parallel arrays per category"),
+    fill_gaps: bool = Query(False, description="Emit zero buckets for periods without orders"),
+    points: Optional[int] = Query(None, ge=3, le=MAX_SERIES_POINTS, description="Downsample each category to at most this many points (LTTB on revenue)"),
 ):
+    """
+    Daily buckets report the exact unique buyers of each day. Weekly and monthly
+    buckets merge the daily HyperLogLog buyer sketches, so their unique_buyers is
+    an estimate with ~2.3% standard error (see backend.core.hll).
+    """
     async with get_connection() as conn:
         async with conn.cursor() as cur:
-            query = """
-                SELECT metric_date, category, total_orders, total_revenue, avg_order_value, unique_buyers
-                FROM "CategoryDailyMetrics"
-                WHERE metric_date BETWEEN %s AND %s
-            """
-            params = [start_date, end_date]
-            
+            params = {"start": start_date, "end": end_date, "categories": categories, "granularity": granularity}
+            where = "metric_date BETWEEN %(start)s AND %(end)s"
             if categories:
-                query += " AND category = ANY(%s)"
-                params.append(categories)
-            
-            query += " ORDER BY metric_date ASC, category ASC"
-            
-            await cur.execute(query, params)
-            rows = await cur.fetchall()
-            
+                where += " AND category = ANY(%(categories)s)"
+
+            if granularity == "day":
+                await cur.execute(
+                    f"""
+                    SELECT metric_date, category, total_orders, total_revenue, avg_order_value, unique_buyers
+                    FROM "CategoryDailyMetrics"
+                    WHERE {where}
+                    ORDER BY metric_date ASC, category ASC
+                    """,
+                    params,
+                )
+                rows = await cur.fetchall()
+            else:
+                await cur.execute(
+                    f"""
+                    WITH sums AS (
+                        SELECT date_trunc(%(granularity)s, metric_date::timestamp)::date AS period, category,
+                               SUM(total_orders) AS orders, SUM(total_revenue) AS revenue
+                        FROM "CategoryDailyMetrics"
+                        WHERE {where}
+                        GROUP BY 1, 2
+                    ),
+                    registers AS (
+                        SELECT date_trunc(%(granularity)s, metric_date::timestamp)::date AS period, category, MAX(v) AS v
+                        FROM "CategoryDailyMetrics", unnest(buyer_sketch) v
+                        WHERE {where}
+                        GROUP BY 1, 2, v >> 6
+                    ),
+                    buyers AS (
+                        SELECT period, category, {HLL_STATS_SQL}
+                        FROM registers
+                        GROUP BY period, category
+                    )
+                    SELECT s.period, s.category, s.orders, s.revenue, b.hll_registers, b.hll_inverse_sum
+                    FROM sums s
+                    LEFT JOIN buyers b ON b.period = s.period AND b.category = s.category
+                    ORDER BY s.period ASC, s.category ASC
+                    """,
+                    params,
+                )
+                rows = [
+                    (period, category, orders, revenue, revenue / orders if orders else 0, hll_estimate(registers, inverse_sum))
+                    for period, category, orders, revenue, registers, inverse_sum in await cur.fetchall()
+                ]
+
+            by_category: Dict[str, list] = {}
+            for row in rows:
+                by_category.setdefault(row[1], []).append({
+                    "date": row[0],
+                    "total_orders": row[2],
+                    "total_revenue": float(row[3]),
+                    "avg_order_value": float(row[4]),
+                    "unique_buyers": row[5],
+                })
+            if fill_gaps:
+                for category in categories or []:
+                    by_category.setdefault(category, [])
+            buckets = date_buckets(start_date, end_date, granularity) if fill_gaps else None
+
+            series = []
+            for category in sorted(by_category):
+                columns = to_columns(by_category[category], TREND_FIELDS)
+                if buckets is not None:
+                    columns = fill_gaps_to(columns, buckets, dict.fromkeys(TREND_FIELDS, 0))
+                series.append((category, downsample(columns, points, by="total_revenue")))
+
+            if format == "columnar":
+                return CategoryTrendColumns(
+                    granularity=granularity,
+                    series=[CategoryTrendSeries(category=category, **columns) for category, columns in series],
+                )
+            return sorted(
+                (CategoryTrendMetric(category=category, **row) for category, columns in series for row in to_rows(columns)),
+                key=lambda metric: (metric.date, metric.category),
+            )
+
+@router.get("/categories/anomalies", response_model=List[CategoryAnomaly])
+async def get_category_anomalies(
+    days: int = Query(ANOMALY_REPORT_DAYS, ge=1, le=ANOMALY_REPORT_DAYS, description="How many recent days to report"),
+    category: Optional[str] = Query(None),
+    metric: Optional[str] = Query(None, enum=list(ANOMALY_METRICS)),
+):
+    """
+    Category days whose revenue or order count deviates from the same-weekday baseline
+    by at least ANOMALY_Z_THRESHOLD rolling standard deviations. Detection runs once per day in
+    the category_anomaly_detection job, not per request; until its first run the list is empty.
+    """
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                SELECT a.metric_date, a.category, a.metric, a.value, a.baseline, a.rolling_mean, a.rolling_std, a.zscore,
+                       COALESCE(m.is_promoted, FALSE), COALESCE(m.recruitment_needed, FALSE)
+                FROM "CategoryAnomaly" a
+                LEFT JOIN "CategoryMetadata" m ON m.category = a.category
+                WHERE a.metric_date >= CURRENT_DATE - %s::int
+                  AND (%s::text IS NULL OR a.category = %s::text)
+                  AND (%s::text IS NULL OR a.metric = %s::text)
+                ORDER BY a.metric_date DESC, ABS(a.zscore) DESC
+                ''',
+                (days, category, category, metric, metric),
+            )
             return [
-                CategoryTrendMetric(
+                CategoryAnomaly(
                     date=row[0],
                     category=row[1],
-                    total_orders=row[2],
-                    total_revenue=float(row[3]),
-                    avg_order_value=float(row[4]),
-                    unique_buyers=row[5]
+                    metric=row[2],
+                    value=row[3],
+                    baseline=row[4],
+                    rolling_mean=row[5],
+                    rolling_std=row[6],
+                    zscore=row[7],
+                    direction="spike" if row[7] > 0 else "drop",
+                    is_promoted=row[8],
+                    recruitment_needed=row[9],
                 )
-                for row in rows
+                for row in await cur.fetchall()
             ]
 
+@router.get("/categories/forecast", response_model=List[CategoryForecast])
+async def get_category_forecast(
+    horizon: int = Query(14, ge=1, le=MAX_FORECAST_DAYS, description="Days to forecast, starting today"),
+    category: Optional[str] = Query(None),
+):
+    """
+    Daily revenue forecast per category from the stored Holt-Winters models.
+    Models are fitted and updated by the category_revenue_forecast job, not per request;
+    until its first run the list is empty.
+    """
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                SELECT category, alpha, beta, gamma, level, trend, season, last_date, rmse, fitted_at
+                FROM "CategoryForecastModel"
+                WHERE %s::text IS NULL OR category = %s::text
+                ORDER BY category
+                ''',
+                (category, category),
+            )
+            rows = await cur.fetchall()
+
+    today = date.today()
+    dates = [today + timedelta(days=i) for i in range(horizon)]
+    result = []
+    for name, alpha, beta, gamma, level, trend, season, last_date, rmse, fitted_at in rows:
+        values = forecast_revenue(level, trend, season, last_date, dates)
+        result.append(CategoryForecast(
+            category=name,
+            last_actual_date=last_date,
+            alpha=alpha,
+            beta=beta,
+            gamma=gamma,
+            rmse=rmse,
+            points=[ForecastPoint(date=d, revenue=round(v, 2)) for d, v in zip(dates, values)],
+            fitted_at=fitted_at,
+        ))
+    return result
+
 @router.get("/categories/growth", response_model=List[CategoryGrowthMetric])
 async def get_category_growth(
     period: str = Query("month", enum=["week", "month"]),
@@ -121,59 +303,39 @@ async def get_category_growth(
             return results
 
 
+def _summary_from_report(row) -> AnalyticsSummary:
+    report_id, report_date, avg_price, dispute_rate, satisfaction, per_category = row
+    return AnalyticsSummary(
+        generated_at=report_date,
+        overall_avg_price=float(avg_price) if avg_price is not None else 0,
+        overall_dispute_rate=float(dispute_rate) if dispute_rate is not None else 0,
+        overall_satisfaction=float(satisfaction) if satisfaction is not None else 0,
+        per_category=[CategoryMetric(**metric) for metric in per_category or []],
+    )
+
+
 @router.get("/summary", response_model=AnalyticsSummary)
-async def analytics_summary():
+async def analytics_summary(
+    max_age: int = Query(
+        SUMMARY_REFRESH_SECONDS * 2, ge=0,
+        description="Maximum age in seconds of the cached snapshot; older snapshots are recomputed (0 forces a refresh)",
+    )
+):
     try:
         async with get_connection() as conn:
             async with conn.cursor() as cur:
-                # Overall metrics
-                await cur.execute('SELECT COALESCE(AVG(total_price), 0) FROM "Order"')
-                avg_price = (await cur.fetchone())[0]
-
-                await cur.execute(
-                    '''
-                    SELECT COALESCE(COUNT(DISTINCT d.dispute_id)::DECIMAL / NULLIF(COUNT(DISTINCT o.order_id), 0), 0)
-                    FROM "Order" o
-                    LEFT JOIN reported r ON o.order_id = r.order_id
-                    LEFT JOIN "Dispute" d ON r.dispute_id = d.dispute_id
-                    '''
-                )
-                dispute_rate = (await cur.fetchone())[0]
-
-                await cur.execute('SELECT COALESCE(AVG(rating), 0) FROM "Review"')
-                satisfaction = (await cur.fetchone())[0]
-
-                # Per category metrics - simplified query
-                await cur.execute(
-                    '''
-                    SELECT s.category,
-                           COALESCE(AVG(s.hourly_price), 0) AS avg_order_price,
-                           0 AS dispute_rate,
-                           COALESCE(s.average_rating, 0) AS avg_rating
-                    FROM "Service" s
-                    GROUP BY s.category, s.average_rating
-                    ORDER BY s.category
-                    '''
-                )
-                cat_rows = await cur.fetchall()
-                per_category: List[CategoryMetric] = []
-                for row in cat_rows:
-                    per_category.append(
-                        CategoryMetric(
-                            category=row[0],
-                            avg_order_price=float(row[1]) if row[1] is not None else 0,
-                            dispute_rate=float(row[2]) if row[2] is not None else 0,
-                            avg_rating=float(row[3]) if row[3] is not None else 0,
-                        )
-                    )
-
-                return AnalyticsSummary(
-                    generated_at=datetime.utcnow(),
-                    overall_avg_price=float(avg_price) if avg_price is not None else 0,
-                    overall_dispute_rate=float(dispute_rate) if dispute_rate is not None else 0,
-                    overall_satisfaction=float(satisfaction) if satisfaction is not None else 0,
-                    per_category=per_category,
-                )
+                row = await latest_summary_snapshot(cur, max_age)
+                if row is None:
+                    if await try_job_lock(cur, SUMMARY_JOB_NAME):
+                        row = await write_summary_snapshot(cur)
+                        await conn.commit()
+                    else:
+                        # Another request or the scheduler is refreshing; serve the previous snapshot
+                        await conn.rollback()
+                        row = await latest_summary_snapshot(cur)
+                if row is None:
+                    raise ValueError("no analytics snapshot available")
+                return _summary_from_report(row)
     except Exception as e:
         print(f"Error in analytics_summary: {e}")
         return AnalyticsSummary(
@@ -190,73 +352,66 @@ async def analytics_snapshot():
     async with get_connection() as conn:
         async with conn.cursor() as cur:
             try:
-                await cur.execute('SELECT AVG(total_price) FROM "Order"')
-                avg_price = (await cur.fetchone())[0]
-
-                await cur.execute(
-                    '''
-                    SELECT COUNT(DISTINCT d.dispute_id)::DECIMAL / NULLIF(COUNT(DISTINCT o.order_id), 0)
-                    FROM "Order" o
-                    LEFT JOIN reported r ON o.order_id = r.order_id
-                    LEFT JOIN "Dispute" d ON r.dispute_id = d.dispute_id
-                    '''
-                )
-                dispute_rate = (await cur.fetchone())[0]
-
-                await cur.execute('SELECT AVG(rating) FROM "Review"')
-                satisfaction = (await cur.fetchone())[0]
-
-                await cur.execute(
-                    'INSERT INTO "AnalyticsReport" (report_date, avg_pricing, avg_dispute_rate, avg_satisfaction) VALUES (NOW(), %s, %s, %s) RETURNING report_id, report_date',
-                    (avg_price, dispute_rate, satisfaction),
-                )
-                row = await cur.fetchone()
+                row = await write_summary_snapshot(cur)
                 await conn.commit()
 
                 return AnalyticsSnapshot(
                     report_id=row[0],
                     report_date=row[1],
-                    avg_pricing=float(avg_price) if avg_price is not None else None,
-                    avg_dispute_rate=float(dispute_rate) if dispute_rate is not None else None,
-                    avg_satisfaction=float(satisfaction) if satisfaction is not None else None,
+                    avg_pricing=float(row[2]) if row[2] is not None else None,
+                    avg_dispute_rate=float(row[3]) if row[3] is not None else None,
+                    avg_satisfaction=float(row[4]) if row[4] is not None else None,
                 )
             except Exception as e:
                 await conn.rollback()
                 raise HTTPException(status_code=400, detail=f"Failed to create analytics snapshot: {str(e)}")
 
 
-@router.post("/events", status_code=201)
+@router.post("/events", status_code=202)
 async def track_event(
     event: ServiceEventCreate,
+    request: Request,
     current_user: Optional[UserResponse] = Depends(get_current_user_optional)
 ):
     """
     Track a service event (view, click, etc.)
+    The event is buffered and written in the next micro-batch, so no event_id is returned.
     """
+    await _enforce_ingest_limit(request, current_user, analytics_event_limiter)
     user_id = current_user.user_id if current_user else None
-    event_id = await AnalyticsRepository.create_event(event, user_id)
-    return {"event_id": event_id, "status": "recorded"}
+    accepted = await event_buffer.submit(event, user_id)
+    return {"status": "queued" if accepted else "dropped"}
 
 @router.post("/events/batch", status_code=201)
 async def track_events_batch(
     events: List[ServiceEventCreate],
+    request: Request,
     current_user: Optional[UserResponse] = Depends(get_current_user_optional)
 ):
     """
     Track multiple service events (e.g. search impressions)
     """
+    await _enforce_ingest_limit(request, current_user)
+    if len(events) > MAX_EVENTS_PER_BATCH:
+        raise HTTPException(status_code=400, detail=f"Too many events in one batch (max {MAX_EVENTS_PER_BATCH})")
     user_id = current_user.user_id if current_user else None
-    # This is not efficient if we do one by one insert, but for now it's okay.
-    # Ideally repo should support batch insert.
-    for event in events:
-        await AnalyticsRepository.create_event(event, user_id)
-    return {"status": "recorded", "count": len(events)}
+    count = await AnalyticsRepository.create_events(events, user_id)
+    return {"status": "recorded", "count": count}
+
+
+@router.get("/events/buffer")
+async def event_buffer_metrics():
+    """Queue depth and counters for the in-process event buffer of this worker."""
+    return event_buffer.metrics()
 
-@router.get("/metrics/{service_id}", response_model=List[DailyMetricResponse])
+@router.get("/metrics/{service_id}", response_model=Union[List[DailyMetricResponse], DailyMetricColumns])
 async def get_service_metrics(
     service_id: int,
     start_date: date = Query(..., description="Start date for metrics"),
     end_date: date = Query(..., description="End date for metrics"),
+    format: str = Query("rows", enum=["rows", "columnar"], description="One object per day, or parallel arrays"),
+    fill_gaps: bool = Query(False, description="Emit zero days for dates without activity"),
+    points: Optional[int] = Query(None, ge=3, le=MAX_SERIES_POINTS, description="Downsample to at most this many points (LTTB on views)"),
     current_user: UserResponse = Depends(get_current_user)
 ):
     """
@@ -265,7 +420,16 @@ async def get_service_metrics(
     """
     # TODO: Verify that current_user owns the service_id
     metrics = await AnalyticsRepository.get_daily_metrics(service_id, start_date, end_date)
-    return metrics
+    if format == "rows" and not fill_gaps and not points:
+        return metrics
+
+    columns = to_columns((metric.model_dump() for metric in metrics), DAILY_METRIC_FIELDS)
+    if fill_gaps:
+        columns = fill_gaps_to(columns, date_buckets(start_date, end_date), DAILY_METRIC_DEFAULTS)
+    columns = downsample(columns, points, by="views_count")
+    if format == "columnar":
+        return DailyMetricColumns(service_id=service_id, **columns)
+    return [DailyMetricResponse(service_id=service_id, **row) for row in to_rows(columns)]
 
 @router.get("/summary/{service_id}", response_model=FreelancerAnalyticsSummary)
 async def get_service_summary(
@@ -282,126 +446,189 @@ async def get_service_summary(
     return summary
 
 
+async def _check_service_access(service_id: int, current_user: UserResponse):
+    """Allow the service's freelancer and admins; 404 for unknown services, 403 for anyone else."""
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                '''
+                SELECT s.freelancer_id, EXISTS (SELECT 1 FROM "Admin" WHERE user_id = %s)
+                FROM "Service" s
+                WHERE s.service_id = %s
+                ''',
+                (current_user.user_id, service_id),
+            )
+            row = await cur.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Service not found")
+    freelancer_id, is_admin = row
+    if freelancer_id != current_user.user_id and not is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to view this service's analytics")
+
+
+MAX_FUNNEL_DAYS = 366
+
+
+def _check_funnel_range(start_date: date, end_date: date):
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days >= MAX_FUNNEL_DAYS:
+        raise HTTPException(status_code=400, detail=f"Funnel range is limited to {MAX_FUNNEL_DAYS} days")
+
+
+@router.get("/funnel/services/{service_id}", response_model=FunnelResponse)
+async def get_service_funnel(
+    service_id: int,
+    start_date: date = Query(..., description="Start date for the funnel"),
+    end_date: date = Query(..., description="End date for the funnel"),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    VIEW -> CLICK -> CONTACT -> ORDER_CONVERSION conversion and median time between steps for a service.
+    """
+    _check_funnel_range(start_date, end_date)
+    await _check_service_access(service_id, current_user)
+    return await AnalyticsRepository.get_funnel("service", str(service_id), start_date, end_date)
+
+
+@router.get("/funnel/categories/{category}", response_model=FunnelResponse)
+async def get_category_funnel(
+    category: str,
+    start_date: date = Query(..., description="Start date for the funnel"),
+    end_date: date = Query(..., description="End date for the funnel"),
+):
+    """
+    Same funnel across every service of a category (journeys are still per service).
+    """
+    _check_funnel_range(start_date, end_date)
+    return await AnalyticsRepository.get_funnel("category", category, start_date, end_date)
+
+
+# ORDER BY for each sort_by mode; each matches an index on "FreelancerLeaderboard"
+LEADERBOARD_SORTS = {
+    "earnings": "total_earnings DESC",
+    "completed_orders": "completed_orders DESC",
+    "rating": "avg_rating DESC",
+    "response_time": "avg_response_hours ASC NULLS LAST",
+    "completion_rate": "completion_rate DESC",
+    "satisfaction": "avg_satisfaction DESC NULLS LAST",
+}
+
+
+def _leaderboard_period(start_date: Optional[date], end_date: Optional[date]) -> Optional[str]:
+    """Name of the precomputed period covering [start_date, today], or None for an ad-hoc range."""
+    today = date.today()
+    if end_date is not None and end_date < today:
+        return None
+    if start_date is None:
+        return "all"
+    for period, span in LEADERBOARD_PERIODS.items():
+        if span is not None and start_date == today - timedelta(days=span):
+            return period
+    return None
+
+
 @router.get("/top-freelancers")
 async def get_top_freelancers(
-    start_date: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
     category: Optional[str] = Query(None),
     limit: int = Query(50, ge=1, le=500),
     sort_by: str = Query("earnings", regex="^(earnings|completed_orders|rating|response_time|completion_rate|satisfaction)$"),
 ):
     """
     Get top-performing freelancers with metrics.
+    Full history and the last 7/30/90 days are served from the precomputed leaderboard;
+    other date ranges are summed from the per-day freelancer stats.
     """
+    filters = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "category": category,
+        "sort_by": sort_by,
+    }
+    order_by = LEADERBOARD_SORTS[sort_by]
+    period = _leaderboard_period(start_date, end_date)
     try:
         async with get_connection() as conn:
             async with conn.cursor() as cur:
-                # Simplified query - just get freelancers with basic info
-                query = """
-                SELECT 
-                    f.user_id,
-                    na.name as username,
-                    u.email,
-                    COALESCE(na.wallet_balance, 0) as wallet_balance,
-                    COALESCE(f.avg_rating, 0) as avg_rating,
-                    COALESCE(f.total_orders, 0) as completed_orders,
-                    COALESCE(f.total_reviews, 0) as total_reviews
-                FROM "Freelancer" f
-                JOIN "User" u ON f.user_id = u.user_id
-                JOIN "NonAdmin" na ON f.user_id = na.user_id
-                ORDER BY f.avg_rating DESC, f.total_orders DESC
-                LIMIT %s
-                """
-                
-                await cur.execute(query, (limit,))
+                if period is not None:
+                    filters["period"] = period
+                    ranked = f'''
+                        SELECT lb.freelancer_id, lb.category, lb.total_orders, lb.completed_orders,
+                               lb.total_earnings, lb.completion_rate, lb.avg_rating,
+                               lb.avg_response_hours, lb.avg_satisfaction
+                        FROM "FreelancerLeaderboard" lb
+                        WHERE lb.period = %s AND lb.category = %s
+                        ORDER BY lb.{order_by}
+                        LIMIT %s
+                    '''
+                    params = (period, category or "", limit)
+                else:
+                    ranked = f'''
+                        SELECT agg.freelancer_id, agg.category, agg.total_orders, agg.completed_orders,
+                               agg.total_earnings, agg.completion_rate, COALESCE(f.avg_rating, 0) AS avg_rating,
+                               agg.avg_response_hours, agg.avg_satisfaction
+                        FROM (
+                            SELECT st.freelancer_id, %s::text AS category, {STATS_METRICS}
+                            FROM "FreelancerDailyStats" st
+                            WHERE (%s::date IS NULL OR st.day >= %s::date)
+                              AND (%s::date IS NULL OR st.day <= %s::date)
+                              AND (%s::text IS NULL OR st.category = %s::text)
+                            GROUP BY st.freelancer_id
+                        ) agg
+                        JOIN "Freelancer" f ON f.user_id = agg.freelancer_id
+                        ORDER BY {order_by}
+                        LIMIT %s
+                    '''
+                    params = (category or "", start_date, start_date, end_date, end_date, category, category, limit)
+
+                await cur.execute(
+                    f'''
+                    WITH ranked AS ({ranked})
+                    SELECT r.*, na.name AS username, u.email, COALESCE(na.wallet_balance, 0) AS wallet_balance
+                    FROM ranked r
+                    JOIN "User" u ON u.user_id = r.freelancer_id
+                    JOIN "NonAdmin" na ON na.user_id = r.freelancer_id
+                    ORDER BY {order_by}
+                    ''',
+                    params,
+                )
                 rows = await cur.fetchall()
-                
+
                 result = []
                 for row in rows:
+                    (user_id, row_category, total_orders, completed_orders, earnings, completion_rate,
+                     avg_rating, response_hours, satisfaction, username, email, wallet_balance) = row
                     result.append({
-                        "user_id": row[0],
-                        "username": row[1],
-                        "email": row[2],
-                        "wallet_balance": float(row[3]) if row[3] is not None else 0,
-                        "category": "General",
-                        "completed_orders": int(row[5]) if row[5] is not None else 0,
-                        "total_earnings": float(row[3]) if row[3] is not None else 0,
-                        "avg_rating": float(row[4]) if row[4] is not None else 0,
-                        "avg_response_time_hours": 0,
-                        "completion_rate_percent": 100.0 if row[5] and row[5] > 0 else 0,
-                        "avg_satisfaction": float(row[4]) if row[4] is not None else 0,
-                        "total_orders_worked": int(row[5]) if row[5] is not None else 0,
+                        "user_id": user_id,
+                        "username": username,
+                        "email": email,
+                        "wallet_balance": float(wallet_balance),
+                        "category": row_category or "All",
+                        "completed_orders": int(completed_orders),
+                        "total_earnings": float(earnings),
+                        "avg_rating": float(avg_rating),
+                        "avg_response_time_hours": float(response_hours) if response_hours is not None else None,
+                        "completion_rate_percent": float(completion_rate),
+                        "avg_satisfaction": float(satisfaction) if satisfaction is not None else None,
+                        "total_orders_worked": int(total_orders),
                     })
-                
+
                 return {
                     "count": len(result),
-                    "filters": {
-                        "start_date": start_date,
-                        "end_date": end_date,
-                        "category": category,
-                        "sort_by": sort_by,
-                    },
+                    "filters": filters,
                     "freelancers": result,
                 }
     except Exception as e:
         print(f"Error in get_top_freelancers: {e}")
         return {
             "count": 0,
-            "filters": {
-                "start_date": start_date,
-                "end_date": end_date,
-                "category": category,
-                "sort_by": sort_by,
-            },
+            "filters": filters,
             "freelancers": [],
         }
 
 
-@router.post("/events")
-async def track_event(event: Dict[str, Any]):
-    """
-    Track analytics events (impressions, views, clicks, conversions).
-    Non-critical endpoint - failures are logged but don't affect user experience.
-    """
-    try:
-        async with get_connection() as conn:
-            async with conn.cursor() as cur:
-                event_type = event.get('type')
-                service_id = event.get('service_id')
-                
-                if event_type and service_id:
-                    # Log to analytics (can be extended later)
-                    pass
-        return {"status": "success"}
-    except Exception as e:
-        # Log errors but don't fail the request
-        print(f"Analytics event tracking error: {str(e)}")
-        return {"status": "logged"}
-
-
-@router.post("/events/batch")
-async def track_events_batch(events: List[Dict[str, Any]]):
-    """
-    Track multiple analytics events in batch.
-    Non-critical endpoint - failures are logged but don't affect user experience.
-    """
-    try:
-        async with get_connection() as conn:
-            async with conn.cursor() as cur:
-                for event in events:
-                    event_type = event.get('type')
-                    service_id = event.get('service_id')
-                    
-                    if event_type and service_id:
-                        # Log to analytics (can be extended later)
-                        pass
-        return {"status": "success", "count": len(events)}
-    except Exception as e:
-        # Log errors but don't fail the request
-        print(f"Analytics batch tracking error: {str(e)}")
-        return {"status": "logged", "count": len(events)}
-
-
 @router.get("/categories/metadata")
 async def get_category_metadata():
     async with get_connection() as conn:
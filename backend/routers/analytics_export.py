@@ -0,0 +1,219 @@
+"""Streaming bulk export of analytics tables.
+
+Rows are read through a server-side (named) cursor on a dedicated connection,
+``EXPORT_CHUNK_ROWS`` at a time, and written to the response as each chunk
+arrives, so memory stays flat however large the range is and long exports
+never hold a connection from the request pool. CSV is always available;
+Parquet and Arrow IPC need the optional ``pyarrow`` package.
+"""
+
+import asyncio
+import csv
+import io
+import os
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+import psycopg
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from backend.db import DATABASE_URL
+from backend.core.security import get_current_admin
+from backend.schemas.user import UserResponse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for parquet/arrow exports
+    pa = None
+    pq = None
+
+router = APIRouter(prefix="/analytics/export", tags=["analytics"])
+
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_MAX_CONCURRENT = int(os.getenv("ANALYTICS_EXPORT_MAX_CONCURRENT", "2"))
+
+_export_slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENT)
+
+# dataset -> (table, date column, [(column name, SQL expression, arrow type)])
+EXPORTS = {
+    "events": (
+        '"ServiceEvent"',
+        "created_at",
+        [
+            ("event_id", "event_id", "int64"),
+            ("service_id", "service_id", "int32"),
+            ("user_id", "user_id", "int32"),
+            ("event_type", "event_type", "string"),
+            ("metadata", "metadata::text", "string"),
+            ("created_at", "created_at", "timestamp"),
+        ],
+    ),
+    "service-daily": (
+        '"ServiceDailyMetric"',
+        "date",
+        [
+            ("service_id", "service_id", "int32"),
+            ("date", "date", "date"),
+            ("views_count", "views_count", "int32"),
+            ("clicks_count", "clicks_count", "int32"),
+            ("orders_count", "orders_count", "int32"),
+            ("impressions_count", "impressions_count", "int32"),
+            ("ctr", "ctr::float8", "float64"),
+            ("conversion_rate", "conversion_rate::float8", "float64"),
+            ("total_earnings", "total_earnings::float8", "float64"),
+        ],
+    ),
+    "category-daily": (
+        '"CategoryDailyMetrics"',
+        "metric_date",
+        [
+            ("metric_date", "metric_date", "date"),
+            ("category", "category", "string"),
+            ("total_orders", "total_orders", "int32"),
+            ("total_revenue", "total_revenue::float8", "float64"),
+            ("avg_order_value", "avg_order_value::float8", "float64"),
+            ("unique_buyers", "unique_buyers", "int32"),
+        ],
+    ),
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _build_query(dataset: str, start_date: date, end_date: date,
+                 service_id: Optional[int], category: Optional[str]) -> Tuple[str, list]:
+    table, date_column, columns = EXPORTS[dataset]
+    select = ", ".join(expr for _, expr, _ in columns)
+    # Half-open range on the date column keeps partition pruning on "ServiceEvent"
+    where = [f"{date_column} >= %s", f"{date_column} < %s"]
+    params: list = [start_date, end_date + timedelta(days=1)]
+    if service_id is not None and dataset != "category-daily":
+        where.append("service_id = %s")
+        params.append(service_id)
+    if category is not None and dataset == "category-daily":
+        where.append("category = %s")
+        params.append(category)
+    return f"SELECT {select} FROM {table} WHERE {' AND '.join(where)} ORDER BY {date_column}", params
+
+
+async def _read_chunks(query: str, params: list):
+    """Yield lists of rows from a server-side cursor on a dedicated read-only connection."""
+    async with _export_slots:
+        async with await psycopg.AsyncConnection.connect(DATABASE_URL) as conn:
+            await conn.set_read_only(True)
+            async with conn.cursor(name="analytics_export") as cur:
+                cur.itersize = EXPORT_CHUNK_ROWS
+                await cur.execute(query, params)
+                while True:
+                    rows = await cur.fetchmany(EXPORT_CHUNK_ROWS)
+                    if not rows:
+                        break
+                    yield rows
+
+
+async def _stream_csv(names: List[str], chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    async for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the response."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+async def _stream_arrow(names: List[str], types: List[str], fmt: str, chunks):
+    arrow_types = {
+        "int32": pa.int32(), "int64": pa.int64(), "float64": pa.float64(), "string": pa.string(),
+        "date": pa.date32(), "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    schema = pa.schema([(name, arrow_types[t]) for name, t in zip(names, types)])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if fmt == "parquet" else pa.ipc.new_stream(sink, schema)
+    try:
+        async for rows in chunks:
+            # One row group / record batch per cursor chunk
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(column, type=schema.field(i).type) for i, column in enumerate(zip(*rows))],
+                schema=schema,
+            )
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+@router.get("/{dataset}")
+async def export_analytics(
+    dataset: str,
+    start_date: date = Query(..., description="First day included"),
+    end_date: date = Query(..., description="Last day included"),
+    format: str = Query("csv", enum=["csv", "parquet", "arrow"]),
+    service_id: Optional[int] = Query(None, description="Only this service (events, service-daily)"),
+    category: Optional[str] = Query(None, description="Only this category (category-daily)"),
+    current_admin: UserResponse = Depends(get_current_admin),
+):
+    """
+    Stream `events`, `service-daily` or `category-daily` rows for a date range.
+    """
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset}' (expected one of {', '.join(EXPORTS)})")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if format != "csv" and pa is None:
+        raise HTTPException(status_code=501, detail="Parquet/Arrow export requires the pyarrow package")
+    if _export_slots.locked():
+        raise HTTPException(status_code=429, detail="Too many exports in progress, try again later")
+
+    _, _, columns = EXPORTS[dataset]
+    names = [name for name, _, _ in columns]
+    query, params = _build_query(dataset, start_date, end_date, service_id, category)
+    chunks = _read_chunks(query, params)
+    if format == "csv":
+        body = _stream_csv(names, chunks)
+    else:
+        body = _stream_arrow(names, [t for _, _, t in columns], format, chunks)
+
+    extension = {"csv": "csv", "parquet": "parquet", "arrow": "arrows"}[format]
+    filename = f"{dataset}_{start_date.isoformat()}_{end_date.isoformat()}.{extension}"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
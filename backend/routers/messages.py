@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, UploadFile, File, Form
 from pathlib import Path
 import shutil
@@ -7,8 +7,12 @@ from datetime import datetime, timedelta
 import os
 from collections import defaultdict
 import asyncio
+import time
 
 from backend.db import get_connection
+from backend.core.rate_limit import message_limiter, upload_limiter
+from backend.core.read_receipts import read_receipts
+from backend.core.backplane import backplane
 from backend.schemas.message import (
     MessageCreate,
     MessagePublic,
@@ -18,30 +22,8 @@ from backend.schemas.message import (
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
-# Rate limiting: In-memory store (user_id -> [timestamps])
-from typing import Union
-rate_limit_store: Dict[Union[str, int], List[datetime]] = {}
-RATE_LIMIT_WINDOW = 60  # seconds
-RATE_LIMIT_MAX_REQUESTS = 30  # max requests per window
-
-def check_rate_limit(user_id: int) -> bool:
-    """Check if user is within rate limits. Returns True if allowed, False if exceeded."""
-    now = datetime.now()
-    cutoff = now - timedelta(seconds=RATE_LIMIT_WINDOW)
-    
-    # Clean old timestamps
-    if user_id not in rate_limit_store:
-        rate_limit_store[user_id] = []
-    
-    rate_limit_store[user_id] = [ts for ts in rate_limit_store[user_id] if ts > cutoff]
-    
-    # Check limit
-    if len(rate_limit_store[user_id]) >= RATE_LIMIT_MAX_REQUESTS:
-        return False
-    
-    # Add current timestamp
-    rate_limit_store[user_id].append(now)
-    return True
+RATE_LIMIT_WINDOW = message_limiter.window_seconds
+RATE_LIMIT_MAX_REQUESTS = message_limiter.max_requests
 
 async def verify_order_participant(cur, order_id: int, user_id: int) -> tuple:
     """Verify user is participant in order and return (client_id, freelancer_id)."""
@@ -51,31 +33,279 @@ async def verify_order_participant(cur, order_id: int, user_id: int) -> tuple:
     return client_id, freelancer_id
 
 # WebSocket Connection Manager
+WS_SEND_QUEUE_SIZE = 100  # messages buffered per socket before it counts as a slow consumer
+WS_SEND_TIMEOUT = 5.0  # seconds a single send may take before the socket is dropped
+WS_HEARTBEAT_INTERVAL = 20  # seconds between server pings
+WS_HEARTBEAT_TIMEOUT = 60  # seconds without any client frame before a socket is reclaimed
+WS_REPLAY_LIMIT = 500  # max missed messages replayed on reconnect
+WS_TYPING_COALESCE = 3.0  # seconds during which repeated identical typing signals are suppressed
+WS_PRESENCE_REFRESH_CHUNK = 400  # (order, user) pairs per presence refresh envelope
+
+
+class ClientConnection:
+    """One connected socket with its own bounded send queue and writer task.
+
+    Broadcasting only enqueues, so a slow or stalled client never delays the
+    other participants or the request that produced the message.
+    """
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, order_id: int, user_id: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.order_id = order_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, message: dict) -> bool:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        self.manager.stats["max_queue_depth"] = max(self.manager.stats["max_queue_depth"], self.queue.qsize())
+        return True
+
+    async def _write_loop(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=WS_SEND_TIMEOUT)
+                self.manager.stats["messages_sent"] += 1
+            except asyncio.TimeoutError:
+                self.manager.stats["send_timeouts"] += 1
+                self.manager.drop(self, reason="send timeout")
+                return
+            except Exception:
+                self.manager.stats["send_errors"] += 1
+                self.manager.disconnect(self.order_id, self.user_id, self.websocket)
+                return
+
+    async def _close(self, code: int, reason: str):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), timeout=WS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def close(self, code: int = 1000, reason: str = ""):
+        """Stop the writer and close the socket in the background."""
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        asyncio.create_task(self._close(code, reason))
+
+
 class ConnectionManager:
+    """Sockets connected to this worker, plus presence/typing state for their orders.
+
+    Presence and typing are ephemeral: they live only in memory here and travel
+    between workers over the backplane, never through Postgres tables.
+    """
+
     def __init__(self):
-        # Dict[order_id, Dict[user_id, WebSocket]]
-        self.active_connections: Dict[int, Dict[int, WebSocket]] = {}
+        # Dict[order_id, Dict[user_id, ClientConnection]]
+        self.active_connections: Dict[int, Dict[int, ClientConnection]] = {}
+        # Users online through other workers: Dict[order_id, Dict[user_id, expires_at]]
+        self.remote_presence: Dict[int, Dict[int, float]] = {}
+        # Last typing signal broadcast per (order_id, user_id): (is_typing, monotonic time)
+        self._typing: Dict[tuple, tuple] = {}
+        self.stats = {
+            "messages_sent": 0,
+            "messages_dropped": 0,
+            "send_timeouts": 0,
+            "send_errors": 0,
+            "slow_consumers_dropped": 0,
+            "heartbeat_timeouts": 0,
+            "typing_coalesced": 0,
+            "max_queue_depth": 0,
+        }
+        self._heartbeat: asyncio.Task | None = None
 
     async def connect(self, websocket: WebSocket, order_id: int, user_id: int):
         await websocket.accept()
+        was_online = self.is_online(order_id, user_id)
         if order_id not in self.active_connections:
             self.active_connections[order_id] = {}
-        self.active_connections[order_id][user_id] = websocket
-
-    def disconnect(self, order_id: int, user_id: int):
-        if order_id in self.active_connections:
-            self.active_connections[order_id].pop(user_id, None)
-            if not self.active_connections[order_id]:
-                del self.active_connections[order_id]
-
-    async def broadcast_to_order(self, order_id: int, message: dict, exclude_user: int | None = None):
-        if order_id in self.active_connections:
-            for user_id, connection in list(self.active_connections[order_id].items()):
-                if exclude_user is None or user_id != exclude_user:
-                    try:
-                        await connection.send_json(message)
-                    except:
-                        self.disconnect(order_id, user_id)
+        previous = self.active_connections[order_id].get(user_id)
+        if previous is not None:
+            # Same user reconnected (e.g. a second tab); the newer socket wins
+            previous.close(code=1000, reason="replaced by a newer connection")
+        self.active_connections[order_id][user_id] = ClientConnection(self, websocket, order_id, user_id)
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+        if not was_online:
+            self._broadcast(order_id, {"type": "presence", "user_id": user_id, "status": "online"}, exclude_user=user_id, droppable=True)
+        self.send_to_user(order_id, user_id, {"type": "presence_snapshot", "online": self.online_users(order_id)})
+
+    def touch(self, order_id: int, user_id: int):
+        """Mark the user's socket as alive (any frame from the client counts)."""
+        connection = self.active_connections.get(order_id, {}).get(user_id)
+        if connection is not None:
+            connection.last_seen = time.monotonic()
+
+    async def _heartbeat_loop(self):
+        # Ping live sockets and reclaim ones that have gone quiet (half-open TCP, sleeping laptops)
+        while self.active_connections:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            for connections in list(self.active_connections.values()):
+                for connection in list(connections.values()):
+                    if now - connection.last_seen > WS_HEARTBEAT_TIMEOUT:
+                        self.stats["heartbeat_timeouts"] += 1
+                        self.disconnect(connection.order_id, connection.user_id, connection.websocket)
+                        # 1001 = "going away"
+                        connection.close(code=1001, reason="heartbeat timeout")
+                    else:
+                        connection.enqueue({"type": "ping"})
+            self._refresh_presence(now)
+
+    def _refresh_presence(self, now: float):
+        """Re-announce our users to other workers and expire ones they stopped announcing."""
+        online = [[order_id, user_id] for order_id, conns in self.active_connections.items() for user_id in conns]
+        for i in range(0, len(online), WS_PRESENCE_REFRESH_CHUNK):
+            backplane.publish({"kind": "presence_refresh", "online": online[i:i + WS_PRESENCE_REFRESH_CHUNK]})
+
+        for order_id, users in list(self.remote_presence.items()):
+            for user_id, expires_at in list(users.items()):
+                if expires_at <= now:
+                    del users[user_id]
+                    if not self.is_online(order_id, user_id):
+                        self._deliver_local(order_id, {"type": "presence", "user_id": user_id, "status": "offline"}, droppable=True)
+            if not users:
+                del self.remote_presence[order_id]
+
+    def is_online(self, order_id: int, user_id: int) -> bool:
+        if user_id in self.active_connections.get(order_id, {}):
+            return True
+        return self.remote_presence.get(order_id, {}).get(user_id, 0) > time.monotonic()
+
+    def online_users(self, order_id: int) -> List[int]:
+        now = time.monotonic()
+        users = set(self.active_connections.get(order_id, {}))
+        users.update(uid for uid, expires_at in self.remote_presence.get(order_id, {}).items() if expires_at > now)
+        return sorted(users)
+
+    def typing(self, order_id: int, user_id: int, is_typing: bool):
+        """Relay a typing signal, coalescing repeats within WS_TYPING_COALESCE seconds.
+
+        Clients may send one per keystroke; peers should treat "typing" as expired
+        if it is not refreshed within a few seconds.
+        """
+        key = (order_id, user_id)
+        now = time.monotonic()
+        last = self._typing.get(key)
+        if last is not None and last[0] == is_typing and now - last[1] < WS_TYPING_COALESCE:
+            self.stats["typing_coalesced"] += 1
+            return
+        self._typing[key] = (is_typing, now)
+        self._broadcast(order_id, {"type": "typing", "user_id": user_id, "is_typing": is_typing}, exclude_user=user_id, droppable=True)
+
+    def disconnect(self, order_id: int, user_id: int, websocket: WebSocket | None = None):
+        connections = self.active_connections.get(order_id)
+        if not connections or user_id not in connections:
+            return
+        connection = connections[user_id]
+        # Ignore late disconnects from a socket that has already been replaced
+        if websocket is not None and connection.websocket is not websocket:
+            return
+        del connections[user_id]
+        if connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        if not connections:
+            del self.active_connections[order_id]
+
+        self._typing.pop((order_id, user_id), None)
+        if not self.is_online(order_id, user_id):
+            self._broadcast(order_id, {"type": "presence", "user_id": user_id, "status": "offline"}, droppable=True)
+
+    def drop(self, connection: ClientConnection, reason: str):
+        """Disconnect a consumer that cannot keep up; it can reconnect and catch up."""
+        self.stats["slow_consumers_dropped"] += 1
+        self.disconnect(connection.order_id, connection.user_id, connection.websocket)
+        # 1013 = "try again later"
+        connection.close(code=1013, reason=reason)
+
+    def send_to_user(self, order_id: int, user_id: int, message: dict) -> bool:
+        connection = self.active_connections.get(order_id, {}).get(user_id)
+        if connection is None:
+            return False
+        if not connection.enqueue(message):
+            self.stats["messages_dropped"] += 1
+            self.drop(connection, reason="send queue full")
+            return False
+        return True
+
+    def _deliver_local(self, order_id: int, message: dict, exclude_user: int | None = None, droppable: bool = False):
+        for user_id, connection in list(self.active_connections.get(order_id, {}).items()):
+            if exclude_user is not None and user_id == exclude_user:
+                continue
+            if connection.enqueue(message):
+                continue
+            self.stats["messages_dropped"] += 1
+            if not droppable:
+                self.drop(connection, reason="send queue full")
+
+    def _broadcast(self, order_id: int, message: dict, exclude_user: int | None = None, droppable: bool = False):
+        self._deliver_local(order_id, message, exclude_user, droppable)
+        envelope = {"kind": "broadcast", "order_id": order_id, "message": message, "exclude_user": exclude_user, "droppable": droppable}
+        if not backplane.publish(envelope) and not droppable and message.get("type") == "new_message":
+            # Too large for a NOTIFY payload: other workers load it by id instead
+            backplane.publish({
+                "kind": "message_ref",
+                "order_id": order_id,
+                "message_id": message["message"]["message_id"],
+                "exclude_user": exclude_user,
+            })
+
+    async def broadcast_to_order(self, order_id: int, message: dict, exclude_user: int | None = None, droppable: bool = False):
+        """Queue ``message`` for every socket in the order, on this and other workers, without waiting on any of them.
+
+        When a socket's queue is full the consumer is dropped, unless the message is
+        ``droppable`` (ephemeral signals), in which case only that message is skipped.
+        """
+        self._broadcast(order_id, message, exclude_user, droppable)
+
+    async def handle_remote(self, envelope: dict):
+        """Apply an envelope published by another worker."""
+        kind = envelope.get("kind")
+        if kind == "presence_refresh":
+            expires_at = time.monotonic() + WS_HEARTBEAT_TIMEOUT
+            for order_id, user_id in envelope.get("online", []):
+                if not self.is_online(order_id, user_id):
+                    self._deliver_local(order_id, {"type": "presence", "user_id": user_id, "status": "online"}, droppable=True)
+                self.remote_presence.setdefault(order_id, {})[user_id] = expires_at
+            return
+
+        order_id = envelope.get("order_id")
+        if kind == "broadcast":
+            message = envelope["message"]
+            if message.get("type") == "presence":
+                users = self.remote_presence.setdefault(order_id, {})
+                if message["status"] == "online":
+                    users[message["user_id"]] = time.monotonic() + WS_HEARTBEAT_TIMEOUT
+                else:
+                    users.pop(message["user_id"], None)
+                    # Still connected here, so not offline as far as our sockets are concerned
+                    if self.is_online(order_id, message["user_id"]):
+                        return
+            self._deliver_local(order_id, message, envelope.get("exclude_user"), envelope.get("droppable", False))
+        elif kind == "message_ref" and order_id in self.active_connections:
+            async with get_connection() as conn:
+                async with conn.cursor() as cur:
+                    found = await _fetch_missed_messages(cur, order_id, envelope["message_id"] - 1)
+            if found and found[0]["message_id"] == envelope["message_id"]:
+                self._deliver_local(order_id, {"type": "new_message", "message": found[0]}, envelope.get("exclude_user"))
+
+    def metrics(self) -> dict:
+        depths = [c.queue.qsize() for conns in self.active_connections.values() for c in conns.values()]
+        return {
+            **self.stats,
+            "active_orders": len(self.active_connections),
+            "active_sockets": len(depths),
+            "queued_messages": sum(depths),
+            "current_max_queue_depth": max(depths, default=0),
+            "backplane_dropped": getattr(backplane, "dropped", 0),
+        }
 
 manager = ConnectionManager()
 
@@ -102,7 +332,7 @@ async def _get_pair_by_order(cur, order_id: int):
 @router.post("", response_model=MessagePublic, status_code=201)
 async def send_message(payload: MessageCreate, sender_id: int = Query(...)):
     # Rate limiting check
-    if not check_rate_limit(sender_id):
+    if not await message_limiter.check(sender_id):
         raise HTTPException(
             status_code=429, 
             detail=f"Rate limit exceeded: max {RATE_LIMIT_MAX_REQUESTS} messages per {RATE_LIMIT_WINDOW} seconds"
@@ -179,43 +409,112 @@ async def send_message(payload: MessageCreate, sender_id: int = Query(...)):
                 raise HTTPException(status_code=400, detail=f"Failed to send message: {str(e)}")
 
 
+async def _fetch_missed_messages(cur, order_id: int, last_message_id: int) -> List[dict]:
+    """Messages in the order newer than last_message_id, at most WS_REPLAY_LIMIT + 1 of them."""
+    await cur.execute(
+        '''
+        SELECT m.message_id, m.sender_id, m.receiver_id, m.message_text, m.created_at,
+               m.is_read OR m.message_id <= COALESCE(w.last_read_message_id, 0)
+        FROM "Messages" m
+        LEFT JOIN "MessageReadWatermark" w ON w.user_id = m.receiver_id AND w.order_id = m.order_id
+        WHERE m.order_id = %s AND m.message_id > %s
+        ORDER BY m.message_id ASC
+        LIMIT %s
+        ''',
+        (order_id, last_message_id, WS_REPLAY_LIMIT + 1),
+    )
+    rows = await cur.fetchall()
+    return [
+        {
+            "message_id": row[0],
+            "sender_id": row[1],
+            "receiver_id": row[2],
+            "message_text": row[3],
+            "timestamp": row[4].isoformat(),
+            "is_read": row[5],
+        }
+        for row in rows
+    ]
+
+
 @router.websocket("/ws/{order_id}")
-async def websocket_endpoint(websocket: WebSocket, order_id: int, user_id: int = Query(...)):
-    """WebSocket endpoint for real-time messaging within an order conversation."""
-    async with get_connection() as conn:
-        async with conn.cursor() as cur:
-            try:
+async def websocket_endpoint(
+    websocket: WebSocket,
+    order_id: int,
+    user_id: int = Query(...),
+    last_message_id: Optional[int] = Query(None),
+):
+    """WebSocket endpoint for real-time messaging within an order conversation.
+
+    Reconnecting clients pass ``last_message_id`` and receive only the messages they
+    missed as a single ``replay`` frame. If they missed more than WS_REPLAY_LIMIT they
+    get ``resync_required`` and should refetch the conversation. The server sends
+    ``ping`` frames; clients answer with ``pong`` or the socket is reclaimed.
+    """
+    try:
+        # Only hold a pool connection while setting up; sockets can live for hours
+        async with get_connection() as conn:
+            async with conn.cursor() as cur:
                 # Verify user is part of the order
                 client_id, freelancer_id = await verify_order_participant(cur, order_id, user_id)
 
+                # Register before reading the backlog so nothing broadcast in between is lost;
+                # clients de-duplicate by message_id.
                 await manager.connect(websocket, order_id, user_id)
-                
-                try:
-                    while True:
-                        # Keep connection alive and listen for messages
-                        data = await websocket.receive_json()
-                        
-                        # Handle incoming message - save to DB and broadcast
-                        if data.get("type") == "message":
-                            # Rate limiting for WebSocket messages
-                            if not check_rate_limit(user_id):
-                                await websocket.send_json({
-                                    "type": "error",
-                                    "message": f"Rate limit exceeded: max {RATE_LIMIT_MAX_REQUESTS} messages per {RATE_LIMIT_WINDOW} seconds"
-                                })
-                                continue
-                            
-                            message_text = data.get("message_text", "").strip()
-                            if not message_text:
-                                await websocket.send_json({"type": "error", "message": "Message text cannot be empty"})
-                                continue
-                            
-                            if len(message_text) > 5000:
-                                await websocket.send_json({"type": "error", "message": "Message text too long (max 5000 characters)"})
-                                continue
-                            
-                            receiver_id = freelancer_id if user_id == client_id else client_id
-                            
+
+                if last_message_id is not None:
+                    missed = await _fetch_missed_messages(cur, order_id, last_message_id)
+                    if len(missed) > WS_REPLAY_LIMIT:
+                        manager.send_to_user(order_id, user_id, {"type": "resync_required", "last_message_id": last_message_id})
+                    else:
+                        manager.send_to_user(order_id, user_id, {
+                            "type": "replay",
+                            "messages": missed,
+                            "last_message_id": missed[-1]["message_id"] if missed else last_message_id,
+                        })
+    except HTTPException as e:
+        # 1008 (policy violation) tells clients not to retry
+        manager.disconnect(order_id, user_id, websocket)
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+    except Exception as e:
+        manager.disconnect(order_id, user_id, websocket)
+        await websocket.close(code=1011, reason=str(e))
+        return
+
+    receiver_id = freelancer_id if user_id == client_id else client_id
+    try:
+        while True:
+            data = await websocket.receive_json()
+            manager.touch(order_id, user_id)
+
+            # Ephemeral signals: memory and backplane only, no database work
+            if data.get("type") == "typing":
+                manager.typing(order_id, user_id, bool(data.get("is_typing", True)))
+                continue
+
+            # Handle incoming message - save to DB and broadcast
+            if data.get("type") == "message":
+                # Rate limiting for WebSocket messages
+                if not await message_limiter.check(user_id):
+                    manager.send_to_user(order_id, user_id, {
+                        "type": "error",
+                        "message": f"Rate limit exceeded: max {RATE_LIMIT_MAX_REQUESTS} messages per {RATE_LIMIT_WINDOW} seconds"
+                    })
+                    continue
+
+                message_text = data.get("message_text", "").strip()
+                if not message_text:
+                    manager.send_to_user(order_id, user_id, {"type": "error", "message": "Message text cannot be empty"})
+                    continue
+
+                if len(message_text) > 5000:
+                    manager.send_to_user(order_id, user_id, {"type": "error", "message": "Message text too long (max 5000 characters)"})
+                    continue
+
+                async with get_connection() as conn:
+                    async with conn.cursor() as cur:
+                        try:
                             await cur.execute(
                                 '''
                                 INSERT INTO "Messages" (sender_id, receiver_id, order_id, reply_to_id, message_text, timestamp, is_read)
@@ -235,7 +534,7 @@ async def websocket_endpoint(websocket: WebSocket, order_id: int, user_id: int =
                                 'INSERT INTO "Receive_Message" (client_id, freelancer_id, message_id) VALUES (%s, %s, %s)',
                                 (client_id, freelancer_id, message_id),
                             )
-                            
+
                             # Insert notification for receiver
                             await cur.execute(
                                 '''
@@ -244,27 +543,35 @@ async def websocket_endpoint(websocket: WebSocket, order_id: int, user_id: int =
                                 ''',
                                 (receiver_id, 'new_message', f'New message in order #{order_id}'),
                             )
-                            
+
                             await conn.commit()
-                            
-                            # Broadcast to all connected users in this order
-                            await manager.broadcast_to_order(order_id, {
-                                "type": "new_message",
-                                "message": {
-                                    "message_id": message_id,
-                                    "sender_id": user_id,
-                                    "receiver_id": receiver_id,
-                                    "message_text": data.get("message_text"),
-                                    "timestamp": ts.isoformat(),
-                                    "is_read": False,
-                                    "reply_to_id": data.get("reply_to_id"),
-                                }
-                            })
-                            
-                except WebSocketDisconnect:
-                    manager.disconnect(order_id, user_id)
-            except Exception as e:
-                await websocket.close(code=1011, reason=str(e))
+                        except Exception as e:
+                            await conn.rollback()
+                            manager.send_to_user(order_id, user_id, {"type": "error", "message": f"Failed to send message: {str(e)}"})
+                            continue
+
+                # Broadcast to all connected users in this order
+                await manager.broadcast_to_order(order_id, {
+                    "type": "new_message",
+                    "message": {
+                        "message_id": message_id,
+                        "sender_id": user_id,
+                        "receiver_id": receiver_id,
+                        "message_text": data.get("message_text"),
+                        "timestamp": ts.isoformat(),
+                        "is_read": False,
+                        "reply_to_id": data.get("reply_to_id"),
+                    }
+                })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        try:
+            await websocket.close(code=1011, reason=str(e))
+        except Exception:
+            pass
+    finally:
+        manager.disconnect(order_id, user_id, websocket)
 
 
 @router.post("/upload", status_code=201)
@@ -277,20 +584,9 @@ async def upload_file(
 ):
     """Upload a file attachment and create a message in the order conversation."""
     # Rate limiting for file uploads (stricter limit)
-    rate_limit_store_key = f"upload_{sender_id}"
-    now = datetime.now()
-    cutoff = now - timedelta(seconds=300)  # 5 minute window for uploads
-    
-    if rate_limit_store_key not in rate_limit_store:
-        rate_limit_store[rate_limit_store_key] = []
-    
-    upload_timestamps = [ts for ts in rate_limit_store[rate_limit_store_key] if ts > cutoff]
-    
-    if len(upload_timestamps) >= 10:  # Max 10 uploads per 5 minutes
+    if not await upload_limiter.check(sender_id):
         raise HTTPException(status_code=429, detail="Upload rate limit exceeded: max 10 files per 5 minutes")
     
-    rate_limit_store[rate_limit_store_key] = upload_timestamps + [now]
-    
     async with get_connection() as conn:
         async with conn.cursor() as cur:
             # Verify user is part of the order
@@ -419,12 +715,14 @@ async def get_conversation(order_id: int = Query(...), user_id: int = Query(...)
                 await cur.execute(
                     '''
                     SELECT m.message_id, m.sender_id, ns.name, m.receiver_id, nr.name,
-                           m.message_text, m.created_at, m.is_read, NULL::INTEGER,
+                           m.message_text, m.created_at,
+                           m.is_read OR m.message_id <= COALESCE(w.last_read_message_id, 0), NULL::INTEGER,
                            f.file_id, f.file_name, f.file_path, f.file_type
                     FROM "Messages" m
                     LEFT JOIN "NonAdmin" ns ON ns.user_id = m.sender_id
                     LEFT JOIN "NonAdmin" nr ON nr.user_id = m.receiver_id
                     LEFT JOIN "File" f ON f.message_id = m.message_id
+                    LEFT JOIN "MessageReadWatermark" w ON w.user_id = m.receiver_id AND w.order_id = m.order_id
                     WHERE m.order_id = %s
                     ORDER BY m.created_at ASC
                     ''',
@@ -432,18 +730,13 @@ async def get_conversation(order_id: int = Query(...), user_id: int = Query(...)
                 )
                 rows = await cur.fetchall()
 
-                # Mark messages as read for the current user
-                await cur.execute(
-                    '''
-                    UPDATE "Messages" SET is_read = TRUE
-                    WHERE receiver_id = %s AND order_id = %s AND is_read = FALSE
-                    ''',
-                    (user_id, order_id),
-                )
-                await conn.commit()
-
                 messages: List[ConversationMessage] = []
+                newest_unread_id = 0
                 for row in rows:
+                    # Receipts that are still buffered in memory count as read too
+                    is_read = row[7] or row[0] <= read_receipts.pending_watermark(row[3], order_id)
+                    if row[3] == user_id and not is_read:
+                        newest_unread_id = max(newest_unread_id, row[0])
                     messages.append(
                         ConversationMessage(
                             message_id=row[0],
@@ -453,7 +746,7 @@ async def get_conversation(order_id: int = Query(...), user_id: int = Query(...)
                             receiver_name=row[4],
                             message_text=row[5],
                             timestamp=row[6],
-                            is_read=row[7],
+                            is_read=is_read,
                             reply_to_id=row[8],
                             file_id=row[9],
                             file_name=row[10],
@@ -461,6 +754,10 @@ async def get_conversation(order_id: int = Query(...), user_id: int = Query(...)
                             file_type=row[12],
                         )
                     )
+
+                # Advance the read watermark; flushed to the DB in batches
+                if newest_unread_id:
+                    read_receipts.mark_read(user_id, order_id, newest_unread_id)
                 return messages
             except HTTPException:
                 # Permission-related errors
@@ -489,10 +786,12 @@ async def get_threads(user_id: int = Query(...)):
                     ORDER BY order_id, created_at DESC
                 ),
                 unread AS (
-                    SELECT order_id, COUNT(*) AS unread_count
-                    FROM conv
-                    WHERE receiver_id = %s AND is_read = FALSE AND order_id IS NOT NULL
-                    GROUP BY order_id
+                    SELECT c.order_id, COUNT(*) AS unread_count
+                    FROM conv c
+                    LEFT JOIN "MessageReadWatermark" w ON w.user_id = c.receiver_id AND w.order_id = c.order_id
+                    WHERE c.receiver_id = %s AND c.is_read = FALSE AND c.order_id IS NOT NULL
+                      AND c.message_id > COALESCE(w.last_read_message_id, 0)
+                    GROUP BY c.order_id
                 )
                 SELECT lm.client_id, lm.freelancer_id,
                        CASE WHEN %s = lm.sender_id THEN lm.receiver_id ELSE lm.sender_id END AS other_user_id,
@@ -520,6 +819,38 @@ async def get_threads(user_id: int = Query(...)):
                         other_user_name=row[3],
                         last_message=row[4],
                         last_message_at=row[5],
+                        unread_count=row[6],
+                        order_id=row[7],
                     )
                 )
             return threads
+
+
+@router.post("/read", status_code=202)
+async def mark_read(order_id: int = Query(...), user_id: int = Query(...), message_id: int = Query(...)):
+    """Record that the user has read the conversation up to message_id.
+
+    The watermark is buffered in memory and written in batches, so clients can
+    call this on every scroll/focus without generating write transactions. It is
+    clamped to the newest message of this order at or below message_id, so an
+    id from another conversation (or one not sent yet) cannot mark future
+    messages as read.
+    """
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await verify_order_participant(cur, order_id, user_id)
+            await cur.execute(
+                'SELECT MAX(message_id) FROM "Messages" WHERE order_id = %s AND message_id <= %s',
+                (order_id, message_id),
+            )
+            message_id = (await cur.fetchone())[0]
+    if message_id is None:
+        raise HTTPException(status_code=404, detail="Message not found in this conversation")
+    read_receipts.mark_read(user_id, order_id, message_id)
+    return {"status": "accepted", "order_id": order_id, "last_read_message_id": message_id}
+
+
+@router.get("/ws/metrics")
+async def websocket_metrics():
+    """Broadcast queue depth and drop counters for this worker."""
+    return manager.metrics()
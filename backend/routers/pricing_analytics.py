@@ -1,71 +1,73 @@
+import math
+from decimal import Decimal
+from datetime import date, datetime, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+import numpy as np
 
 from backend.db import get_connection
+from backend.core.security import get_current_admin
+from backend.core.timeseries import date_buckets
+from backend.core.price_snapshot import price_snapshot
+from backend.jobs.price_demand import run_price_demand_stats
 from backend.schemas.pricing_analytics import (
     PricingSummary,
     CategoryTrendPoint,
     PriceDistributionBucket,
+    PricePercentiles,
     PriceDemandPoint,
+    PriceDemandStats,
     UndercuttingService,
+    UndercuttingSubscription,
+    UndercuttingSubscriptionRequest,
     PremiumAdoptionPoint,
 )
+from backend.schemas.user import UserResponse
 
 router = APIRouter(tags=["pricing-analytics"])
 
 
+async def _load_category_stats(cur):
+    await cur.execute('''
+        SELECT category, service_count, priced_count, price_sum, price_sumsq
+        FROM "CategoryPricingStats"
+    ''')
+    return await cur.fetchall()
+
+
 @router.get("/pricing-analytics/summary", response_model=PricingSummary)
 async def get_pricing_summary():
-    """Get overall pricing metrics for the platform"""
+    """Get overall pricing metrics for the platform (from "CategoryPricingStats"; exact median from the price snapshot)"""
     try:
         async with get_connection() as conn:
             async with conn.cursor() as cur:
-                # Get price statistics
-                await cur.execute('''
-                    SELECT 
-                        COALESCE(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY hourly_price), 0) AS median_price,
-                        COALESCE(AVG(hourly_price), 0) AS avg_price,
-                        COALESCE(STDDEV(hourly_price), 0) AS std_dev,
-                        COUNT(*) AS total_services,
-                        COUNT(DISTINCT category) AS categories_count
-                    FROM "Service"
-                    WHERE hourly_price IS NOT NULL AND hourly_price > 0
-                ''')
-                stats = await cur.fetchone()
+                rows = await _load_category_stats(cur)
+        snapshot = await price_snapshot.refresh()
 
-                # Most expensive category
-                await cur.execute('''
-                    SELECT category, AVG(hourly_price) AS avg_price
-                    FROM "Service"
-                    WHERE hourly_price IS NOT NULL AND hourly_price > 0
-                    GROUP BY category
-                    ORDER BY avg_price DESC
-                    LIMIT 1
-                ''')
-                expensive = await cur.fetchone()
+        priced = [r for r in rows if r[2] > 0]
+        n = sum(r[2] for r in priced)
+        total = sum((r[3] for r in priced), Decimal(0))
+        total_sq = sum((r[4] for r in priced), Decimal(0))
+        # Sample standard deviation, as STDDEV() would return
+        variance = (total_sq - total * total / n) / (n - 1) if n > 1 else Decimal(0)
+        median = float(np.median(snapshot.prices)) if snapshot.prices.size else 0.0
 
-                # Most competitive category (most services)
-                await cur.execute('''
-                    SELECT category, COUNT(*) AS service_count
-                    FROM "Service"
-                    GROUP BY category
-                    ORDER BY service_count DESC
-                    LIMIT 1
-                ''')
-                competitive = await cur.fetchone()
-
-                return PricingSummary(
-                    median_price=float(stats[0]) if stats else 0.0,
-                    avg_price=float(stats[1]) if stats else 0.0,
-                    std_dev_price=float(stats[2]) if stats else 0.0,
-                    total_services=int(stats[3]) if stats else 0,
-                    categories_count=int(stats[4]) if stats else 0,
-                    avg_orders_per_service=0.0,
-                    most_expensive_category=expensive[0] if expensive else None,
-                    most_expensive_avg=float(expensive[1]) if expensive else None,
-                    most_competitive_category=competitive[0] if competitive else None,
-                    most_competitive_count=int(competitive[1]) if competitive else None,
-                )
+        # Most expensive category by average price, most competitive by number of services
+        expensive = max(priced, key=lambda r: r[3] / r[2], default=None)
+        competitive = max((r for r in rows if r[1] > 0), key=lambda r: r[1], default=None)
+
+        return PricingSummary(
+            median_price=round(median, 2),
+            avg_price=float(total / n) if n else 0.0,
+            std_dev_price=math.sqrt(max(float(variance), 0.0)),
+            total_services=n,
+            categories_count=len(priced),
+            avg_orders_per_service=0.0,
+            most_expensive_category=expensive[0] if expensive else None,
+            most_expensive_avg=float(expensive[3] / expensive[2]) if expensive else None,
+            most_competitive_category=competitive[0] if competitive else None,
+            most_competitive_count=int(competitive[1]) if competitive else None,
+        )
     except Exception as e:
         print(f"Error in get_pricing_summary: {e}")
         return PricingSummary(
@@ -131,39 +133,92 @@ async def get_category_trends(
 @router.get("/pricing-analytics/price-distribution", response_model=List[PriceDistributionBucket])
 async def get_price_distribution(
     bucket_size: float = Query(10.0, ge=1.0),
+    category: Optional[str] = Query(None, description="Only this category"),
 ):
-    """Get histogram of service prices"""
+    """Get histogram of service prices from the in-memory price snapshot"""
     try:
-        async with get_connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute('''
-                    SELECT 
-                        FLOOR(hourly_price / %s) * %s AS range_start,
-                        COUNT(*) AS count
-                    FROM "Service"
-                    WHERE hourly_price IS NOT NULL AND hourly_price > 0
-                    GROUP BY range_start
-                    ORDER BY range_start
-                ''', (bucket_size, bucket_size))
-                rows = await cur.fetchall()
-
-                return [
-                    PriceDistributionBucket(
-                        bucket_label=f"${int(r[0])}-${int(r[0] + bucket_size)}",
-                        range_start=float(r[0]),
-                        range_end=float(r[0]) + bucket_size,
-                        count=int(r[1]),
-                    )
-                    for r in rows
-                ]
+        snapshot = await price_snapshot.refresh()
+        return [
+            PriceDistributionBucket(
+                bucket_label=f"${int(range_start)}-${int(range_start + bucket_size)}",
+                range_start=range_start,
+                range_end=range_start + bucket_size,
+                count=count,
+            )
+            for range_start, count in snapshot.histogram(bucket_size, category)
+        ]
     except Exception as e:
         print(f"Error in get_price_distribution: {e}")
         return []
 
 
-@router.get("/pricing-analytics/price-demand-correlation", response_model=List[PriceDemandPoint])
+@router.get("/pricing-analytics/price-percentiles", response_model=List[PricePercentiles])
+async def get_price_percentiles(
+    q: List[float] = Query([10, 25, 50, 75, 90], description="Percentiles to compute (0-100)"),
+):
+    """Price percentiles for all services and per category, from the in-memory price snapshot"""
+    if any(p < 0 or p > 100 for p in q):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    try:
+        snapshot = await price_snapshot.refresh()
+        return [
+            PricePercentiles(
+                category=category,
+                count=count,
+                percentiles={f"p{p:g}": round(value, 2) for p, value in zip(q, values)},
+            )
+            for category, (count, values) in snapshot.percentiles(q).items()
+        ]
+    except Exception as e:
+        print(f"Error in get_price_percentiles: {e}")
+        return []
+
+
+@router.get("/pricing-analytics/price-demand-correlation", response_model=List[PriceDemandStats])
 async def get_price_demand_correlation():
-    """Get price vs demand data for correlation analysis"""
+    """
+    Per-category price-demand correlation and log-log elasticity, with 95% confidence intervals.
+    Computed by the price_demand_stats job, not per request; until its first run the list is empty.
+    """
+    def interval(low, high):
+        return [round(low, 4), round(high, 4)] if low is not None and high is not None else None
+
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute('''
+                SELECT category, services, total_orders,
+                       pearson, pearson_low, pearson_high, spearman, spearman_low, spearman_high,
+                       elasticity, elasticity_low, elasticity_high, r_squared, computed_at
+                FROM "PriceDemandStats"
+                ORDER BY category = '' DESC, services DESC
+            ''')
+            return [
+                PriceDemandStats(
+                    category=r[0] or None,
+                    services=r[1],
+                    total_orders=r[2],
+                    pearson=r[3],
+                    pearson_ci=interval(r[4], r[5]),
+                    spearman=r[6],
+                    spearman_ci=interval(r[7], r[8]),
+                    elasticity=r[9],
+                    elasticity_ci=interval(r[10], r[11]),
+                    r_squared=r[12],
+                    computed_at=r[13],
+                )
+                for r in await cur.fetchall()
+            ]
+
+
+@router.post("/pricing-analytics/price-demand-correlation/refresh")
+async def refresh_price_demand_correlation(current_admin: UserResponse = Depends(get_current_admin)):
+    """Recompute the price-demand statistics now instead of waiting for the scheduled job"""
+    return await run_price_demand_stats()
+
+
+@router.get("/pricing-analytics/price-demand-correlation/points", response_model=List[PriceDemandPoint])
+async def get_price_demand_points():
+    """Price vs demand of the 100 most expensive services, for scatter plots"""
     try:
         async with get_connection() as conn:
             async with conn.cursor() as cur:
@@ -196,95 +251,147 @@ async def get_price_demand_correlation():
                     for r in rows
                 ]
     except Exception as e:
-        print(f"Error in get_price_demand_correlation: {e}")
+        print(f"Error in get_price_demand_points: {e}")
         return []
 
 
+def _undercutting_service(r) -> UndercuttingService:
+    return UndercuttingService(
+        service_id=r[0],
+        service_title=r[1],
+        service_price=float(r[2] or 0),
+        category=r[3],
+        category_avg=float(r[4] or 0),
+        price_diff_pct=float(r[5] or 0),
+        alerted_at=r[6],
+    )
+
+
 @router.get("/pricing-analytics/undercutting-patterns", response_model=List[UndercuttingService])
 async def get_undercutting_patterns(
     threshold_percentage: float = Query(20.0, ge=0.0, le=100.0),
+    category: Optional[str] = Query(None),
 ):
-    """Identify services priced significantly below category average"""
+    """Services priced significantly below their category's live "CategoryPricingStats" average"""
     try:
         async with get_connection() as conn:
             async with conn.cursor() as cur:
+                # The price bound is per category, so each category is one idx_service_category_price range scan
                 await cur.execute('''
-                    WITH category_avg AS (
-                        SELECT category, AVG(hourly_price) AS avg_price
-                        FROM "Service"
-                        WHERE hourly_price IS NOT NULL AND hourly_price > 0
-                        GROUP BY category
-                    )
-                    SELECT 
-                        s.service_id,
-                        s.title,
-                        s.hourly_price,
-                        s.category,
-                        ca.avg_price AS category_avg,
-                        ((ca.avg_price - s.hourly_price) / NULLIF(ca.avg_price, 0) * 100) AS percentage_below
-                    FROM "Service" s
-                    JOIN category_avg ca ON s.category = ca.category
-                    WHERE s.hourly_price < ca.avg_price * (1 - %s / 100.0)
-                    ORDER BY percentage_below DESC
+                    SELECT s.service_id, s.title, s.hourly_price, s.category, st.price_sum / st.priced_count,
+                           ((st.price_sum / st.priced_count - s.hourly_price) / (st.price_sum / st.priced_count) * 100)::float8 AS price_diff_pct,
+                           a.created_at
+                    FROM "CategoryPricingStats" st
+                    JOIN "Service" s ON s.category = st.category
+                        AND s.hourly_price > 0
+                        AND s.hourly_price < st.price_sum / st.priced_count * (1 - %s::numeric / 100)
+                    LEFT JOIN "UndercuttingAlert" a ON a.service_id = s.service_id
+                    WHERE st.priced_count > 0
+                      AND (%s::text IS NULL OR st.category = %s::text)
+                    ORDER BY price_diff_pct DESC
                     LIMIT 50
-                ''', (threshold_percentage,))
-                rows = await cur.fetchall()
-
-                return [
-                    UndercuttingService(
-                        service_id=r[0],
-                        service_title=r[1],
-                        service_price=float(r[2] or 0),
-                        category=r[3],
-                        category_avg=float(r[4] or 0),
-                        price_diff_pct=float(r[5] or 0),
-                    )
-                    for r in rows
-                ]
+                ''', (threshold_percentage, category, category))
+                return [_undercutting_service(r) for r in await cur.fetchall()]
     except Exception as e:
         print(f"Error in get_undercutting_patterns: {e}")
         return []
 
 
+@router.get("/pricing-analytics/undercutting-alerts", response_model=List[UndercuttingService])
+async def get_undercutting_alerts(
+    since: Optional[datetime] = Query(None, description="Only alerts raised after this time"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_admin: UserResponse = Depends(get_current_admin),
+):
+    """Newest undercutting alerts first, with the price and average at alert time; poll with `since` for alerts raised after the last check"""
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute('''
+                SELECT a.service_id, s.title, a.service_price, a.category, a.category_avg, a.price_diff_pct, a.created_at
+                FROM "UndercuttingAlert" a
+                JOIN "Service" s ON s.service_id = a.service_id
+                WHERE %s::timestamptz IS NULL OR a.created_at > %s::timestamptz
+                ORDER BY a.created_at DESC
+                LIMIT %s
+            ''', (since, since, limit))
+            return [_undercutting_service(r) for r in await cur.fetchall()]
+
+
+@router.put("/pricing-analytics/undercutting-alerts/subscription", response_model=UndercuttingSubscription)
+async def subscribe_undercutting_alerts(
+    payload: UndercuttingSubscriptionRequest,
+    current_admin: UserResponse = Depends(get_current_admin),
+):
+    """Get a notification whenever a price change puts a service past `threshold_percentage` below its category average"""
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute('''
+                INSERT INTO "UndercuttingAlertSubscription" (admin_id, threshold_pct, category)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (admin_id) DO UPDATE
+                SET threshold_pct = EXCLUDED.threshold_pct, category = EXCLUDED.category
+                RETURNING admin_id, threshold_pct, category, created_at
+            ''', (current_admin.user_id, payload.threshold_percentage, payload.category))
+            row = await cur.fetchone()
+            await conn.commit()
+            return UndercuttingSubscription(
+                admin_id=row[0], threshold_percentage=row[1], category=row[2], created_at=row[3],
+            )
+
+
+@router.delete("/pricing-analytics/undercutting-alerts/subscription", status_code=204)
+async def unsubscribe_undercutting_alerts(current_admin: UserResponse = Depends(get_current_admin)):
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                'DELETE FROM "UndercuttingAlertSubscription" WHERE admin_id = %s',
+                (current_admin.user_id,),
+            )
+            await conn.commit()
+
+
 @router.get("/pricing-analytics/premium-adoption", response_model=List[PremiumAdoptionPoint])
 async def get_premium_adoption(
     granularity: str = Query("month", pattern="^(day|week|month)$"),
 ):
-    """Get premium tier adoption rates over time"""
+    """Get premium tier adoption over time: services per tier at the end of each period"""
     try:
         async with get_connection() as conn:
             async with conn.cursor() as cur:
                 await cur.execute('''
-                    SELECT 
-                        TO_CHAR(date_trunc(%s, COALESCE(updated_at, NOW())), 'YYYY-MM-DD') AS period,
-                        COUNT(*) FILTER (WHERE LOWER(COALESCE(package_tier, 'basic')) = 'basic') AS basic_count,
-                        COUNT(*) FILTER (WHERE LOWER(COALESCE(package_tier, '')) = 'standard') AS standard_count,
-                        COUNT(*) FILTER (WHERE LOWER(COALESCE(package_tier, '')) = 'premium') AS premium_count,
-                        COUNT(*) AS total_count
-                    FROM "Service"
-                    GROUP BY date_trunc(%s, COALESCE(updated_at, NOW()))
-                    ORDER BY period
-                ''', (granularity, granularity))
+                    SELECT day, tier, service_count FROM "ServiceTierDaily" ORDER BY day
+                ''')
                 rows = await cur.fetchall()
+        if not rows:
+            return []
+
+        buckets = date_buckets(rows[0][0], date.today(), granularity)
+        counts = {}
+        result = []
+        i = 0
+        for n, period in enumerate(buckets):
+            period_end = buckets[n + 1] - timedelta(days=1) if n + 1 < len(buckets) else date.today()
+            # Counts carry forward until the next day with a change
+            while i < len(rows) and rows[i][0] <= period_end:
+                counts[rows[i][1]] = rows[i][2]
+                i += 1
+
+            basic = counts.get("basic", 0)
+            standard = counts.get("standard", 0)
+            premium = counts.get("premium", 0)
+            total = sum(counts.values()) or 1
+
+            result.append(PremiumAdoptionPoint(
+                period=period.isoformat(),
+                basic_count=basic,
+                standard_count=standard,
+                premium_count=premium,
+                basic_pct=round((basic / total) * 100, 1),
+                standard_pct=round((standard / total) * 100, 1),
+                premium_pct=round((premium / total) * 100, 1),
+            ))
 
-                result = []
-                for r in rows:
-                    total = int(r[4]) or 1
-                    basic = int(r[1])
-                    standard = int(r[2])
-                    premium = int(r[3])
-
-                    result.append(PremiumAdoptionPoint(
-                        period=r[0],
-                        basic_count=basic,
-                        standard_count=standard,
-                        premium_count=premium,
-                        basic_pct=round((basic / total) * 100, 1),
-                        standard_pct=round((standard / total) * 100, 1),
-                        premium_pct=round((premium / total) * 100, 1),
-                    ))
-
-                return result
+        return result
     except Exception as e:
         print(f"Error in get_premium_adoption: {e}")
         return []
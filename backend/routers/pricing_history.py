@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from decimal import Decimal
 from backend.db import get_connection
+from backend.repositories.pricing_repo import price_as_of
 
 router = APIRouter(prefix="/pricing-history", tags=["pricing"])
 
@@ -44,3 +47,61 @@ async def get_pricing_history(service_id: int):
                 })
             
             return history
+
+
+@router.get("/{service_id}/as-of")
+async def get_price_as_of(service_id: int, at: datetime = Query(..., description="Point in time (ISO 8601)")):
+    """
+    Get the price that was in effect for a service at a given time.
+    """
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            row = await price_as_of(cur, service_id, at)
+            if not row:
+                raise HTTPException(status_code=404, detail="No price recorded for this service at that time")
+            return {
+                "history_id": row[0],
+                "service_id": service_id,
+                "price": float(row[1]) if isinstance(row[1], Decimal) else row[1],
+                "demand_multiplier": float(row[2]) if isinstance(row[2], Decimal) else row[2],
+                "active_orders_count": row[3],
+                "effective_from": row[4].isoformat() if row[4] else None,
+                "effective_until": row[5].isoformat() if row[5] else None,
+                "reason": row[6],
+            }
+
+
+@router.get("/{service_id}/orders")
+async def get_order_prices(
+    service_id: int,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Get a service's orders with the list price that was in effect when each order was placed.
+    """
+    async with get_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT o.order_id, o.created_at, o.status, o.total_price, service_price_at(o.service_id, o.created_at)
+                FROM "Order" o
+                WHERE o.service_id = %s
+                  AND (%s::timestamptz IS NULL OR o.created_at >= %s::timestamptz)
+                  AND (%s::timestamptz IS NULL OR o.created_at < %s::timestamptz)
+                ORDER BY o.created_at DESC
+                LIMIT %s
+                """,
+                (service_id, start, start, end, end, limit),
+            )
+            return [
+                {
+                    "order_id": row[0],
+                    "created_at": row[1].isoformat() if row[1] else None,
+                    "status": row[2],
+                    "total_price": float(row[3]) if isinstance(row[3], Decimal) else row[3],
+                    "list_price_at_order": float(row[4]) if isinstance(row[4], Decimal) else row[4],
+                }
+                for row in await cur.fetchall()
+            ]
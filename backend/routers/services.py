@@ -4,6 +4,8 @@ from typing import Optional, List
 from fastapi import APIRouter, HTTPException, Query
 
 from backend.db import get_connection
+from backend.core.price_snapshot import price_snapshot
+from backend.repositories.pricing_repo import record_price_change, refresh_undercutting_alert
 from backend.schemas.service import (
     ServiceCreate,
     ServicePublic,
@@ -103,7 +105,12 @@ async def create_service(service: ServiceCreate, freelancer_id: int = Query(...)
                             )
                         )
 
+                if service.hourly_price is not None:
+                    await record_price_change(cur, service_id, service.hourly_price, "created")
+                    await refresh_undercutting_alert(cur, service_id)
+
                 await conn.commit()
+                price_snapshot.invalidate()
 
                 # Return created service
                 await cur.execute(
@@ -498,7 +505,13 @@ async def edit_service(service_id: int, update: ServiceUpdate, freelancer_id: in
             if not row:
                 raise HTTPException(status_code=404, detail="Service not found")
 
+            if update.hourly_price is not None:
+                await record_price_change(cur, service_id, row[5], "edited")
+                await refresh_undercutting_alert(cur, service_id)
+
             await conn.commit()
+            if update.hourly_price is not None:
+                price_snapshot.invalidate()
             return ServicePublic(
                 service_id=row[0],
                 title=row[1],
@@ -632,6 +645,7 @@ async def delete_service(service_id: int, freelancer_id: int = Query(...)):
                 # Delete the service (cascade will handle related tables)
                 await cur.execute('DELETE FROM "Service" WHERE service_id = %s', (service_id,))
                 await conn.commit()
+                price_snapshot.invalidate()
             except Exception as e:
                 await conn.rollback()
                 raise HTTPException(status_code=400, detail=f"Failed to delete service: {str(e)}")
@@ -327,18 +327,53 @@ CREATE TABLE IF NOT EXISTS "ServiceVersion" (
 -- ANALYTICS
 -- ============================================
 
+-- Append-only event firehose, range-partitioned by month so old data is removed
+-- with a cheap DROP of a rolled-up partition instead of DELETE (see backend/jobs/event_partitions.py)
 CREATE TABLE IF NOT EXISTS "ServiceEvent" (
-    event_id SERIAL PRIMARY KEY,
+    event_id BIGSERIAL,
     service_id INTEGER NOT NULL,
     user_id INTEGER,
-    event_type TEXT NOT NULL CHECK (event_type IN ('VIEW', 'CLICK', 'ORDER_CONVERSION', 'CONTACT')),
+    event_type TEXT NOT NULL CHECK (event_type IN ('VIEW', 'CLICK', 'ORDER_CONVERSION', 'CONTACT', 'SEARCH_IMPRESSION')),
     metadata JSONB DEFAULT '{}',
-    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (event_id, created_at)
+) PARTITION BY RANGE (created_at);
 
 CREATE INDEX IF NOT EXISTS idx_service_event_service_time ON "ServiceEvent"(service_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_service_event_type ON "ServiceEvent"(event_type);
 
+-- Create monthly partitions "ServiceEvent_yYYYYmMM" from months_back to months_ahead around now
+CREATE OR REPLACE FUNCTION ensure_service_event_partitions(months_back INTEGER, months_ahead INTEGER) RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = 'ServiceEvent'
+    ) THEN
+        RAISE NOTICE '"ServiceEvent" is not partitioned yet; run python -m backend.jobs.event_partitions --migrate';
+        RETURN 0;
+    END IF;
+
+    FOR i IN -months_back..months_ahead LOOP
+        month_start := (date_trunc('month', NOW()) + make_interval(months => i))::DATE;
+        part_name := 'ServiceEvent_' || to_char(month_start, '"y"YYYY"m"MM');
+        IF to_regclass(format('%I', part_name)) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF "ServiceEvent" FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, (month_start + INTERVAL '1 month')::DATE
+            );
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_service_event_partitions(1, 3);
+
 CREATE TABLE IF NOT EXISTS "ServiceDailyMetric" (
     metric_id SERIAL PRIMARY KEY,
     service_id INTEGER NOT NULL,
@@ -352,9 +387,13 @@ CREATE TABLE IF NOT EXISTS "ServiceDailyMetric" (
     total_earnings DECIMAL(10, 2) DEFAULT 0.00,
     impressions_count INTEGER DEFAULT 0,
     ctr DECIMAL(5, 4) DEFAULT 0.0000,
+    viewer_sketch INTEGER[] NOT NULL DEFAULT '{}',
     UNIQUE(service_id, date)
 );
 
+-- HyperLogLog sketch of distinct signed-in viewers (older databases)
+ALTER TABLE "ServiceDailyMetric" ADD COLUMN IF NOT EXISTS viewer_sketch INTEGER[] NOT NULL DEFAULT '{}';
+
 CREATE INDEX IF NOT EXISTS idx_service_daily_metric_service_date ON "ServiceDailyMetric"(service_id, date);
 
 CREATE TABLE IF NOT EXISTS "CategoryDailyMetrics" (
@@ -365,12 +404,207 @@ CREATE TABLE IF NOT EXISTS "CategoryDailyMetrics" (
     total_revenue DECIMAL(10, 2) DEFAULT 0.00,
     avg_order_value DECIMAL(10, 2) DEFAULT 0.00,
     unique_buyers INTEGER DEFAULT 0,
+    buyer_ids INTEGER[] NOT NULL DEFAULT '{}',
+    buyer_sketch INTEGER[] NOT NULL DEFAULT '{}',
     created_at TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE(metric_date, category)
 );
 
+-- Mergeable distinct-buyer state for the incremental category ETL (older databases)
+ALTER TABLE "CategoryDailyMetrics" ADD COLUMN IF NOT EXISTS buyer_ids INTEGER[] NOT NULL DEFAULT '{}';
+-- HyperLogLog sketch of the same buyers, merged for range queries
+ALTER TABLE "CategoryDailyMetrics" ADD COLUMN IF NOT EXISTS buyer_sketch INTEGER[] NOT NULL DEFAULT '{}';
+
 CREATE INDEX IF NOT EXISTS idx_cat_metrics_date_cat ON "CategoryDailyMetrics"(metric_date, category);
 
+-- Progress of incremental analytics jobs (rollups/ETL), advanced in the same transaction as their output
+CREATE TABLE IF NOT EXISTS "AnalyticsJobWatermark" (
+    job_name TEXT PRIMARY KEY,
+    last_processed_id BIGINT NOT NULL DEFAULT 0,
+    last_run_at TIMESTAMPTZ,
+    last_rows_affected INTEGER
+);
+
+-- Platform-wide summary snapshots; the admin summary endpoint serves the latest row
+CREATE TABLE IF NOT EXISTS "AnalyticsReport" (
+    report_id SERIAL PRIMARY KEY,
+    report_date TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    avg_pricing DECIMAL(10, 2),
+    avg_dispute_rate DECIMAL(6, 4),
+    avg_satisfaction DECIMAL(3, 2),
+    per_category JSONB NOT NULL DEFAULT '[]'
+);
+
+ALTER TABLE "AnalyticsReport" ADD COLUMN IF NOT EXISTS per_category JSONB NOT NULL DEFAULT '[]';
+
+CREATE INDEX IF NOT EXISTS idx_analytics_report_date ON "AnalyticsReport"(report_date DESC);
+
+-- Flagged (category, day, metric) points from the daily anomaly detector
+CREATE TABLE IF NOT EXISTS "CategoryAnomaly" (
+    metric_date DATE NOT NULL,
+    category TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    baseline DOUBLE PRECISION,
+    rolling_mean DOUBLE PRECISION,
+    rolling_std DOUBLE PRECISION,
+    zscore DOUBLE PRECISION NOT NULL,
+    detected_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (metric_date, category, metric)
+);
+
+-- Holt-Winters state per category: smoothing parameters plus level/trend/weekday seasonals as of last_date
+CREATE TABLE IF NOT EXISTS "CategoryForecastModel" (
+    category TEXT PRIMARY KEY,
+    alpha DOUBLE PRECISION NOT NULL,
+    beta DOUBLE PRECISION NOT NULL,
+    gamma DOUBLE PRECISION NOT NULL,
+    level DOUBLE PRECISION NOT NULL,
+    trend DOUBLE PRECISION NOT NULL,
+    season DOUBLE PRECISION[] NOT NULL,
+    last_date DATE NOT NULL,
+    rmse DOUBLE PRECISION,
+    fitted_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Per-category price aggregates kept current by trg_category_pricing_stats on "Service".
+-- Only positive prices enter the price columns; service_count counts every service in the category.
+-- price_sketch is a relative-error quantile sketch (bucket index -> count, see backend/core/price_sketch.py).
+CREATE TABLE IF NOT EXISTS "CategoryPricingStats" (
+    category TEXT PRIMARY KEY,
+    service_count INTEGER NOT NULL DEFAULT 0,
+    priced_count INTEGER NOT NULL DEFAULT 0,
+    price_sum NUMERIC NOT NULL DEFAULT 0,
+    price_sumsq NUMERIC NOT NULL DEFAULT 0,
+    median_price DOUBLE PRECISION,
+    price_sketch JSONB NOT NULL DEFAULT '{}',
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Bumped on every change; SUM(version) only grows, whatever order concurrent writers commit in
+ALTER TABLE "CategoryPricingStats" ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+-- Cached price-demand statistics per category ('' = all services), see backend/jobs/price_demand.py
+CREATE TABLE IF NOT EXISTS "PriceDemandStats" (
+    category TEXT PRIMARY KEY,
+    services INTEGER NOT NULL,
+    total_orders INTEGER NOT NULL,
+    pearson DOUBLE PRECISION,
+    pearson_low DOUBLE PRECISION,
+    pearson_high DOUBLE PRECISION,
+    spearman DOUBLE PRECISION,
+    spearman_low DOUBLE PRECISION,
+    spearman_high DOUBLE PRECISION,
+    elasticity DOUBLE PRECISION,
+    elasticity_low DOUBLE PRECISION,
+    elasticity_high DOUBLE PRECISION,
+    r_squared DOUBLE PRECISION,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Services priced below their category average as of their own last price write (refresh_undercutting_alert()).
+-- created_at is when the alert was raised; current standing is read against the live "CategoryPricingStats" average.
+CREATE TABLE IF NOT EXISTS "UndercuttingAlert" (
+    service_id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    service_price DECIMAL(10, 2) NOT NULL,
+    category_avg NUMERIC NOT NULL,
+    price_diff_pct DOUBLE PRECISION NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Admins notified when a service's price change puts it threshold_pct or more below its category average
+CREATE TABLE IF NOT EXISTS "UndercuttingAlertSubscription" (
+    admin_id INTEGER PRIMARY KEY,
+    threshold_pct DOUBLE PRECISION NOT NULL DEFAULT 20,
+    category TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Append-only package tier changes, written by trg_service_tier_event (old_tier NULL = created, new_tier NULL = deleted)
+CREATE TABLE IF NOT EXISTS "ServiceTierEvent" (
+    event_id BIGSERIAL PRIMARY KEY,
+    service_id INTEGER NOT NULL,
+    old_tier TEXT,
+    new_tier TEXT,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Services per package tier at the end of each day with a change, rolled up from "ServiceTierEvent"
+CREATE TABLE IF NOT EXISTS "ServiceTierDaily" (
+    day DATE NOT NULL,
+    tier TEXT NOT NULL,
+    net_change INTEGER NOT NULL DEFAULT 0,
+    service_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, tier)
+);
+
+-- Conversion funnel results per scope ('service'/'category') and date range; reused for the day they were computed
+CREATE TABLE IF NOT EXISTS "FunnelCache" (
+    scope TEXT NOT NULL,
+    scope_key TEXT NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    computed_on DATE NOT NULL DEFAULT CURRENT_DATE,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    result JSONB NOT NULL,
+    PRIMARY KEY (scope, scope_key, start_date, end_date)
+);
+
+-- Append-only order status changes, written by trg_order_status_change; drives leaderboard recomputes
+CREATE TABLE IF NOT EXISTS "OrderStatusChange" (
+    change_id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    old_status TEXT,
+    new_status TEXT,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Additive per-day freelancer performance, keyed by the order's creation day
+CREATE TABLE IF NOT EXISTS "FreelancerDailyStats" (
+    freelancer_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    day DATE NOT NULL,
+    total_orders INTEGER NOT NULL DEFAULT 0,
+    completed_orders INTEGER NOT NULL DEFAULT 0,
+    cancelled_orders INTEGER NOT NULL DEFAULT 0,
+    earnings DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    rating_sum DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    response_seconds_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    response_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (freelancer_id, category, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_freelancer_daily_stats_day ON "FreelancerDailyStats"(day, category);
+
+-- Ranked leaderboard per fixed period ('7d', '30d', '90d', 'all') and category ('' = all categories)
+CREATE TABLE IF NOT EXISTS "FreelancerLeaderboard" (
+    period TEXT NOT NULL,
+    category TEXT NOT NULL,
+    freelancer_id INTEGER NOT NULL,
+    total_orders INTEGER NOT NULL DEFAULT 0,
+    completed_orders INTEGER NOT NULL DEFAULT 0,
+    total_earnings DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    completion_rate DECIMAL(5, 2) NOT NULL DEFAULT 0,
+    avg_rating DECIMAL(3, 2) NOT NULL DEFAULT 0,
+    avg_response_hours DECIMAL(10, 2),
+    avg_satisfaction DECIMAL(3, 2),
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (period, category, freelancer_id)
+);
+
+-- One index per sort_by mode so each leaderboard page is a top-K index scan
+CREATE INDEX IF NOT EXISTS idx_leaderboard_earnings ON "FreelancerLeaderboard"(period, category, total_earnings DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_completed ON "FreelancerLeaderboard"(period, category, completed_orders DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_rating ON "FreelancerLeaderboard"(period, category, avg_rating DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_response ON "FreelancerLeaderboard"(period, category, avg_response_hours ASC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_completion ON "FreelancerLeaderboard"(period, category, completion_rate DESC);
+CREATE INDEX IF NOT EXISTS idx_leaderboard_satisfaction ON "FreelancerLeaderboard"(period, category, avg_satisfaction DESC NULLS LAST);
+
 CREATE TABLE IF NOT EXISTS "CategoryMetadata" (
     category TEXT PRIMARY KEY,
     is_promoted BOOLEAN DEFAULT FALSE,
@@ -430,6 +664,15 @@ CREATE TABLE IF NOT EXISTS "Receive_Message" (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Per-user "read up to" watermark per conversation (replaces per-row is_read updates)
+CREATE TABLE IF NOT EXISTS "MessageReadWatermark" (
+    user_id INTEGER NOT NULL,
+    order_id INTEGER NOT NULL,
+    last_read_message_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, order_id)
+);
+
 CREATE TABLE IF NOT EXISTS "File" (
     file_id SERIAL,
     message_id INTEGER NOT NULL,
@@ -439,6 +682,18 @@ CREATE TABLE IF NOT EXISTS "File" (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- ============================================
+-- RATE LIMITING
+-- ============================================
+
+-- Token buckets shared by all API workers (RATE_LIMIT_BACKEND=postgres).
+-- UNLOGGED: losing buckets on a crash only resets limits, so skip the WAL.
+CREATE UNLOGGED TABLE IF NOT EXISTS "RateLimitBucket" (
+    bucket_key TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 -- ============================================
 -- DISPUTES
 -- ============================================
@@ -568,6 +823,8 @@ DO $$ BEGIN ALTER TABLE "WithdrawalMethod" ADD CONSTRAINT withdrawalmethod_freel
 DO $$ BEGIN ALTER TABLE "Withdrawal" ADD CONSTRAINT withdrawal_freelancer_fk FOREIGN KEY (freelancer_id) REFERENCES "Freelancer"(user_id) ON DELETE CASCADE; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
 DO $$ BEGIN ALTER TABLE "Withdrawal" ADD CONSTRAINT withdrawal_method_fk FOREIGN KEY (withdrawal_method_id) REFERENCES "WithdrawalMethod"(method_id) ON DELETE RESTRICT; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
 DO $$ BEGIN ALTER TABLE "Notification" ADD CONSTRAINT notification_user_fk FOREIGN KEY (user_id) REFERENCES "User"(user_id) ON DELETE CASCADE; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN ALTER TABLE "UndercuttingAlert" ADD CONSTRAINT undercuttingalert_service_fk FOREIGN KEY (service_id) REFERENCES "Service"(service_id) ON DELETE CASCADE; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
+DO $$ BEGIN ALTER TABLE "UndercuttingAlertSubscription" ADD CONSTRAINT undercuttingsub_admin_fk FOREIGN KEY (admin_id) REFERENCES "Admin"(user_id) ON DELETE CASCADE; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
 
 -- Foreign Keys (consolidated from archived migration scripts)
 DO $$ BEGIN ALTER TABLE "Revision" ADD CONSTRAINT revision_order_fk FOREIGN KEY (order_id) REFERENCES "Order"(order_id) ON DELETE CASCADE; EXCEPTION WHEN duplicate_object THEN NULL; END $$;
@@ -827,11 +1084,18 @@ ORDER BY created_at DESC;
 CREATE INDEX IF NOT EXISTS idx_user_email ON "User"(email);
 CREATE INDEX IF NOT EXISTS idx_service_freelancer ON "Service"(freelancer_id);
 CREATE INDEX IF NOT EXISTS idx_service_status ON "Service"(status);
+CREATE INDEX IF NOT EXISTS idx_service_category_price ON "Service"(category, hourly_price);
+CREATE INDEX IF NOT EXISTS idx_pricing_history_service_from ON "PricingHistory"(service_id, effective_from);
+CREATE INDEX IF NOT EXISTS idx_service_tier_event_service ON "ServiceTierEvent"(service_id, changed_at);
+CREATE INDEX IF NOT EXISTS idx_undercutting_alert_created ON "UndercuttingAlert"(created_at);
 CREATE INDEX IF NOT EXISTS idx_order_client ON "Order"(client_id);
 CREATE INDEX IF NOT EXISTS idx_order_freelancer ON "Order"(freelancer_id);
+CREATE INDEX IF NOT EXISTS idx_order_created_at ON "Order"(created_at);
 CREATE INDEX IF NOT EXISTS idx_messages_order ON "Messages"(order_id);
+CREATE INDEX IF NOT EXISTS idx_messages_order_message ON "Messages"(order_id, message_id);
 CREATE INDEX IF NOT EXISTS idx_notification_user ON "Notification"(user_id);
 CREATE INDEX IF NOT EXISTS idx_dispute_order ON "Dispute"(order_id);
+CREATE INDEX IF NOT EXISTS idx_review_order ON "Review"(order_id);
 
 -- ============================================
 -- TRIGGERS & FUNCTIONS
@@ -907,3 +1171,265 @@ DROP TRIGGER IF EXISTS trg_update_freelancer_orders ON "Order";
 CREATE TRIGGER trg_update_freelancer_orders
 AFTER UPDATE OF status ON "Order"
 FOR EACH ROW EXECUTE FUNCTION update_freelancer_orders_func();
+
+-- HyperLogLog sketches for approximate distinct counts (estimation in backend/core/hll.py).
+-- A sketch is a sparse INTEGER[] of (register << 6) | rank, 2048 registers (precision 11).
+CREATE OR REPLACE FUNCTION hll_register(key TEXT) RETURNS INTEGER AS $$
+    SELECT (((h & 2047) << 6) | COALESCE(NULLIF(position('1' IN substr(h::bit(64)::text, 1, 53)), 0), 54))::INTEGER
+    FROM (SELECT hashtextextended(key, 0) AS h) hashed
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION hll_sketch(keys TEXT[]) RETURNS INTEGER[] AS $$
+    SELECT COALESCE(array_agg(v ORDER BY v), '{}')
+    FROM (
+        SELECT MAX(hll_register(k)) AS v
+        FROM unnest(keys) k
+        WHERE k IS NOT NULL
+        GROUP BY hll_register(k) >> 6
+    ) registers
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION hll_union(a INTEGER[], b INTEGER[]) RETURNS INTEGER[] AS $$
+    SELECT COALESCE(array_agg(v ORDER BY v), '{}')
+    FROM (SELECT MAX(v) AS v FROM unnest(a || b) v GROUP BY v >> 6) registers
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Relative-error (1%) price sketches; gamma = 1.01 / 0.99. Reading side in backend/core/price_sketch.py.
+CREATE OR REPLACE FUNCTION price_sketch_bucket(price NUMERIC) RETURNS INTEGER AS $$
+    SELECT CEIL(LN(price::float8) / LN(101.0::float8 / 99.0))::INTEGER
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION price_sketch_quantile(sketch JSONB, q DOUBLE PRECISION) RETURNS DOUBLE PRECISION AS $$
+    SELECT 2 * power(101.0::float8 / 99.0, k) / (101.0::float8 / 99.0 + 1)
+    FROM (
+        SELECT key::int AS k,
+               SUM(value::int) OVER (ORDER BY key::int) AS seen,
+               SUM(value::int) OVER () AS total
+        FROM jsonb_each_text(sketch)
+    ) buckets
+    WHERE seen > q * (total - 1)
+    ORDER BY k
+    LIMIT 1
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Add (delta = 1) or remove (delta = -1) one service from its category's pricing stats
+CREATE OR REPLACE FUNCTION category_pricing_apply(cat TEXT, price NUMERIC, delta INTEGER) RETURNS VOID AS $$
+DECLARE
+    bucket TEXT;
+BEGIN
+    INSERT INTO "CategoryPricingStats" (category) VALUES (cat) ON CONFLICT (category) DO NOTHING;
+    IF price IS NULL OR price <= 0 THEN
+        UPDATE "CategoryPricingStats"
+        SET service_count = service_count + delta, version = version + 1, updated_at = NOW()
+        WHERE category = cat;
+        RETURN;
+    END IF;
+
+    bucket := price_sketch_bucket(price)::TEXT;
+    UPDATE "CategoryPricingStats"
+    SET service_count = service_count + delta,
+        priced_count = priced_count + delta,
+        price_sum = price_sum + delta * price,
+        price_sumsq = price_sumsq + delta * price * price,
+        price_sketch = CASE
+            WHEN COALESCE((price_sketch->>bucket)::INTEGER, 0) + delta <= 0 THEN price_sketch - bucket
+            ELSE jsonb_set(price_sketch, ARRAY[bucket], to_jsonb(COALESCE((price_sketch->>bucket)::INTEGER, 0) + delta))
+        END,
+        version = version + 1,
+        updated_at = NOW()
+    WHERE category = cat;
+    UPDATE "CategoryPricingStats"
+    SET median_price = price_sketch_quantile(price_sketch, 0.5)
+    WHERE category = cat;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_category_pricing_stats_func() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.category = NEW.category
+       AND OLD.hourly_price IS NOT DISTINCT FROM NEW.hourly_price THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM category_pricing_apply(OLD.category, OLD.hourly_price, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM category_pricing_apply(NEW.category, NEW.hourly_price, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_category_pricing_stats ON "Service";
+CREATE TRIGGER trg_category_pricing_stats
+AFTER INSERT OR DELETE OR UPDATE OF hourly_price, category ON "Service"
+FOR EACH ROW EXECUTE FUNCTION update_category_pricing_stats_func();
+
+-- Recompute every category from "Service" (backfill, or repair after bulk loads with triggers disabled)
+CREATE OR REPLACE FUNCTION rebuild_category_pricing_stats() RETURNS INTEGER AS $$
+    DELETE FROM "CategoryPricingStats";
+    INSERT INTO "CategoryPricingStats" (category, service_count, priced_count, price_sum, price_sumsq, price_sketch)
+    SELECT s.category,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE s.hourly_price > 0),
+           COALESCE(SUM(s.hourly_price) FILTER (WHERE s.hourly_price > 0), 0),
+           COALESCE(SUM(s.hourly_price * s.hourly_price) FILTER (WHERE s.hourly_price > 0), 0),
+           COALESCE((
+               SELECT jsonb_object_agg(b.bucket, b.n)
+               FROM (
+                   SELECT price_sketch_bucket(x.hourly_price) AS bucket, COUNT(*) AS n
+                   FROM "Service" x
+                   WHERE x.category = s.category AND x.hourly_price > 0
+                   GROUP BY 1
+               ) b
+           ), '{}')
+    FROM "Service" s
+    GROUP BY s.category;
+    UPDATE "CategoryPricingStats" SET median_price = price_sketch_quantile(price_sketch, 0.5);
+    SELECT COUNT(*)::INTEGER FROM "CategoryPricingStats";
+$$ LANGUAGE sql;
+
+-- Backfill once for databases that had services before the stats table existed
+SELECT rebuild_category_pricing_stats()
+WHERE NOT EXISTS (SELECT 1 FROM "CategoryPricingStats") AND EXISTS (SELECT 1 FROM "Service");
+
+-- Upsert or delete one service's undercutting alert against its category's "CategoryPricingStats" average.
+-- Called after each price write; other services' rows are left alone, so an edit touches a single row.
+-- Returns the service's percentage below the average, or NULL if it is not below it.
+CREATE OR REPLACE FUNCTION refresh_undercutting_alert(sid INTEGER) RETURNS DOUBLE PRECISION AS $$
+DECLARE
+    pct DOUBLE PRECISION;
+BEGIN
+    INSERT INTO "UndercuttingAlert" (service_id, category, service_price, category_avg, price_diff_pct)
+    SELECT s.service_id, s.category, s.hourly_price, st.price_sum / st.priced_count,
+           ((st.price_sum / st.priced_count - s.hourly_price) / (st.price_sum / st.priced_count) * 100)::float8
+    FROM "Service" s
+    JOIN "CategoryPricingStats" st ON st.category = s.category AND st.priced_count > 0
+    WHERE s.service_id = sid
+      AND s.hourly_price > 0
+      AND s.hourly_price < st.price_sum / st.priced_count
+    ON CONFLICT (service_id) DO UPDATE
+    SET category = EXCLUDED.category,
+        service_price = EXCLUDED.service_price,
+        category_avg = EXCLUDED.category_avg,
+        price_diff_pct = EXCLUDED.price_diff_pct,
+        updated_at = NOW()
+    RETURNING price_diff_pct INTO pct;
+
+    IF pct IS NULL THEN
+        DELETE FROM "UndercuttingAlert" WHERE service_id = sid;
+    END IF;
+    RETURN pct;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Re-evaluate every alert in one category (backfill / manual repair only; price writes use refresh_undercutting_alert()).
+CREATE OR REPLACE FUNCTION refresh_undercutting_alerts(cat TEXT) RETURNS VOID AS $$
+    DELETE FROM "UndercuttingAlert" a
+    WHERE a.category = cat
+      AND NOT EXISTS (
+          SELECT 1
+          FROM "Service" s
+          JOIN "CategoryPricingStats" st ON st.category = s.category AND st.priced_count > 0
+          WHERE s.service_id = a.service_id
+            AND s.category = cat
+            AND s.hourly_price > 0
+            AND s.hourly_price < st.price_sum / st.priced_count
+      );
+    INSERT INTO "UndercuttingAlert" (service_id, category, service_price, category_avg, price_diff_pct)
+    SELECT s.service_id, s.category, s.hourly_price, st.price_sum / st.priced_count,
+           ((st.price_sum / st.priced_count - s.hourly_price) / (st.price_sum / st.priced_count) * 100)::float8
+    FROM "CategoryPricingStats" st
+    JOIN "Service" s ON s.category = st.category
+        AND s.hourly_price > 0
+        AND s.hourly_price < st.price_sum / st.priced_count
+    WHERE st.category = cat AND st.priced_count > 0
+    ON CONFLICT (service_id) DO UPDATE
+    SET category = EXCLUDED.category,
+        service_price = EXCLUDED.service_price,
+        category_avg = EXCLUDED.category_avg,
+        price_diff_pct = EXCLUDED.price_diff_pct,
+        updated_at = NOW()
+    WHERE "UndercuttingAlert".price_diff_pct IS DISTINCT FROM EXCLUDED.price_diff_pct
+       OR "UndercuttingAlert".category IS DISTINCT FROM EXCLUDED.category;
+$$ LANGUAGE sql;
+
+-- Build the initial alerts for databases that had services before alerts existed
+SELECT refresh_undercutting_alerts(category)
+FROM "CategoryPricingStats"
+WHERE NOT EXISTS (SELECT 1 FROM "UndercuttingAlert");
+
+-- List price of a service in effect at a point in time (the latest "PricingHistory" row starting at or before it).
+-- One descending probe of idx_pricing_history_service_from, so it can be joined per order.
+CREATE OR REPLACE FUNCTION service_price_at(sid INTEGER, at TIMESTAMPTZ) RETURNS DECIMAL(10, 2) AS $$
+    SELECT price
+    FROM "PricingHistory"
+    WHERE service_id = sid AND effective_from <= at
+    ORDER BY effective_from DESC
+    LIMIT 1
+$$ LANGUAGE sql STABLE;
+
+-- Close ranges left open by rows written before price changes were recorded at write time
+UPDATE "PricingHistory" h
+SET effective_until = n.next_from
+FROM (
+    SELECT history_id, LEAD(effective_from) OVER (PARTITION BY service_id ORDER BY effective_from) AS next_from
+    FROM "PricingHistory"
+) n
+WHERE h.history_id = n.history_id AND h.effective_until IS NULL AND n.next_from IS NOT NULL;
+
+-- Services priced before history was written get an open row from their creation time
+INSERT INTO "PricingHistory" (service_id, price, effective_from, reason)
+SELECT s.service_id, s.hourly_price, COALESCE(s.created_at, NOW()), 'initial'
+FROM "Service" s
+WHERE s.hourly_price IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM "PricingHistory" h WHERE h.service_id = s.service_id);
+
+-- Package tier event log; tiers are normalised the way premium adoption counts them (NULL = 'basic')
+CREATE OR REPLACE FUNCTION record_service_tier_event_func() RETURNS TRIGGER AS $$
+DECLARE
+    previous_tier TEXT;
+    current_tier TEXT;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        previous_tier := LOWER(COALESCE(OLD.package_tier, 'basic'));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        current_tier := LOWER(COALESCE(NEW.package_tier, 'basic'));
+    END IF;
+    IF previous_tier IS NOT DISTINCT FROM current_tier THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO "ServiceTierEvent" (service_id, old_tier, new_tier)
+    VALUES (COALESCE(NEW.service_id, OLD.service_id), previous_tier, current_tier);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_service_tier_event ON "Service";
+CREATE TRIGGER trg_service_tier_event
+AFTER INSERT OR DELETE OR UPDATE OF package_tier ON "Service"
+FOR EACH ROW EXECUTE FUNCTION record_service_tier_event_func();
+
+-- Services that existed before tier events were recorded start with their current tier at creation
+INSERT INTO "ServiceTierEvent" (service_id, old_tier, new_tier, changed_at)
+SELECT service_id, NULL, LOWER(COALESCE(package_tier, 'basic')), COALESCE(created_at, NOW())
+FROM "Service"
+WHERE NOT EXISTS (SELECT 1 FROM "ServiceTierEvent");
+
+-- Order status change log, so status updates reach day stats regardless of the order's age
+CREATE OR REPLACE FUNCTION record_order_status_change_func() RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status IS DISTINCT FROM OLD.status THEN
+        INSERT INTO "OrderStatusChange" (order_id, old_status, new_status)
+        VALUES (NEW.order_id, OLD.status, NEW.status);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_order_status_change ON "Order";
+CREATE TRIGGER trg_order_status_change
+AFTER UPDATE OF status ON "Order"
+FOR EACH ROW EXECUTE FUNCTION record_order_status_change_func();
@@ -48,6 +48,14 @@ class DailyMetricResponse(BaseModel):
     service_id: int
     date: date
     views_count: int
+    clicks_count: int
+    orders_count: int
+    impressions_count: Optional[int] = 0
+    conversion_rate: float
+    ctr: Optional[float] = 0.0
+    avg_response_time: Optional[float]
+    avg_rating: Optional[float]
+    total_earnings: float
 
 class CategoryTrendMetric(BaseModel):
     date: date
@@ -57,6 +65,18 @@ class CategoryTrendMetric(BaseModel):
     avg_order_value: float
     unique_buyers: int
 
+class CategoryTrendSeries(BaseModel):
+    category: str
+    date: List[date]
+    total_orders: List[int]
+    total_revenue: List[float]
+    avg_order_value: List[float]
+    unique_buyers: List[int]
+
+class CategoryTrendColumns(BaseModel):
+    granularity: str
+    series: List[CategoryTrendSeries]
+
 class CategoryGrowthMetric(BaseModel):
     category: str
     current_period_revenue: float
@@ -76,14 +96,18 @@ class CategoryMetadataResponse(BaseModel):
     notes: Optional[str]
     updated_at: datetime
 
-    clicks_count: int
-    orders_count: int
-    impressions_count: Optional[int] = 0
-    conversion_rate: float
-    ctr: Optional[float] = 0.0
-    avg_response_time: Optional[float]
-    avg_rating: Optional[float]
-    total_earnings: float
+class DailyMetricColumns(BaseModel):
+    service_id: int
+    date: List[date]
+    views_count: List[int]
+    clicks_count: List[int]
+    orders_count: List[int]
+    impressions_count: List[int]
+    conversion_rate: List[float]
+    ctr: List[float]
+    avg_response_time: List[Optional[float]]
+    avg_rating: List[Optional[float]]
+    total_earnings: List[float]
 
 class FreelancerAnalyticsSummary(BaseModel):
     total_views: int
@@ -95,4 +119,48 @@ class FreelancerAnalyticsSummary(BaseModel):
     avg_response_time: Optional[float]
     avg_rating: Optional[float]
     total_earnings: float
+    unique_viewers: Optional[int] = None  # HyperLogLog estimate, ~2.3% standard error
+
+
+class FunnelStep(BaseModel):
+    step: EventType
+    users: int
+    conversion_from_previous: Optional[float]
+    conversion_from_start: Optional[float]
+    median_seconds_from_previous: Optional[float]
+
+class FunnelResponse(BaseModel):
+    scope: str
+    key: str
+    start_date: date
+    end_date: date
+    steps: List[FunnelStep]
+    computed_at: datetime
+    cached: bool
+
+class CategoryAnomaly(BaseModel):
+    date: date
+    category: str
+    metric: str
+    value: float
+    baseline: Optional[float]
+    rolling_mean: Optional[float]
+    rolling_std: Optional[float]
+    zscore: float
+    direction: str
+    is_promoted: bool = False
+    recruitment_needed: bool = False
+
+class ForecastPoint(BaseModel):
+    date: date
+    revenue: float
 
+class CategoryForecast(BaseModel):
+    category: str
+    last_actual_date: date
+    alpha: float
+    beta: float
+    gamma: float
+    rmse: Optional[float]
+    points: List[ForecastPoint]
+    fitted_at: datetime
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -30,6 +30,12 @@ class PriceDistributionBucket(BaseModel):
     count: int
 
 
+class PricePercentiles(BaseModel):
+    category: Optional[str]  # None for all services
+    count: int
+    percentiles: Dict[str, float]
+
+
 class PriceDemandPoint(BaseModel):
     service_id: int
     title: str
@@ -39,6 +45,20 @@ class PriceDemandPoint(BaseModel):
     revenue: float
 
 
+class PriceDemandStats(BaseModel):
+    category: Optional[str]  # None for all services
+    services: int
+    total_orders: int
+    pearson: Optional[float]
+    pearson_ci: Optional[List[float]]
+    spearman: Optional[float]
+    spearman_ci: Optional[List[float]]
+    elasticity: Optional[float]  # d log(1 + orders) / d log(price)
+    elasticity_ci: Optional[List[float]]
+    r_squared: Optional[float]
+    computed_at: datetime
+
+
 class UndercuttingService(BaseModel):
     service_id: int
     service_title: str
@@ -46,6 +66,19 @@ class UndercuttingService(BaseModel):
     category: str
     category_avg: float
     price_diff_pct: float
+    alerted_at: Optional[datetime] = None
+
+
+class UndercuttingSubscriptionRequest(BaseModel):
+    threshold_percentage: float = Field(20.0, ge=0.0, le=100.0)
+    category: Optional[str] = None  # None for every category
+
+
+class UndercuttingSubscription(BaseModel):
+    admin_id: int
+    threshold_percentage: float
+    category: Optional[str]
+    created_at: datetime
 
 
 class PremiumAdoptionPoint(BaseModel):
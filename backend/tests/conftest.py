@@ -0,0 +1,62 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+
+class FakeCursor:
+    """Replays ``results`` (one entry per execute: a row list, or None for statements) and records queries."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.queries = []
+        self.rowcount = 0
+        self._rows = []
+
+    async def execute(self, query, params=None):
+        self.queries.append((query, params))
+        self._rows = self.results.pop(0) if self.results else []
+        self.rowcount = len(self._rows or [])
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return list(self._rows or [])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+
+    def cursor(self):
+        return self._cursor
+
+    async def commit(self):
+        self.committed = True
+
+    async def rollback(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """``fake_db(module, results)`` points ``module.get_connection`` at a FakeCursor and returns it."""
+
+    def install(module, results):
+        cursor = FakeCursor(results)
+
+        @asynccontextmanager
+        async def get_connection():
+            yield FakeConnection(cursor)
+
+        monkeypatch.setattr(module, "get_connection", get_connection)
+        return cursor
+
+    return install
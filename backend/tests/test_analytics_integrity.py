@@ -36,7 +36,8 @@ def check_data_integrity():
                 print(f"Metrics count for {yesterday}: {count}")
                 
                 if count == 0:
-                    print("WARNING: No metrics found for yesterday. ETL might not have run.")
+                    print("WARNING: No metrics found for yesterday. ETL might not have run "
+                          "(python -m backend.jobs.category_metrics_etl).")
                 
                 # 2. Check for negative values (should not exist)
                 cur.execute('SELECT COUNT(*) FROM "CategoryDailyMetrics" WHERE total_orders < 0 OR total_revenue < 0')
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend.jobs.category_anomalies import (
+    ANOMALY_METRICS, ANOMALY_SEASONAL_WEEKS, ANOMALY_WINDOW, ANOMALY_Z_THRESHOLD, _to_matrix, detect_anomalies,
+)
+from backend.routers import analytics
+
+HISTORY = max(ANOMALY_WINDOW, 7 * ANOMALY_SEASONAL_WEEKS)
+
+
+def _weekly(days: int, noise: float = 0.0, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.tile([100.0, 110.0, 95.0, 105.0, 140.0, 60.0, 50.0], days // 7 + 1)[:days] + rng.normal(0, noise, days)
+
+
+def test_statistics_match_naive_loops():
+    values = np.vstack([_weekly(70, noise=5.0, seed=1), _weekly(70, noise=20.0, seed=2)])
+    stats = detect_anomalies(values)
+    for d in range(HISTORY, 70):
+        window = values[:, d - ANOMALY_WINDOW:d]
+        assert np.allclose(stats["rolling_mean"][:, d], window.mean(axis=1))
+        assert np.allclose(stats["rolling_std"][:, d], window.std(axis=1))
+        same_weekday = [values[:, d - 7 * i] for i in range(1, ANOMALY_SEASONAL_WEEKS + 1)]
+        assert np.allclose(stats["baseline"][:, d], np.mean(same_weekday, axis=0))
+    assert np.isnan(stats["zscore"][:, :HISTORY]).all()
+
+
+def test_spike_is_flagged_and_seasonality_is_not():
+    values = _weekly(63, noise=2.0, seed=3)[None, :].copy()
+    values[0, 60] *= 3
+    z = detect_anomalies(values)["zscore"][0]
+    flagged = np.flatnonzero(np.abs(np.nan_to_num(z)) >= ANOMALY_Z_THRESHOLD)
+    assert flagged.tolist() == [60]
+
+
+def test_constant_series_is_not_flagged():
+    z = detect_anomalies(np.full((1, 60), 10.0))["zscore"]
+    assert np.nan_to_num(z).max() == 0.0
+
+
+def test_short_history_yields_nan():
+    stats = detect_anomalies(np.ones((2, HISTORY)))
+    assert all(np.isnan(v).all() for v in stats.values())
+
+
+def test_to_matrix_fills_missing_days_with_zero():
+    start = date(2024, 1, 1)
+    rows = [(start, "dev", 100, 2), (start + timedelta(days=2), "design", 50, 1)]
+    categories, matrices = _to_matrix(rows, start, 3)
+    assert categories == ["design", "dev"]
+    assert matrices[ANOMALY_METRICS[0]].tolist() == [[0, 0, 50], [100, 0, 0]]
+    assert matrices[ANOMALY_METRICS[1]].tolist() == [[0, 0, 1], [2, 0, 0]]
+
+
+def test_endpoint_only_reads_stored_rows(fake_db):
+    cursor = fake_db(analytics, [[]])
+    assert asyncio.run(analytics.get_category_anomalies(days=7, category=None, metric=None)) == []
+    assert len(cursor.queries) == 1 and '"CategoryAnomaly"' in cursor.queries[0][0]
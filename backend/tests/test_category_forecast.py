@@ -0,0 +1,38 @@
+import asyncio
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend.jobs.category_forecast import SEASON, fit_holt_winters, forecast
+from backend.routers import analytics
+
+FIRST_DAY = date(2024, 1, 1)  # a Monday
+WEEKLY = np.array([100.0, 120.0, 90.0, 110.0, 150.0, 60.0, 40.0])
+
+
+def test_fit_recovers_weekly_pattern():
+    days = 12 * SEASON
+    trend = 0.5 * np.arange(days)
+    values = np.vstack([np.tile(WEEKLY, days // SEASON) + trend, np.full(days, 20.0)])
+    model = fit_holt_winters(values, FIRST_DAY)
+
+    assert model["level"].shape == (2,) and model["season"].shape == (2, SEASON)
+    last_date = FIRST_DAY + timedelta(days=days - 1)
+    dates = [last_date + timedelta(days=i) for i in range(1, SEASON + 1)]
+    predicted = forecast(model["level"][0], model["trend"][0], model["season"][0].tolist(), last_date, dates)
+    expected = [WEEKLY[d.weekday()] + 0.5 * (d - FIRST_DAY).days for d in dates]
+    assert np.allclose(predicted, expected, rtol=0.05)
+
+    flat = forecast(model["level"][1], model["trend"][1], model["season"][1].tolist(), last_date, dates)
+    assert np.allclose(flat, 20.0, atol=0.5)
+    assert model["rmse"][1] < 1e-6
+
+
+def test_forecast_is_never_negative():
+    assert forecast(5.0, -2.0, [0.0] * SEASON, FIRST_DAY, [FIRST_DAY + timedelta(days=10)]) == [0.0]
+
+
+def test_endpoint_does_not_fit_when_models_are_missing(fake_db):
+    cursor = fake_db(analytics, [[]])
+    assert asyncio.run(analytics.get_category_forecast(horizon=7, category=None)) == []
+    assert len(cursor.queries) == 1
@@ -0,0 +1,34 @@
+import asyncio
+from datetime import date, timedelta
+
+from backend.jobs import category_metrics_etl
+
+
+def _run(fake_db, watermark, rebuild_from=None):
+    # lock, watermark, high order id, delete, recompute, merge, set watermark
+    cursor = fake_db(category_metrics_etl, [[(True,)], watermark, [(120,)], None, None, None, None])
+    result = asyncio.run(category_metrics_etl.run_category_metrics_etl(rebuild_from=rebuild_from))
+    return cursor, result
+
+
+def test_first_run_recomputes_every_day(fake_db):
+    cursor, result = _run(fake_db, [])
+    delete, params = cursor.queries[3]
+    assert delete.startswith('DELETE FROM "CategoryDailyMetrics"')
+    assert params == (date.min,)
+    assert cursor.queries[5][1] == (0, 120, date.min)
+    assert result["from_order_id"] == 0 and result["to_order_id"] == 120
+
+
+def test_later_runs_recompute_only_the_window(fake_db):
+    cursor, _ = _run(fake_db, [(100,)])
+    since = date.today() - timedelta(days=category_metrics_etl.ETL_RECOMPUTE_DAYS - 1)
+    assert cursor.queries[3][1] == (since,)
+    assert cursor.queries[5][1] == (100, 120, since)
+
+
+def test_rebuild_from(fake_db):
+    cursor, _ = _run(fake_db, [(100,)], rebuild_from=date(2024, 3, 1))
+    assert cursor.queries[3][1] == (date(2024, 3, 1),)
+    cursor, _ = _run(fake_db, [], rebuild_from=date(2024, 3, 1))
+    assert cursor.queries[3][1] == (date.min,)
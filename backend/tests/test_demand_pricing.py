@@ -0,0 +1,40 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.jobs import demand_pricing
+from backend.jobs.demand_pricing import demand_multipliers
+
+
+def test_linear_curve():
+    result = demand_multipliers(np.array([0, 5, 10, 25]), curve="linear", max_multiplier=1.5, orders_for_max=10)
+    assert result.tolist() == [1.0, 1.25, 1.5, 1.5]
+
+
+def test_log_curve_front_loads_demand():
+    result = demand_multipliers(np.array([0, 1, 10]), curve="log", max_multiplier=2.0, orders_for_max=10)
+    assert result[0] == 1.0 and result[2] == 2.0
+    assert result[1] > 1.0 + (2.0 - 1.0) * 0.1
+
+
+def test_step_curve():
+    result = demand_multipliers(np.array([0, 2, 3, 9, 10]), curve="step", max_multiplier=1.4, orders_for_max=10)
+    assert result.tolist() == [1.0, 1.0, 1.1, 1.3, 1.4]
+
+
+def test_unknown_curve():
+    with pytest.raises(ValueError):
+        demand_multipliers(np.array([1]), curve="cubic")
+
+
+def test_run_keeps_list_price_and_writes_only_changed_multipliers(fake_db):
+    rows = [(1, 0, 1.0), (2, 10, 1.0), (3, 10, 1.5)]
+    cursor = fake_db(demand_pricing, [[(True,)], rows, None, None])
+
+    result = asyncio.run(demand_pricing.run_demand_pricing())
+
+    assert result["changed"] == 1
+    insert, params = cursor.queries[2]
+    assert "JOIN closed cl" in insert and "RETURNING h.service_id, h.price" in insert
+    assert params == ([2], [demand_multipliers(np.array([10]))[0]], [10])
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from backend.core.event_buffer import EventBuffer
+from backend.repositories.analytics_repo import AnalyticsRepository
+from backend.schemas.analytics import EventType, ServiceEventCreate
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    written = []
+
+    async def copy_event_rows(rows):
+        written.append(list(rows))
+        return len(rows)
+
+    monkeypatch.setattr(AnalyticsRepository, "copy_event_rows", staticmethod(copy_event_rows))
+    return written
+
+
+def _event(service_id=1):
+    return ServiceEventCreate(service_id=service_id, event_type=EventType.VIEW, metadata={"q": "logo"})
+
+
+def test_flushes_full_batches_and_the_rest_on_stop(batches):
+    async def scenario():
+        buffer = EventBuffer(max_size=100, batch_size=4, flush_ms=10_000)
+        buffer.start()
+        for i in range(10):
+            assert await buffer.submit(_event(i), user_id=7)
+        await asyncio.sleep(0.05)
+        # Two full batches go out without waiting for the flush interval
+        assert [len(b) for b in batches] == [4, 4]
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(scenario())
+    assert sum(len(b) for b in batches) == 10
+    assert batches[0][0] == (0, 7, "VIEW", '{"q": "logo"}')
+    assert buffer.metrics()["written"] == 10 and buffer.metrics()["queued"] == 0
+
+
+def test_partial_batch_flushes_after_interval(batches):
+    async def scenario():
+        buffer = EventBuffer(max_size=100, batch_size=50, flush_ms=20)
+        buffer.start()
+        await buffer.submit(_event())
+        await asyncio.sleep(0.1)
+        assert batches == [[(1, None, "VIEW", '{"q": "logo"}')]]
+        await buffer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_drop_policy_when_full(batches):
+    async def scenario():
+        buffer = EventBuffer(max_size=2, batch_size=10, overflow="drop")
+        results = [await buffer.submit(_event()) for _ in range(3)]
+        return buffer, results
+
+    buffer, results = asyncio.run(scenario())
+    assert results == [True, True, False]
+    assert buffer.stats["dropped"] == 1
+
+
+def test_sample_policy_thins_events_near_capacity(batches):
+    async def scenario():
+        buffer = EventBuffer(max_size=10, batch_size=10, overflow="sample", sample_rate=0.0)
+        return buffer, [await buffer.submit(_event()) for _ in range(10)]
+
+    buffer, results = asyncio.run(scenario())
+    assert results == [True] * 8 + [False] * 2
+    assert buffer.stats["sampled_out"] == 2
+
+
+def test_failed_batches_are_counted(monkeypatch):
+    async def copy_event_rows(rows):
+        raise RuntimeError("copy failed")
+
+    monkeypatch.setattr(AnalyticsRepository, "copy_event_rows", staticmethod(copy_event_rows))
+
+    async def scenario():
+        buffer = EventBuffer(max_size=10, batch_size=10)
+        await buffer.submit(_event())
+        await buffer.stop()
+        return buffer
+
+    assert asyncio.run(scenario()).stats["failed"] == 1
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        EventBuffer(overflow="spill")
@@ -0,0 +1,22 @@
+import asyncio
+
+from backend.jobs import event_partitions
+
+
+def test_migration_widens_event_id_sequence(fake_db):
+    # relkind, lock, months back, then the DDL/copy statements
+    cursor = fake_db(event_partitions, [[("r",)], None, [(3,)]])
+
+    result = asyncio.run(event_partitions.migrate_to_partitioned())
+
+    statements = [" ".join(query.split()) for query, _ in cursor.queries]
+    widen = statements.index('ALTER SEQUENCE "ServiceEvent_event_id_seq" AS bigint')
+    assert widen < statements.index('DROP TABLE "ServiceEvent_legacy"')
+    assert any("event_id BIGINT" in s for s in statements)
+    assert result["months_back"] == 3
+
+
+def test_migration_skips_partitioned_table(fake_db):
+    cursor = fake_db(event_partitions, [[("p",)]])
+    assert "skipped" in asyncio.run(event_partitions.migrate_to_partitioned())
+    assert len(cursor.queries) == 1
@@ -0,0 +1,25 @@
+import asyncio
+
+from backend.jobs import freelancer_leaderboard
+
+
+def test_status_changes_drive_affected_days(fake_db):
+    # lock, then (watermark, max id) for orders, reviews, messages and status changes
+    cursor = fake_db(freelancer_leaderboard, [
+        [(True,)],
+        [(50,)], [(50,)],
+        [(7,)], [(7,)],
+        [(300,)], [(300,)],
+        [(12,)], [(15,)],
+    ])
+
+    asyncio.run(freelancer_leaderboard.run_freelancer_leaderboard())
+
+    affected, params = cursor.queries[9]
+    assert "CREATE TEMP TABLE leaderboard_affected" in affected
+    assert '"OrderStatusChange"' in affected
+    assert "CURRENT_DATE" not in affected
+    assert (params["s_low"], params["s_high"]) == (12, 15)
+    assert (params["o_low"], params["o_high"]) == (50, 50)
+    watermarks = [p for q, p in cursor.queries if '"AnalyticsJobWatermark"' in q and p[0].endswith(":status")]
+    assert watermarks[-1][1] == 15
@@ -0,0 +1,58 @@
+import hashlib
+
+import pytest
+
+from backend.core.hll import HLL_PRECISION, HLL_REGISTERS, HLL_STANDARD_ERROR, hll_estimate
+
+
+def _register(key: str) -> int:
+    """Python mirror of hll_register() in schema.sql, over a 64-bit hash."""
+    h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+    bits = format(h, "064b")[:53]
+    rank = bits.index("1") + 1 if "1" in bits else 54
+    return ((h & (HLL_REGISTERS - 1)) << 6) | rank
+
+
+def _sketch(keys) -> dict:
+    registers = {}
+    for key in keys:
+        v = _register(key)
+        registers[v >> 6] = max(registers.get(v >> 6, 0), v)
+    return registers
+
+
+def _union(a: dict, b: dict) -> dict:
+    return {r: max(a.get(r, 0), b.get(r, 0)) for r in set(a) | set(b)}
+
+
+def _estimate(sketch: dict) -> int:
+    # The HLL_STATS_SQL aggregates
+    return hll_estimate(len(sketch), sum(2.0 ** -(v & 63) for v in sketch.values()))
+
+
+def test_empty_sketch():
+    assert hll_estimate(0, 0) == 0
+    assert hll_estimate(None, None) == 0
+
+
+@pytest.mark.parametrize("count", [10, 500, 4000, 20000, 100000])
+def test_estimate_within_error_bound(count):
+    estimate = _estimate(_sketch(f"user-{i}" for i in range(count)))
+    assert abs(estimate - count) <= max(1, 4 * HLL_STANDARD_ERROR * count)
+
+
+def test_small_sets_are_near_exact():
+    assert _estimate(_sketch(str(i) for i in range(25))) in (24, 25)
+
+
+def test_union_matches_sketch_of_union():
+    a = _sketch(f"buyer-{i}" for i in range(0, 3000))
+    b = _sketch(f"buyer-{i}" for i in range(2000, 6000))
+    assert _estimate(_union(a, b)) == _estimate(_sketch(f"buyer-{i}" for i in range(6000)))
+    # Duplicates do not inflate the estimate
+    assert _estimate(_union(a, a)) == _estimate(a)
+
+
+def test_precision_constants():
+    assert HLL_REGISTERS == 2 ** HLL_PRECISION
+    assert round(HLL_STANDARD_ERROR, 3) == 0.023
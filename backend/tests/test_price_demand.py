@@ -0,0 +1,76 @@
+import asyncio
+
+import numpy as np
+
+from backend.jobs.price_demand import (
+    PRICE_DEMAND_MIN_SERVICES, _group_ranks, _t_quantile_975, _to_arrays, price_demand_stats,
+)
+from backend.routers import pricing_analytics
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    """Tie-averaged 1-based ranks, the naive way."""
+    return np.array([np.sum(values < v) + (np.sum(values == v) + 1) / 2 for v in values])
+
+
+def _sample(seed: int, n: int):
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(10, 200, n).round(0)
+    orders = np.maximum(0, np.round(50 / np.sqrt(prices) + rng.normal(0, 1, n)))
+    return prices, orders
+
+
+def test_group_ranks_average_ties_within_groups():
+    codes = np.array([0, 0, 0, 1, 1, 0])
+    values = np.array([5.0, 1.0, 5.0, 2.0, 2.0, 3.0])
+    assert _group_ranks(codes, values).tolist() == [3.5, 1.0, 3.5, 1.5, 1.5, 2.0]
+
+
+def test_statistics_match_numpy_per_group():
+    groups = [_sample(1, 40), _sample(2, 25)]
+    codes = np.concatenate([np.full(len(p), i) for i, (p, _) in enumerate(groups)])
+    prices = np.concatenate([p for p, _ in groups])
+    orders = np.concatenate([o for _, o in groups])
+    stats = price_demand_stats(codes, prices, orders, len(groups))
+
+    for i, (p, o) in enumerate(groups):
+        assert stats["services"][i] == len(p)
+        assert stats["total_orders"][i] == o.sum()
+        assert np.isclose(stats["pearson"][i], np.corrcoef(p, o)[0, 1])
+        assert np.isclose(stats["spearman"][i], np.corrcoef(_ranks(p), _ranks(o))[0, 1])
+        slope, intercept = np.polyfit(np.log(p), np.log1p(o), 1)
+        assert np.isclose(stats["elasticity"][i], slope)
+        residual = np.log1p(o) - (slope * np.log(p) + intercept)
+        r_squared = 1 - residual @ residual / np.sum((np.log1p(o) - np.log1p(o).mean()) ** 2)
+        assert np.isclose(stats["r_squared"][i], r_squared)
+        assert stats["elasticity_low"][i] < slope < stats["elasticity_high"][i]
+        assert stats["pearson_low"][i] < stats["pearson"][i] < stats["pearson_high"][i]
+        assert stats["elasticity"][i] < 0
+
+
+def test_too_few_services_give_nan():
+    prices, orders = _sample(3, PRICE_DEMAND_MIN_SERVICES - 1)
+    stats = price_demand_stats(np.zeros(len(prices), dtype=np.int64), prices, orders, 1)
+    assert stats["services"][0] == len(prices)
+    assert np.isnan(stats["pearson"][0]) and np.isnan(stats["elasticity"][0])
+
+
+def test_t_quantile_is_close_to_tables():
+    # Two-sided 95% Student t quantiles
+    table = {3: 3.182, 5: 2.571, 10: 2.228, 30: 2.042, 120: 1.980}
+    approx = _t_quantile_975(np.array(list(table), dtype=float))
+    assert np.allclose(approx, list(table.values()), rtol=0.01)
+
+
+def test_to_arrays_adds_all_services_group():
+    categories, codes, prices, orders = _to_arrays([("dev", 50, 3), ("design", 20, 1)])
+    assert categories == ["design", "dev", ""]
+    assert codes.tolist() == [1, 0, 2, 2]
+    assert prices.tolist() == [50.0, 20.0, 50.0, 20.0]
+    assert orders.tolist() == [3.0, 1.0, 3.0, 1.0]
+
+
+def test_endpoint_only_reads_cached_rows(fake_db):
+    cursor = fake_db(pricing_analytics, [[]])
+    assert asyncio.run(pricing_analytics.get_price_demand_correlation()) == []
+    assert len(cursor.queries) == 1 and '"PriceDemandStats"' in cursor.queries[0][0]
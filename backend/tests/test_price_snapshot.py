@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+
+import numpy as np
+
+from backend.core import price_snapshot
+from backend.core.price_snapshot import PriceSnapshot
+
+ROWS = [("design", 30.0), ("dev", 80.0), ("design", 10.0), ("dev", 45.0), ("design", 55.0)]
+STAMP = datetime(2024, 1, 1, 12, 0)
+
+
+def _loaded(rows=ROWS):
+    snapshot = PriceSnapshot()
+    snapshot._load(rows)
+    return snapshot
+
+
+def test_category_prices_are_sorted_per_category():
+    snapshot = _loaded()
+    assert snapshot.category_prices("design").tolist() == [10.0, 30.0, 55.0]
+    assert snapshot.category_prices("dev").tolist() == [45.0, 80.0]
+    assert snapshot.category_prices("other").size == 0
+    assert snapshot.category_prices().size == 5
+
+
+def test_histogram_matches_numpy():
+    prices = np.random.default_rng(1).uniform(5, 500, 1000).round(2)
+    snapshot = _loaded([("x", float(p)) for p in prices])
+    buckets = snapshot.histogram(25)
+    assert sum(count for _, count in buckets) == prices.size
+    for start, count in buckets:
+        assert count == np.count_nonzero((prices >= start) & (prices < start + 25))
+    assert _loaded().histogram(20, "design") == [(0.0, 1), (20.0, 1), (40.0, 1)]
+    assert _loaded([]).histogram(10) == []
+
+
+def test_percentiles_are_exact():
+    result = _loaded().percentiles([50])
+    assert result[None] == (5, [45.0])
+    assert result["design"] == (3, [30.0])
+    assert result["dev"] == (2, [62.5])
+
+
+def test_refresh_reloads_only_when_version_moves(fake_db):
+    snapshot = PriceSnapshot(max_age=0)
+    cursor = fake_db(price_snapshot, [[(3, STAMP)], ROWS])
+    asyncio.run(snapshot.refresh())
+    assert snapshot.prices.size == 5
+
+    # Same version: only the version probe runs
+    cursor = fake_db(price_snapshot, [[(3, STAMP)]])
+    asyncio.run(snapshot.refresh())
+    assert len(cursor.queries) == 1
+
+    # A late commit with an older timestamp still raises the version sum
+    cursor = fake_db(price_snapshot, [[(4, STAMP)], ROWS[:2]])
+    asyncio.run(snapshot.refresh())
+    assert len(cursor.queries) == 2
+    assert snapshot.prices.size == 2
+
+
+def test_invalidate_forces_reload(fake_db):
+    snapshot = PriceSnapshot(max_age=3600)
+    fake_db(price_snapshot, [[(1, STAMP)], ROWS])
+    asyncio.run(snapshot.refresh())
+    cursor = fake_db(price_snapshot, [])
+    asyncio.run(snapshot.refresh())
+    assert cursor.queries == []
+
+    snapshot.invalidate()
+    cursor = fake_db(price_snapshot, [[(1, STAMP)], ROWS[:1]])
+    asyncio.run(snapshot.refresh())
+    assert snapshot.prices.tolist() == [30.0]
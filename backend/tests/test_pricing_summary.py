@@ -0,0 +1,47 @@
+import asyncio
+import math
+from decimal import Decimal
+
+from backend.core.price_sketch import PRICE_SKETCH_ACCURACY, bucket_value, merge_sketches, sketch_quantile
+from backend.core.price_snapshot import PriceSnapshot
+from backend.routers import pricing_analytics
+
+
+def _bucket(price: float) -> int:
+    gamma = (1 + PRICE_SKETCH_ACCURACY) / (1 - PRICE_SKETCH_ACCURACY)
+    return math.ceil(math.log(price, gamma))
+
+
+def test_sketch_quantile_is_within_accuracy():
+    prices = [12.5, 30.0, 45.0, 50.0, 75.0, 199.0, 200.0]
+    sketch = {}
+    for price in prices:
+        sketch[_bucket(price)] = sketch.get(_bucket(price), 0) + 1
+    median = sketch_quantile(sketch, 0.5)
+    assert abs(median - 50.0) / 50.0 <= PRICE_SKETCH_ACCURACY
+    for price in prices:
+        assert abs(bucket_value(_bucket(price)) - price) / price <= PRICE_SKETCH_ACCURACY
+    assert sketch_quantile({}, 0.5) is None
+
+
+def test_merge_sketches_sums_jsonb_counts():
+    assert merge_sketches([{"10": 2, "11": 1}, None, {"11": 3}]) == {10: 2, 11: 4}
+
+
+def test_summary_median_is_exact(fake_db, monkeypatch):
+    snapshot = PriceSnapshot(max_age=3600)
+    snapshot._load([("design", 50.0), ("design", 50.0), ("dev", 200.0), ("dev", 50.0)])
+    snapshot._stale = False
+    snapshot._checked_at = float("inf")
+    monkeypatch.setattr(pricing_analytics, "price_snapshot", snapshot)
+    fake_db(pricing_analytics, [[
+        ("design", 2, 2, Decimal("100"), Decimal("5000")),
+        ("dev", 2, 2, Decimal("250"), Decimal("42500")),
+    ]])
+
+    summary = asyncio.run(pricing_analytics.get_pricing_summary())
+
+    assert summary.median_price == 50.0
+    assert summary.avg_price == 87.5
+    assert summary.total_services == 4
+    assert summary.most_expensive_category == "dev"
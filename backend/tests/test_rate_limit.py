@@ -0,0 +1,75 @@
+import asyncio
+
+from backend.core import rate_limit
+from backend.core.rate_limit import MemoryBucketStore, PostgresBucketStore, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _checks(limiter, key, count):
+    return [asyncio.run(limiter.check(key)) for _ in range(count)]
+
+
+def test_burst_then_refill(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    limiter = RateLimiter("test", max_requests=3, window_seconds=30, store=MemoryBucketStore())
+
+    assert _checks(limiter, 1, 4) == [True, True, True, False]
+    clock.now += 10  # one token back at 0.1 tokens/s
+    assert _checks(limiter, 1, 2) == [True, False]
+    clock.now += 1000  # never refills beyond capacity
+    assert _checks(limiter, 1, 4) == [True, True, True, False]
+
+
+def test_keys_are_independent(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "monotonic", FakeClock())
+    limiter = RateLimiter("test", max_requests=1, window_seconds=60, store=MemoryBucketStore())
+    assert _checks(limiter, "a", 2) == [True, False]
+    assert _checks(limiter, "b", 1) == [True]
+
+
+def test_cost_larger_than_remaining_tokens(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "monotonic", FakeClock())
+    limiter = RateLimiter("test", max_requests=5, window_seconds=60, store=MemoryBucketStore())
+    assert asyncio.run(limiter.check("k", cost=4))
+    assert not asyncio.run(limiter.check("k", cost=2))
+    assert asyncio.run(limiter.check("k", cost=1))
+
+
+def test_lru_eviction_bounds_memory(monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "monotonic", FakeClock())
+    store = MemoryBucketStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        asyncio.run(store.consume(key, 1.0, 0.0))
+    assert list(store._buckets) == ["b", "c"]
+    # "a" was evicted, so it starts full again
+    assert asyncio.run(store.consume("a", 1.0, 0.0))
+
+
+def test_postgres_store_falls_back_to_memory(monkeypatch):
+    def unavailable():
+        raise ConnectionError("database down")
+
+    monkeypatch.setattr(rate_limit, "get_connection", unavailable)
+    monkeypatch.setattr(rate_limit.time, "monotonic", FakeClock())
+    limiter = RateLimiter("test", max_requests=1, window_seconds=60, store=PostgresBucketStore())
+    assert _checks(limiter, 1, 2) == [True, False]
+
+
+def test_postgres_store_reads_upsert_result(fake_db):
+    store = PostgresBucketStore()
+    fake_db(rate_limit, [[(0.0,)]])
+    assert asyncio.run(store.consume("k", 1.0, 1.0))
+    fake_db(rate_limit, [[]])
+    assert not asyncio.run(store.consume("k", 1.0, 1.0))
+
+
+def test_single_event_limiter_never_uses_the_shared_store():
+    assert isinstance(rate_limit.analytics_event_limiter.store, MemoryBucketStore)
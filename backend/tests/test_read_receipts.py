@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend.core.read_receipts import ReadReceiptBuffer
+from backend.routers import messages
+
+
+def test_mark_read_keeps_highest_watermark():
+    buffer = ReadReceiptBuffer()
+    buffer.mark_read(1, 10, 5)
+    buffer.mark_read(1, 10, 3)
+    assert buffer.pending_watermark(1, 10) == 5
+    assert buffer.pending_watermark(2, 10) == 0
+
+
+def test_mark_read_clamps_to_conversation(fake_db, monkeypatch):
+    buffer = ReadReceiptBuffer()
+    monkeypatch.setattr(messages, "read_receipts", buffer)
+    cursor = fake_db(messages, [[(1, 2)], [(42,)]])
+
+    result = asyncio.run(messages.mark_read(order_id=10, user_id=1, message_id=10 ** 9))
+
+    assert cursor.queries[1][1] == (10, 10 ** 9)
+    assert result["last_read_message_id"] == 42
+    assert buffer.pending_watermark(1, 10) == 42
+
+
+def test_mark_read_rejects_foreign_message(fake_db, monkeypatch):
+    buffer = ReadReceiptBuffer()
+    monkeypatch.setattr(messages, "read_receipts", buffer)
+    fake_db(messages, [[(1, 2)], [(None,)]])
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(messages.mark_read(order_id=10, user_id=1, message_id=3))
+    assert error.value.status_code == 404
+    assert buffer.pending_watermark(1, 10) == 0
+
+
+def test_mark_read_requires_participant(fake_db):
+    fake_db(messages, [[(1, 2)]])
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(messages.mark_read(order_id=10, user_id=3, message_id=3))
+    assert error.value.status_code == 403
@@ -0,0 +1,39 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from backend.repositories.analytics_repo import AnalyticsRepository
+from backend.routers import analytics
+
+
+def _funnel(fake_db, monkeypatch, access_row, user_id=5):
+    async def get_funnel(scope, key, start_date, end_date):
+        return {"scope": scope, "key": key}
+
+    monkeypatch.setattr(AnalyticsRepository, "get_funnel", staticmethod(get_funnel))
+    fake_db(analytics, [access_row])
+    user = SimpleNamespace(user_id=user_id)
+    return asyncio.run(analytics.get_service_funnel(9, date(2024, 1, 1), date(2024, 1, 31), current_user=user))
+
+
+def test_owner_can_read_funnel(fake_db, monkeypatch):
+    assert _funnel(fake_db, monkeypatch, [(5, False)]) == {"scope": "service", "key": "9"}
+
+
+def test_admin_can_read_funnel(fake_db, monkeypatch):
+    assert _funnel(fake_db, monkeypatch, [(8, True)])["key"] == "9"
+
+
+def test_other_users_are_rejected(fake_db, monkeypatch):
+    with pytest.raises(HTTPException) as error:
+        _funnel(fake_db, monkeypatch, [(8, False)])
+    assert error.value.status_code == 403
+
+
+def test_unknown_service(fake_db, monkeypatch):
+    with pytest.raises(HTTPException) as error:
+        _funnel(fake_db, monkeypatch, [])
+    assert error.value.status_code == 404
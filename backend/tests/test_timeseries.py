@@ -0,0 +1,84 @@
+import asyncio
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from backend.core.timeseries import date_buckets, downsample, fill_gaps, lttb_indices, to_columns, to_rows
+from backend.repositories.analytics_repo import AnalyticsRepository
+from backend.routers import analytics
+from backend.schemas.analytics import DailyMetricColumns, DailyMetricResponse
+
+START = date(2024, 1, 1)
+
+
+def _metric(day: int, views: int) -> DailyMetricResponse:
+    return DailyMetricResponse(
+        service_id=7, date=START + timedelta(days=day), views_count=views, clicks_count=views // 2,
+        orders_count=1, impressions_count=views * 3, conversion_rate=0.5, ctr=0.1,
+        avg_response_time=2.0, avg_rating=4.5, total_earnings=100.0,
+    )
+
+
+def _service_metrics(monkeypatch, metrics, end_date, format="rows", fill_gaps=False, points=None):
+    async def get_daily_metrics(service_id, start_date, end_date):
+        return metrics
+
+    monkeypatch.setattr(AnalyticsRepository, "get_daily_metrics", staticmethod(get_daily_metrics))
+    user = SimpleNamespace(user_id=1, role="admin")
+    return asyncio.run(analytics.get_service_metrics(
+        7, START, end_date, format=format, fill_gaps=fill_gaps, points=points, current_user=user,
+    ))
+
+
+def test_date_buckets():
+    assert date_buckets(date(2024, 1, 3), date(2024, 1, 5)) == [date(2024, 1, 3), date(2024, 1, 4), date(2024, 1, 5)]
+    assert date_buckets(date(2024, 1, 10), date(2024, 1, 16), "week") == [date(2024, 1, 8), date(2024, 1, 15)]
+    assert date_buckets(date(2024, 11, 15), date(2025, 1, 1), "month") == [
+        date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1),
+    ]
+
+
+def test_fill_gaps_uses_defaults_for_missing_buckets():
+    columns = to_columns([{"date": START, "views": 4}, {"date": START + timedelta(days=2), "views": 6}], ["views"])
+    filled = fill_gaps(columns, date_buckets(START, START + timedelta(days=3)), {"views": 0})
+    assert filled["views"] == [4, 0, 6, 0]
+    assert to_rows(filled)[1] == {"date": START + timedelta(days=1), "views": 0}
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    ys = [0.0] * 100
+    ys[37], ys[71] = 50.0, -40.0
+    kept = lttb_indices(ys, 10)
+    assert len(kept) == 10
+    assert kept[0] == 0 and kept[-1] == 99
+    assert kept == sorted(kept)
+    assert 37 in kept and 71 in kept
+    assert lttb_indices(ys[:5], 10) == [0, 1, 2, 3, 4]
+
+
+def test_downsample_keeps_columns_aligned():
+    columns = {"date": list(range(50)), "a": list(range(50)), "b": [i * 10 for i in range(50)]}
+    sampled = downsample(columns, 8, by="a")
+    assert len(sampled["date"]) == 8
+    assert sampled["b"] == [i * 10 for i in sampled["a"]]
+    assert downsample(columns, None, by="a") is columns
+
+
+def test_service_metrics_columnar(monkeypatch):
+    result = _service_metrics(monkeypatch, [_metric(0, 10), _metric(1, 20)], START + timedelta(days=1), format="columnar")
+    assert isinstance(result, DailyMetricColumns)
+    assert result.views_count == [10, 20]
+    assert result.total_earnings == [100.0, 100.0]
+
+
+def test_service_metrics_fill_gaps(monkeypatch):
+    result = _service_metrics(monkeypatch, [_metric(1, 20)], START + timedelta(days=2), fill_gaps=True)
+    assert [m.date for m in result] == date_buckets(START, START + timedelta(days=2))
+    assert [m.views_count for m in result] == [0, 20, 0]
+    assert result[0].avg_rating is None and result[1].avg_rating == 4.5
+
+
+def test_service_metrics_points(monkeypatch):
+    metrics = [_metric(day, day % 7) for day in range(30)]
+    result = _service_metrics(monkeypatch, metrics, START + timedelta(days=29), points=5)
+    assert len(result) == 5
+    assert result[0].date == START and result[-1].date == START + timedelta(days=29)
@@ -0,0 +1,37 @@
+import asyncio
+
+from backend.repositories.pricing_repo import refresh_undercutting_alert
+from backend.routers import pricing_analytics
+from backend.tests.conftest import FakeCursor
+
+
+def test_price_write_touches_only_the_edited_service():
+    cursor = FakeCursor([[(5.0,)], [(30.0,)], [(30.0, 70, 100, "Design", "Logo")], None])
+
+    pct = asyncio.run(refresh_undercutting_alert(cursor, 7))
+
+    assert pct == 30.0
+    assert cursor.queries[1] == ("SELECT refresh_undercutting_alert(%s)", (7,))
+    assert all("refresh_undercutting_alerts(" not in sql for sql, _ in cursor.queries)
+    notify, params = cursor.queries[3]
+    assert 'INSERT INTO "Notification"' in notify
+    assert params[2:] == (30.0, 5.0, 5.0, "Design")
+
+
+def test_price_write_above_average_skips_notifications():
+    cursor = FakeCursor([[], [(None,)]])
+
+    assert asyncio.run(refresh_undercutting_alert(cursor, 7)) is None
+    assert len(cursor.queries) == 2
+
+
+def test_patterns_compare_against_live_average(fake_db):
+    cursor = fake_db(pricing_analytics, [[(7, "Logo", 50, "Design", 100, 50.0, None)]])
+
+    result = asyncio.run(pricing_analytics.get_undercutting_patterns(threshold_percentage=20.0, category="Design"))
+
+    sql, params = cursor.queries[0]
+    assert 'FROM "CategoryPricingStats" st' in sql
+    assert "s.hourly_price < st.price_sum / st.priced_count * (1 - %s::numeric / 100)" in sql
+    assert params == (20.0, "Design", "Design")
+    assert result[0].price_diff_pct == 50.0 and result[0].alerted_at is None
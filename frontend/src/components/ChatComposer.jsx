@@ -3,7 +3,7 @@ import { Box, TextField, IconButton, Tooltip, Button, Typography } from '@mui/ma
 import SendIcon from '@mui/icons-material/Send';
 import AttachFileIcon from '@mui/icons-material/AttachFile';
 
-export default function ChatComposer({ onSend, disabled = false }) {
+export default function ChatComposer({ onSend, onTyping, disabled = false }) {
   const [text, setText] = useState('');
   const [file, setFile] = useState(null);
   // Unique input id so clicking the label triggers the hidden input reliably
@@ -25,7 +25,7 @@ export default function ChatComposer({ onSend, disabled = false }) {
 
   return (
     <Box component="form" onSubmit={submit} sx={{ display: 'flex', flexDirection: 'column', gap: 1 }}>
-      <TextField fullWidth value={text} onChange={(e)=>setText(e.target.value)} placeholder="Write a message..." disabled={disabled} />
+      <TextField fullWidth value={text} onChange={(e)=>{ setText(e.target.value); onTyping && onTyping(); }} placeholder="Write a message..." disabled={disabled} />
       <Box sx={{ display: 'flex', alignItems: 'center', gap: 1 }}>
         <input
           type="file"
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import {
   Box,
   Paper,
@@ -25,8 +25,12 @@ export default function ChatWindow({ orderId, currentUserId, otherUser }) {
     connect,
     disconnect,
     sendMessage: sendSocketMessage,
+    sendTyping,
+    markSeen,
     messages: socketMessages,
     connectionStatus,
+    presence,
+    typing,
     isConnected
   } = useSocket();
 
@@ -48,6 +52,25 @@ export default function ChatWindow({ orderId, currentUserId, otherUser }) {
     scrollToBottom();
   }, [messages]);
 
+  // Fetch the full conversation over REST
+  const fetchMessages = useCallback(async () => {
+    try {
+      setLoading(true);
+      const response = await axios.get(`${API_BASE}/messages`, {
+        params: { order_id: orderId, user_id: currentUserId }
+      });
+      const loaded = response.data || [];
+      setMessages(loaded);
+      markSeen(orderId, Math.max(0, ...loaded.map(m => m.message_id)));
+      setError(null);
+    } catch (err) {
+      console.error('Failed to load messages:', err);
+      setError(err.response?.data?.detail || 'Failed to load messages');
+    } finally {
+      setLoading(false);
+    }
+  }, [orderId, currentUserId, markSeen]);
+
   // Load existing messages and connect WebSocket
   useEffect(() => {
     if (!orderId || !currentUserId) return;
@@ -55,30 +78,20 @@ export default function ChatWindow({ orderId, currentUserId, otherUser }) {
     // Connect WebSocket
     connect(orderId);
 
-    // Fetch existing messages
-    const fetchMessages = async () => {
-      try {
-        setLoading(true);
-        const response = await axios.get(`${API_BASE}/messages`, {
-          params: { order_id: orderId, user_id: currentUserId }
-        });
-        setMessages(response.data || []);
-        setError(null);
-      } catch (err) {
-        console.error('Failed to load messages:', err);
-        setError(err.response?.data?.detail || 'Failed to load messages');
-      } finally {
-        setLoading(false);
-      }
-    };
-
     fetchMessages();
 
     // Cleanup
     return () => {
       disconnect(orderId);
     };
-  }, [orderId, currentUserId, connect, disconnect]);
+  }, [orderId, currentUserId, connect, disconnect, fetchMessages]);
+
+  // The socket missed too much to replay; reload the conversation
+  useEffect(() => {
+    if (connectionStatus[orderId] === 'resync') {
+      fetchMessages();
+    }
+  }, [connectionStatus, orderId, fetchMessages]);
 
   // Merge WebSocket messages with existing messages
   useEffect(() => {
@@ -164,6 +177,9 @@ export default function ChatWindow({ orderId, currentUserId, otherUser }) {
   };
 
   const status = connectionStatus[orderId];
+  const otherUserId = otherUser?.user_id ?? otherUser?.id;
+  const otherOnline = (presence[orderId] || []).includes(otherUserId);
+  const otherTyping = (typing[orderId] || []).includes(otherUserId);
   const statusColor = {
     connected: 'success',
     connecting: 'warning',
@@ -192,6 +208,11 @@ export default function ChatWindow({ orderId, currentUserId, otherUser }) {
             color={statusColor}
             sx={{ height: '20px', fontSize: '0.7rem' }}
           />
+          {(otherOnline || otherTyping) && (
+            <Typography variant="caption" color="text.secondary" sx={{ ml: 1 }}>
+              {otherTyping ? 'typing…' : 'online'}
+            </Typography>
+          )}
         </Box>
         <IconButton onClick={(e) => setMenuAnchor(e.currentTarget)}>
           <MoreVertIcon />
@@ -290,6 +311,7 @@ export default function ChatWindow({ orderId, currentUserId, otherUser }) {
         <Box sx={{ flex: 1 }}>
           <ChatComposer
             onSend={handleSend}
+            onTyping={() => sendTyping(orderId, true)}
             disabled={!isConnected(orderId) && status !== 'connected'}
           />
         </Box>
@@ -14,8 +14,39 @@ export const SocketProvider = ({ children, userId }) => {
   const [sockets, setSockets] = useState({});
   const [messages, setMessages] = useState({});
   const [connectionStatus, setConnectionStatus] = useState({});
+  // Ephemeral signals from the server: online user ids and currently typing user ids per order
+  const [presence, setPresence] = useState({});
+  const [typing, setTyping] = useState({});
+  const typingTimeouts = useRef({});
   const socketRefs = useRef({});
   const reconnectTimeouts = useRef({});
+  // Highest message_id seen per order, sent on reconnect so the server only replays what we missed
+  const lastMessageIds = useRef({});
+
+  const appendMessages = useCallback((orderId, incoming) => {
+    if (!incoming.length) return;
+    const newest = Math.max(...incoming.map(m => m.message_id || 0));
+    lastMessageIds.current[orderId] = Math.max(lastMessageIds.current[orderId] || 0, newest);
+    setMessages(prev => {
+      const existing = prev[orderId] || [];
+      const seen = new Set(existing.map(m => m.message_id));
+      const fresh = incoming.filter(m => !seen.has(m.message_id));
+      return fresh.length ? { ...prev, [orderId]: [...existing, ...fresh] } : prev;
+    });
+  }, []);
+
+  // Typing indicators expire unless the server refreshes them
+  const setTypingFlag = useCallback((orderId, typingUserId, isTyping) => {
+    const key = `${orderId}:${typingUserId}`;
+    clearTimeout(typingTimeouts.current[key]);
+    setTyping(prev => {
+      const others = (prev[orderId] || []).filter(id => id !== typingUserId);
+      return { ...prev, [orderId]: isTyping ? [...others, typingUserId] : others };
+    });
+    if (isTyping) {
+      typingTimeouts.current[key] = setTimeout(() => setTypingFlag(orderId, typingUserId, false), 5000);
+    }
+  }, []);
 
   // Connect to a specific order's WebSocket
   const connect = useCallback((orderId) => {
@@ -35,7 +66,9 @@ export const SocketProvider = ({ children, userId }) => {
       clearTimeout(reconnectTimeouts.current[orderId]);
     }
 
-    const wsUrl = `ws://127.0.0.1:8000/api/messages/ws/${orderId}?user_id=${userId}`;
+    const lastId = lastMessageIds.current[orderId];
+    const wsUrl = `ws://127.0.0.1:8000/api/messages/ws/${orderId}?user_id=${userId}`
+      + (lastId ? `&last_message_id=${lastId}` : '');
     
     try {
       const socket = new WebSocket(wsUrl);
@@ -52,10 +85,23 @@ export const SocketProvider = ({ children, userId }) => {
           const data = JSON.parse(event.data);
           
           if (data.type === 'new_message') {
-            setMessages(prev => ({
-              ...prev,
-              [orderId]: [...(prev[orderId] || []), data.message]
-            }));
+            appendMessages(orderId, [data.message]);
+          } else if (data.type === 'replay') {
+            appendMessages(orderId, data.messages || []);
+          } else if (data.type === 'resync_required') {
+            // Too much was missed to replay; let the chat window refetch the conversation
+            setConnectionStatus(prev => ({ ...prev, [orderId]: 'resync' }));
+          } else if (data.type === 'presence_snapshot') {
+            setPresence(prev => ({ ...prev, [orderId]: data.online || [] }));
+          } else if (data.type === 'presence') {
+            setPresence(prev => {
+              const others = (prev[orderId] || []).filter(id => id !== data.user_id);
+              return { ...prev, [orderId]: data.status === 'online' ? [...others, data.user_id] : others };
+            });
+          } else if (data.type === 'typing') {
+            setTypingFlag(orderId, data.user_id, data.is_typing);
+          } else if (data.type === 'ping') {
+            socket.send(JSON.stringify({ type: 'pong' }));
           }
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
@@ -95,7 +141,7 @@ export const SocketProvider = ({ children, userId }) => {
       console.error(`Failed to create WebSocket for order ${orderId}:`, error);
       setConnectionStatus(prev => ({ ...prev, [orderId]: 'error' }));
     }
-  }, [userId]);
+  }, [userId, appendMessages, setTypingFlag]);
 
   // Disconnect from a specific order
   const disconnect = useCallback((orderId) => {
@@ -142,6 +188,20 @@ export const SocketProvider = ({ children, userId }) => {
     }
   }, []);
 
+  // Tell the other participant we are typing (the server coalesces repeats)
+  const sendTyping = useCallback((orderId, isTyping = true) => {
+    const socket = socketRefs.current[orderId];
+    if (socket?.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ type: 'typing', is_typing: isTyping }));
+    }
+  }, []);
+
+  // Record messages loaded over REST so a later reconnect resumes after them
+  const markSeen = useCallback((orderId, messageId) => {
+    if (!messageId) return;
+    lastMessageIds.current[orderId] = Math.max(lastMessageIds.current[orderId] || 0, messageId);
+  }, []);
+
   // Clear messages for an order
   const clearMessages = useCallback((orderId) => {
     setMessages(prev => {
@@ -166,6 +226,9 @@ export const SocketProvider = ({ children, userId }) => {
       Object.values(reconnectTimeouts.current).forEach(timeout => {
         clearTimeout(timeout);
       });
+      Object.values(typingTimeouts.current).forEach(timeout => {
+        clearTimeout(timeout);
+      });
     };
   }, []);
 
@@ -173,10 +236,14 @@ export const SocketProvider = ({ children, userId }) => {
     connect,
     disconnect,
     sendMessage,
+    sendTyping,
+    markSeen,
     clearMessages,
     sockets,
     messages,
     connectionStatus,
+    presence,
+    typing,
     isConnected: (orderId) => socketRefs.current[orderId]?.readyState === WebSocket.OPEN
   };
 
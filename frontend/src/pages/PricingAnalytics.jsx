@@ -113,7 +113,7 @@ const PricingAnalytics = () => {
       // Fetch correlation
       try {
         setLoading(prev => ({ ...prev, correlation: true }));
-        const corrRes = await axiosInstance.get('/api/pricing-analytics/price-demand-correlation');
+        const corrRes = await axiosInstance.get('/api/pricing-analytics/price-demand-correlation/points');
         setCorrelation(corrRes.data);
         setErrors(prev => ({ ...prev, correlation: null }));
       } catch (error) {
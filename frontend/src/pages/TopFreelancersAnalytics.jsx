@@ -117,9 +117,9 @@ export default function TopFreelancersAnalytics() {
                     f.completed_orders,
                     f.total_earnings.toFixed(2),
                     f.avg_rating.toFixed(2),
-                    f.avg_response_time_hours.toFixed(1),
+                    f.avg_response_time_hours != null ? f.avg_response_time_hours.toFixed(1) : '',
                     f.completion_rate_percent.toFixed(2),
-                    f.avg_satisfaction.toFixed(2),
+                    f.avg_satisfaction != null ? f.avg_satisfaction.toFixed(2) : '',
                 ].join(',')
             ),
         ].join('\n');
@@ -323,7 +323,7 @@ export default function TopFreelancersAnalytics() {
                                         {freelancer.completion_rate_percent.toFixed(1)}%
                                     </TableCell>
                                     <TableCell align="center">
-                                        {freelancer.avg_response_time_hours.toFixed(1)}h
+                                        {freelancer.avg_response_time_hours != null ? `${freelancer.avg_response_time_hours.toFixed(1)}h` : '—'}
                                     </TableCell>
                                     <TableCell align="right">${freelancer.wallet_balance.toFixed(2)}</TableCell>
                                 </TableRow>